@@ -0,0 +1,142 @@
+`timescale 1ns / 1ps
+
+// Golden vectors for the Python edge model (python/image_processing/fpga_edge_model.py)
+//   python -m image_processing.fpga_edge_model vectors <dir> img0.png img1.png ...
+//   make sim TOP=Edge_System   (xsim: -testplusarg VEC_DIR=<dir> -testplusarg FRAMES=<n>)
+//   python -m image_processing.fpga_edge_model compare <dir>
+// Frames are processed back to back after a single reset, like consecutive requests on the
+// board, and each reply is captured at the UART TX FIFO input (edge_out_<k>.mem, one byte per line).
+
+module tb_Edge_System;
+
+    localparam IMG_WIDTH  = 176;
+    localparam IMG_HEIGHT = 240;
+    localparam TOTAL      = IMG_WIDTH * IMG_HEIGHT;
+    localparam ADDR_WIDTH = $clog2(TOTAL);
+    localparam TH_HIGH    = 40;  // PenPlotter_System EDGE_TH_HIGH
+    localparam TH_LOW     = 20;  // PenPlotter_System EDGE_TH_LOW
+
+    logic clk;
+    logic reset;
+    logic start_edge_trig;
+    logic edge_done, processing;
+
+    // Capture frame buffer stand-in (registered read, like Frame_Buffer)
+    logic [15:0] cap_mem[0:TOTAL-1];
+    logic                  capture_fb_re;
+    logic [ADDR_WIDTH-1:0] capture_fb_rAddr;
+    logic [          15:0] capture_fb_rData;
+
+    // Edge result frame buffer read side (driven by the real TX controller)
+    logic                  edge_fb_re;
+    logic [ADDR_WIDTH-1:0] edge_fb_rAddr;
+    logic [           7:0] edge_fb_rData;
+
+    logic       wr_en;
+    logic [7:0] wr_data;
+    logic       sending, frame_tx_done;
+
+    always_ff @(posedge clk) begin
+        if (capture_fb_re) capture_fb_rData <= cap_mem[capture_fb_rAddr];
+    end
+
+    Edge_System #(
+        .DATA_WIDTH(8),
+        .IMG_WIDTH (IMG_WIDTH),
+        .IMG_HEIGHT(IMG_HEIGHT),
+        .TH_HIGH   (TH_HIGH),
+        .TH_LOW    (TH_LOW)
+    ) dut (
+        .clk             (clk),
+        .reset           (reset),
+        .edge_input_sel  (1'b0),          // camera frame buffer
+        .start_edge_trig (start_edge_trig),
+        .edge_done       (edge_done),
+        .processing      (processing),
+        .capture_fb_re   (capture_fb_re),
+        .capture_fb_rAddr(capture_fb_rAddr),
+        .capture_fb_rData(capture_fb_rData),
+        .pc_img_fb_re    (),
+        .pc_img_fb_rAddr (),
+        .pc_img_fb_rData (16'h0000),
+        .edge_fb_re      (edge_fb_re),
+        .edge_fb_rAddr   (edge_fb_rAddr),
+        .edge_fb_rData   (edge_fb_rData)
+    );
+
+    UART_TX_Controller #(
+        .IMG_WIDTH (IMG_WIDTH),
+        .IMG_HEIGHT(IMG_HEIGHT)
+    ) U_TX_Controller (
+        .clk          (clk),
+        .reset        (reset),
+        .edge_tx_trig (edge_done),        // as in PenPlotter_System
+        .tx_full      (1'b0),
+        .fb_re        (edge_fb_re),
+        .fb_rAddr     (edge_fb_rAddr),
+        .fb_rData     (edge_fb_rData),
+        .wr_en        (wr_en),
+        .wr_data      (wr_data),
+        .sending      (sending),
+        .frame_tx_done(frame_tx_done)
+    );
+
+    // --------------------------------------------------
+    // Clock : 100MHz (10ns)
+    // --------------------------------------------------
+    initial clk = 0;
+    always #5 clk = ~clk;
+
+    // --------------------------------------------------
+    // Reply capture
+    // --------------------------------------------------
+    integer fd_out;
+    integer n_bytes;
+
+    always @(posedge clk) begin
+        if (wr_en && fd_out != 0) begin
+            $fwrite(fd_out, "%02x\n", wr_data);
+            n_bytes = n_bytes + 1;
+        end
+    end
+
+    // --------------------------------------------------
+    // Stimulus
+    // --------------------------------------------------
+    string vec_dir;
+    integer frames;
+
+    initial begin
+        if (!$value$plusargs("VEC_DIR=%s", vec_dir)) vec_dir = ".";
+        if (!$value$plusargs("FRAMES=%d", frames)) frames = 1;
+
+        fd_out          = 0;
+        n_bytes         = 0;
+        reset           = 1'b1;
+        start_edge_trig = 1'b0;
+        #50;
+        reset = 1'b0;
+        repeat (1000) @(posedge clk);   // let the Canny sync delay line fill
+
+        for (int k = 0; k < frames; k++) begin
+            $readmemh($sformatf("%s/edge_in_%0d.mem", vec_dir, k), cap_mem);
+            fd_out  = $fopen($sformatf("%s/edge_out_%0d.mem", vec_dir, k), "w");
+            n_bytes = 0;
+
+            @(posedge clk);
+            start_edge_trig <= 1'b1;
+            @(posedge clk);
+            start_edge_trig <= 1'b0;
+
+            wait (frame_tx_done);
+            @(posedge clk);
+            $fclose(fd_out);
+            fd_out = 0;
+            $display("frame %0d: %0d bytes -> %s/edge_out_%0d.mem", k, n_bytes, vec_dir, k);
+            repeat (100) @(posedge clk);
+        end
+
+        $finish;
+    end
+
+endmodule
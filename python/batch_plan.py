@@ -0,0 +1,261 @@
+# batch_plan.py
+"""
+Headless batch planning: a directory of source images -> STM command files, on a process pool.
+
+Each image goes through the offline part of a GUI job (resize, process_and_save edge stage,
+run_pipeline path planning); nothing is sent to the hardware. Per image, <out>/<name>/ receives
+the stage PNGs, commands.txt and pipeline.log (the pipeline's printed summary); the batch writes
+<out>/summary.csv and prints the same table.
+
+Usage (from the python/ directory):
+    python batch_plan.py photos/ --out plans/                   # one worker per core
+    python batch_plan.py photos/ --out plans/ --workers 4 --params jobs.json --trace
+    python batch_plan.py photos/ --out plans/ --cache              # reuse stages of earlier runs (CACHE_DIR)
+
+Per-job parameters (--params): a JSON object whose "default" entry applies to every image and whose
+other keys are file names or glob patterns with overrides, applied in file order:
+    {"default": {"contour_mode": "centerline", "plan_strokes": true},
+     "portrait_*.jpg": {"canny_low": 30, "canny_high": 90, "epsilon_mm": 0.5}}
+Keys: size ([w, h] or null = keep), the process_and_save filter settings (EDGE_PARAMS),
+improve_time_s, contour_mode, plan_strokes and any PipelineParams field. Nothing is read from
+the config.py globals once a job is built, so jobs with different settings can share a pool.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import csv
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import W, H, CONTOUR_MODE, STROKE_PLAN, TOUR_IMPROVE_TIME_S, CACHE_DIR, CACHE_MAX_MB, EDGE_PARAMS
+from image_processing.filtered_hex_img_gen import process_and_save
+from io_utils import estimate_plot_time
+from main_pipeline import PipelineParams, run_pipeline
+from pipeline_cache import cache_key, make_cache
+from pipeline_trace import make_tracer
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+SUMMARY_FIELDS = ["name", "status", "width", "height", "edge_pixels", "commands", "pen_lifts",
+                  "draw_mm", "travel_mm", "est_plot_s", "wall_s", "cpu_s", "error"]
+
+
+class BatchJob(NamedTuple):
+    name: str
+    image_path: str
+    out_dir: str
+    size: Optional[Tuple[int, int]]     # resize to (w, h) before filtering; None = keep the source size
+    edge: Dict                          # process_and_save filter settings
+    improve_time_s: float
+    contour_mode: str
+    plan_strokes: bool
+    params: PipelineParams
+    trace: bool = False
+    cache_dir: Optional[str] = None     # shared StageCache directory (None = no cache)
+
+
+def job_settings(overrides: Dict) -> Dict:
+    # Merge overrides onto the defaults; unknown keys are an error (typos would silently do nothing).
+    settings = {"size": (W, H), "improve_time_s": TOUR_IMPROVE_TIME_S, "contour_mode": CONTOUR_MODE,
+                "plan_strokes": STROKE_PLAN, **EDGE_PARAMS, **PipelineParams()._asdict()}
+    unknown = set(overrides) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown job parameter(s): {', '.join(sorted(unknown))}")
+    settings.update(overrides)
+    if settings["size"] is not None:
+        settings["size"] = tuple(int(v) for v in settings["size"])
+    return settings
+
+
+def build_jobs(image_dir: str, out_dir: str, overrides: Optional[Dict] = None, trace: bool = False,
+               cache_dir: Optional[str] = None) -> List[BatchJob]:
+    """
+    One BatchJob per image file in image_dir (sorted by name).
+
+    Args:
+        overrides: {"default": {...}, "<file name or glob>": {...}, ...} (see module docstring)
+        trace: also write a Chrome trace (trace.json) per job
+        cache_dir: pipeline_cache directory shared by all jobs
+    """
+    overrides = dict(overrides or {})
+    default = overrides.pop("default", {})
+    files = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(IMAGE_EXTS))
+    if not files:
+        raise ValueError(f"No images ({', '.join(IMAGE_EXTS)}) found in {image_dir}")
+    for pattern in overrides:
+        if not any(fnmatch.fnmatch(f, pattern) for f in files):
+            print(f"warning: --params entry '{pattern}' matches no image")
+
+    stems = [os.path.splitext(f)[0] for f in files]
+    jobs = []
+    for f, stem in zip(files, stems):
+        merged = dict(default)
+        for pattern, values in overrides.items():
+            if fnmatch.fnmatch(f, pattern):
+                merged.update(values)
+        s = job_settings(merged)
+        name = stem if stems.count(stem) == 1 else f.replace(".", "_")   # a.png + a.jpg -> a_png, a_jpg
+        jobs.append(BatchJob(
+            name=name,
+            image_path=os.path.join(image_dir, f),
+            out_dir=os.path.join(out_dir, name),
+            size=s["size"],
+            edge={k: s[k] for k in EDGE_PARAMS},
+            improve_time_s=float(s["improve_time_s"]),
+            contour_mode=s["contour_mode"],
+            plan_strokes=bool(s["plan_strokes"]),
+            params=PipelineParams(**{k: s[k] for k in PipelineParams._fields}),
+            trace=trace,
+            cache_dir=cache_dir,
+        ))
+    return jobs
+
+
+def run_job(job: BatchJob) -> Dict:
+    # Worker entry point: plan one image, return its summary row (errors are reported, not raised).
+    t0, c0 = time.perf_counter(), time.process_time()
+    row = {"name": job.name, "status": "ok", "error": ""}
+    os.makedirs(job.out_dir, exist_ok=True)
+    try:
+        with open(os.path.join(job.out_dir, "pipeline.log"), "w", encoding="utf-8") as log, \
+                contextlib.redirect_stdout(log):
+            cache = make_cache(job.cache_dir is not None, job.cache_dir, CACHE_MAX_MB)
+            edges, edge_key = None, None
+            if cache is not None:
+                with Image.open(job.image_path) as img:
+                    edge_key = cache_key("edges", np.asarray(img), img.mode, job.size, sorted(job.edge.items()))
+                edges = cache.get_edges(edge_key)
+            if edges is None:
+                src_path = job.image_path
+                if job.size is not None:
+                    with Image.open(job.image_path) as img:
+                        src_path = os.path.join(job.out_dir, "00_source.png")
+                        img.convert("RGB").resize(job.size, Image.Resampling.LANCZOS).save(src_path)
+                edges = process_and_save(src_path, out_dir=job.out_dir, idx=0, save_hex=False, **job.edge)
+                if cache is not None:
+                    cache.put_edges(edge_key, edges)
+
+            tracer = make_tracer(job.trace, job=job.name)
+            cmds, _ = run_pipeline(
+                source=edges,
+                command_path=os.path.join(job.out_dir, "commands.txt"),
+                show_visualization=False,
+                improve_time_s=job.improve_time_s,
+                tracer=tracer,
+                contour_mode=job.contour_mode,
+                plan_strokes=job.plan_strokes,
+                params=job.params,
+                cache=cache,
+            )
+            if tracer.enabled:
+                tracer.save_chrome_trace(os.path.join(job.out_dir, "trace.json"))
+                print(tracer.summary())
+
+        est = estimate_plot_time(cmds)
+        row.update(width=edges.shape[1], height=edges.shape[0], edge_pixels=int((edges > 0).sum()),
+                   commands=est["commands"], pen_lifts=est["pen_lifts"], draw_mm=round(est["draw_mm"], 1),
+                   travel_mm=round(est["travel_mm"], 1), est_plot_s=round(est["total_s"], 1))
+    except Exception as e:
+        row.update(status="error", error=f"{type(e).__name__}: {e}")
+    row["wall_s"] = round(time.perf_counter() - t0, 3)
+    row["cpu_s"] = round(time.process_time() - c0, 3)
+    return row
+
+
+def _init_worker() -> None:
+    # One process per core already; keep OpenCV from starting its own thread pool in each of them.
+    cv2.setNumThreads(1)
+
+
+def run_batch(jobs: List[BatchJob], workers: Optional[int] = None) -> List[Dict]:
+    """
+    Run jobs on a pool of `workers` processes (None = os.cpu_count(), 1 = in this process).
+    Returns the summary rows in job order.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows: Dict[str, Dict] = {}
+
+    def done(row: Dict) -> None:
+        rows[row["name"]] = row
+        msg = row["error"] if row["status"] != "ok" else f"{row['commands']} commands, ~{row['est_plot_s']:.0f} s plot"
+        print(f"[{len(rows)}/{len(jobs)}] {row['name']}: {row['status']} ({row['wall_s']:.2f}s) {msg}", flush=True)
+
+    if workers == 1:
+        _init_worker()
+        for job in jobs:
+            done(run_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker) as pool:
+            for fut in as_completed([pool.submit(run_job, job) for job in jobs]):
+                done(fut.result())
+    return [rows[job.name] for job in jobs]
+
+
+def write_summary(rows: List[Dict], path: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: row.get(k, "") for k in SUMMARY_FIELDS})
+
+
+def format_summary(rows: List[Dict], wall_s: float) -> List[str]:
+    lines = [f"{'name':<24} {'status':<6} {'size':>9} {'commands':>9} {'lifts':>6} {'draw mm':>9} "
+             f"{'plot min':>9} {'plan s':>7}"]
+    for r in rows:
+        if r["status"] != "ok":
+            lines.append(f"{r['name']:<24} {r['status']:<6} {r['error']}")
+            continue
+        lines.append(f"{r['name']:<24} {r['status']:<6} {r['width']:>4}x{r['height']:<4} {r['commands']:>9} "
+                     f"{r['pen_lifts']:>6} {r['draw_mm']:>9.0f} {r['est_plot_s'] / 60:>9.1f} {r['wall_s']:>7.2f}")
+    ok = [r for r in rows if r["status"] == "ok"]
+    cpu = sum(r["cpu_s"] for r in rows)
+    lines.append(f"{len(ok)}/{len(rows)} jobs ok, {sum(r['est_plot_s'] for r in ok) / 60:.1f} min estimated plot time; "
+                 f"planning {wall_s:.1f}s wall, {cpu:.1f}s job CPU time ({cpu / max(wall_s, 1e-9):.1f} cores busy)")
+    return lines
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("image_dir")
+    ap.add_argument("--out", default="batch_out", help="output directory")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--params", default=None, help="per-job parameter JSON (see above)")
+    ap.add_argument("--trace", action="store_true", help="write a Chrome trace per job")
+    ap.add_argument("--cache", action="store_true", help=f"reuse cached stages from {CACHE_DIR} (limit {CACHE_MAX_MB} MB)")
+    args = ap.parse_args()
+
+    overrides = {}
+    if args.params:
+        with open(args.params, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    try:
+        jobs = build_jobs(args.image_dir, args.out, overrides, trace=args.trace,
+                          cache_dir=CACHE_DIR if args.cache else None)
+    except (OSError, ValueError) as e:
+        sys.exit(f"ERROR: {e}")
+
+    os.makedirs(args.out, exist_ok=True)
+    t0 = time.perf_counter()
+    rows = run_batch(jobs, args.workers)
+    wall_s = time.perf_counter() - t0
+
+    summary_path = os.path.join(args.out, "summary.csv")
+    write_summary(rows, summary_path)
+    print()
+    print("\n".join(format_summary(rows, wall_s)))
+    print(f"Summary written to {summary_path}")
+    if any(r["status"] != "ok" for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
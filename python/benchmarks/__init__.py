@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Run from the python/ directory, e.g. `python -m benchmarks.bench_reorder`
+# Full suite with JSON baselines: `python -m benchmarks.suite --compare benchmarks/baselines/reference.json`
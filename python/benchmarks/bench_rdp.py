@@ -0,0 +1,111 @@
+# benchmarks/bench_rdp.py
+"""
+Benchmark rdp_simplify: vectorized spans vs the per-point scalar loop.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_rdp
+    python -m benchmarks.bench_rdp --sizes 10000 100000 1000000 --scalar-max 1000000
+
+Part 1 times a single long contour of N points (10^4..10^6).
+Part 2 times a list of short contours: rdp_simplify per contour vs rdp_simplify_many.
+The scalar reference is skipped above --scalar-max points (it is very slow).
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import List
+import numpy as np
+
+from image_processing.simplify import rdp_simplify, rdp_simplify_many, _perp_dist_point_to_segment
+
+
+def rdp_simplify_scalar(poly: np.ndarray, epsilon: float) -> np.ndarray:
+    # Reference: the original per-point loop.
+    n = len(poly)
+    if n <= 2:
+        return poly.copy()
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i0, i1 = stack.pop()
+        max_d, idx = -1.0, -1
+        for i in range(i0 + 1, i1):
+            d = _perp_dist_point_to_segment(poly[i], poly[i0], poly[i1])
+            if d > max_d:
+                max_d, idx = d, i
+        if max_d > epsilon and idx != -1:
+            keep[idx] = True
+            stack.append((i0, idx))
+            stack.append((idx, i1))
+    return poly[keep].copy()
+
+
+def synthetic_contour_mm(n: int, seed: int = 0, pixel_to_mm: float = 0.5) -> np.ndarray:
+    # 8-connected pixel walk with momentum, converted to mm like contour_pixels_to_mm.
+    rng = np.random.default_rng(seed)
+    turns = rng.choice([-1, 0, 0, 0, 0, 1], size=n - 1)
+    heading = np.cumsum(turns) % 8
+    steps = np.array([[1, 0], [1, 1], [0, 1], [-1, 1], [-1, 0], [-1, -1], [0, -1], [1, -1]])
+    xy = np.vstack([[0, 0], np.cumsum(steps[heading], axis=0)])
+    return (xy * pixel_to_mm).astype(np.float32)
+
+
+# (polyline, epsilon) edge cases checked against the scalar reference before timing
+REGRESSION_CASES = [
+    # float32 distance 0.1f is just above epsilon = 0.1 in float64: the middle point is kept
+    (np.array([[0, 0], [-0.5, 1.5], [-2, 0.5], [-2.5, 0]], dtype=np.float32), 0.1),
+]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--epsilon", type=float, default=1.0)
+    ap.add_argument("--scalar-max", type=int, default=100_000, help="largest N to run the scalar reference on")
+    ap.add_argument("--batch", type=int, default=5000, help="number of short contours for part 2")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print("[regression cases]")
+    for k, (poly, eps) in enumerate(REGRESSION_CASES):
+        ref, fast = rdp_simplify_scalar(poly, eps), rdp_simplify(poly, eps)
+        many = rdp_simplify_many([poly], eps)[0]
+        same = np.array_equal(ref, fast) and np.array_equal(ref, many)
+        print(f"case {k}: {len(poly)} -> {len(ref)} points, same keep mask: {same}")
+        if not same:
+            raise SystemExit(f"rdp_simplify differs from the scalar reference on regression case {k}")
+
+    print("\n[single contour]")
+    print(f"{'points':>9} {'kept':>7} {'vector (s)':>11} {'scalar (s)':>11} {'speedup':>9}  same keep mask")
+    for n in args.sizes:
+        poly = synthetic_contour_mm(n, seed=args.seed)
+        fast, t_fast = timed(rdp_simplify, poly, args.epsilon)
+        if n <= args.scalar_max:
+            ref, t_ref = timed(rdp_simplify_scalar, poly, args.epsilon)
+            same = str(np.array_equal(ref, fast))
+            print(f"{n:>9} {len(fast):>7} {t_fast:>11.3f} {t_ref:>11.2f} {t_ref / t_fast:>8.1f}x  {same}")
+        else:
+            print(f"{n:>9} {len(fast):>7} {t_fast:>11.3f} {'skipped':>11} {'-':>9}  -")
+
+    print("\n[batch of short contours]")
+    rng = np.random.default_rng(args.seed)
+    polys: List[np.ndarray] = [
+        synthetic_contour_mm(int(m), seed=args.seed + k) for k, m in enumerate(rng.integers(3, 200, size=args.batch))
+    ]
+    loop, t_loop = timed(lambda: [rdp_simplify(p, args.epsilon) for p in polys])
+    many, t_many = timed(rdp_simplify_many, polys, args.epsilon)
+    same = all(np.array_equal(a, b) for a, b in zip(loop, many))
+    total = sum(len(p) for p in polys)
+    print(f"{len(polys)} contours / {total} points: per-contour {t_loop:.3f}s, batched {t_many:.3f}s "
+          f"({t_loop / t_many:.1f}x), same output: {same}")
+
+
+if __name__ == "__main__":
+    main()
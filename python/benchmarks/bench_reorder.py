@@ -0,0 +1,81 @@
+# benchmarks/bench_reorder.py
+"""
+Benchmark greedy_reorder_contours: endpoint grid vs linear scan.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_reorder
+    python -m benchmarks.bench_reorder --sizes 1000 10000 100000 --full-scan
+
+The scan is O(n^2), so for large n it is only run for the first --scan-picks
+picks and the full time is extrapolated from the per-pick cost (each pick
+scans all remaining contours, so the total is ~n/2 times the first-pick cost).
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import List
+import numpy as np
+
+from image_processing.optimizer import greedy_reorder_contours
+
+
+def synthetic_contours(n: int, seed: int = 0) -> List[np.ndarray]:
+    # Short random-walk contours spread over a square sized for ~camera-frame density.
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(n) * 12) + 16
+    starts = rng.integers(0, side, size=(n, 2))
+    lengths = rng.integers(2, 40, size=n)
+    out = []
+    for s, m in zip(starts, lengths):
+        steps = rng.integers(-1, 2, size=(m - 1, 2))
+        out.append(np.vstack([s, s + np.cumsum(steps, axis=0)]).astype(np.int32))
+    return out
+
+
+def time_scan(contours: List[np.ndarray], max_picks: int | None) -> tuple[float, bool]:
+    # Returns (seconds, extrapolated?)
+    n = len(contours)
+    if max_picks is None or n <= max_picks:
+        t0 = time.perf_counter()
+        greedy_reorder_contours(contours, start_point=np.array([0, 0]), search="scan")
+        return time.perf_counter() - t0, False
+
+    # Time a prefix of the scan: picks k..0 over the remaining n..n-k contours.
+    sub = contours[:max_picks]
+    t0 = time.perf_counter()
+    greedy_reorder_contours(sub, start_point=np.array([0, 0]), search="scan")
+    t_sub = time.perf_counter() - t0
+    # Work is proportional to sum of remaining counts: n^2/2 vs max_picks^2/2
+    return t_sub * (n / max_picks) ** 2, True
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--scan-picks", type=int, default=2000, help="scan prefix size used for extrapolation")
+    ap.add_argument("--full-scan", action="store_true", help="always run the full O(n^2) scan")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"{'n':>8} {'grid (s)':>10} {'scan (s)':>12} {'speedup':>9}  same result")
+    for n in args.sizes:
+        contours = synthetic_contours(n, seed=args.seed)
+        start = np.array([0, 0], dtype=np.int32)
+
+        t0 = time.perf_counter()
+        ordered, dist = greedy_reorder_contours(contours, start_point=start)
+        t_grid = time.perf_counter() - t0
+
+        t_scan, estimated = time_scan(contours, None if args.full_scan else args.scan_picks)
+        if estimated:
+            same = "n/a (scan extrapolated)"
+        else:
+            ref, ref_dist = greedy_reorder_contours(contours, start_point=start, search="scan")
+            same = str(ref_dist == dist and all(a is b or np.array_equal(a, b) for a, b in zip(ref, ordered)))
+
+        scan_txt = f"~{t_scan:.2f}" if estimated else f"{t_scan:.2f}"
+        print(f"{n:>8} {t_grid:>10.3f} {scan_txt:>12} {t_scan / t_grid:>8.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
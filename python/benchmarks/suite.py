@@ -0,0 +1,232 @@
+# benchmarks/suite.py
+"""
+Benchmark suite for the image_processing / io_utils hot paths (no hardware needed).
+
+Usage (from the python/ directory):
+    python -m benchmarks.suite                                   # run, write benchmarks/baselines/latest.json
+    python -m benchmarks.suite --quick                           # sample + sizes up to 1024x1024
+    python -m benchmarks.suite --out benchmarks/baselines/ref.json
+    python -m benchmarks.suite --compare benchmarks/baselines/ref.json --tolerance 0.25
+
+Inputs:
+    sample_canny     - sample/05_canny_packed_1bpp_hex.txt (290x339, the shipped FPGA Canny output)
+    synth_WxH        - seeded synthetic edge maps (lines, circles, ellipses, polylines drawn 1px wide),
+                       176x240 (camera frame) up to 4000x4000, edge density kept roughly constant
+
+Stages timed per input (each on the previous stage's real output, as in run_pipeline):
+    load_hex_txt_to_bytes, unpack_payload_to_image, extract_contours_all, greedy_reorder_contours,
+    rdp_simplify (per contour), rdp_simplify_many (batched, as run_pipeline calls it),
+    densify_polyline_mm (per contour), build_command_sequence_from_contours_xy
+
+Each stage is repeated until --min-time seconds or --max-repeats runs; median and min are stored.
+The JSON file records the environment (Python/NumPy/OpenCV versions, platform, git revision) so
+baselines from different machines are not compared by accident. --compare uses the fastest run
+(min is less noisy than median on a busy machine) and exits with status 1 if any stage is slower
+than the baseline by more than --tolerance.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import cv2
+
+from config import BITORDER, MIN_CONTOUR_LEN_PX, PIXEL_TO_MM, STEP_MM, EPSILON_MM
+from image_processing import (extract_contours_all, greedy_reorder_contours, contour_pixels_to_mm,
+                              rdp_simplify, rdp_simplify_many, densify_polyline_mm)
+from io_utils import load_hex_txt_to_bytes, unpack_payload_to_image, build_command_sequence_from_contours_xy, write_hex_file
+
+SCHEMA = "pen-plotter-bench/1"
+SAMPLE_HEX = "sample/05_canny_packed_1bpp_hex.txt"
+SAMPLE_W, SAMPLE_H = 290, 339
+DEFAULT_SIZES = [(176, 240), (512, 512), (1024, 1024), (2000, 2000), (4000, 4000)]
+QUICK_MAX_SIDE = 1024
+DEFAULT_OUT = os.path.join("benchmarks", "baselines", "latest.json")
+
+
+def synthetic_edge_map(w: int, h: int, seed: int = 0, shapes_per_mpx: int = 1500, max_r: int = 24) -> np.ndarray:
+    # Seeded 1px-wide line art, uint8 {0,255}. Shape count scales with area and shape size is fixed,
+    # so edge density (and contours per pixel) stays roughly constant across sizes.
+    rng = np.random.default_rng(seed)
+    img = np.zeros((h, w), dtype=np.uint8)
+    n_shapes = max(8, int(shapes_per_mpx * w * h / 1e6))
+    max_r = max(4, min(max_r, min(w, h) // 4))
+    for _ in range(n_shapes):
+        kind = rng.integers(0, 4)
+        cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+        if kind == 0:
+            dx, dy = rng.integers(-2 * max_r, 2 * max_r + 1, size=2)
+            cv2.line(img, (cx, cy), (int(cx + dx), int(cy + dy)), 255, 1)
+        elif kind == 1:
+            cv2.circle(img, (cx, cy), int(rng.integers(2, max_r + 1)), 255, 1)
+        elif kind == 2:
+            axes = (int(rng.integers(2, max_r + 1)), int(rng.integers(2, max_r + 1)))
+            cv2.ellipse(img, (cx, cy), axes, float(rng.uniform(0, 180)), 0, 360, 255, 1)
+        else:
+            steps = rng.integers(-max_r // 2 - 1, max_r // 2 + 2, size=(int(rng.integers(3, 12)), 2))
+            pts = (np.array([cx, cy]) + np.cumsum(steps, axis=0)).astype(np.int32)
+            cv2.polylines(img, [pts], False, 255, 1)
+    return img
+
+
+def write_packed_hex(path: str, img255: np.ndarray) -> int:
+    # Same layout as the FPGA dump: packed 1bpp, one continuous hex string. Returns payload length.
+    payload = np.packbits(img255 > 0, bitorder=BITORDER).tobytes()
+    write_hex_file(path, payload)
+    return len(payload)
+
+
+def measure(fn: Callable[[], object], min_time: float, max_repeats: int) -> Tuple[object, Dict]:
+    # Run fn at least once, then until min_time elapsed or max_repeats reached.
+    times: List[float] = []
+    out = None
+    t_start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+        if len(times) >= max_repeats or time.perf_counter() - t_start >= min_time:
+            break
+    return out, {"median_s": statistics.median(times), "min_s": min(times), "repeats": len(times)}
+
+
+def bench_input(label: str, hex_path: str, w: int, h: int, min_time: float, max_repeats: int) -> List[Dict]:
+    results: List[Dict] = []
+
+    def run(stage: str, fn: Callable[[], object], **info) -> object:
+        out, stats = measure(fn, min_time, max_repeats)
+        results.append({"input": label, "stage": stage, "width": w, "height": h, **info, **stats})
+        print(f"  {stage:<42} {stats['median_s'] * 1e3:>10.3f} ms  (min {stats['min_s'] * 1e3:.3f}, n={stats['repeats']})")
+        return out
+
+    start = np.array([0, 0], dtype=np.int32)
+    raw = run("load_hex_txt_to_bytes", lambda: load_hex_txt_to_bytes(hex_path), bytes=os.path.getsize(hex_path))
+    payload = raw[: (w * h + 7) // 8]
+    img01 = run("unpack_payload_to_image", lambda: unpack_payload_to_image(payload, w, h, bitorder=BITORDER))
+    img255 = img01 * 255
+    contours = run("extract_contours_all",
+                   lambda: extract_contours_all(img255, min_len_px=MIN_CONTOUR_LEN_PX, retrieval=cv2.RETR_LIST),
+                   edge_pixels=int(np.count_nonzero(img01)))
+    ordered, _ = run("greedy_reorder_contours", lambda: greedy_reorder_contours(contours, start_point=start),
+                     contours=len(contours))
+    contours_mm = [contour_pixels_to_mm(c, pixel_to_mm=PIXEL_TO_MM) for c in ordered]
+    n_pts = sum(len(c) for c in contours_mm)
+    simplified = run("rdp_simplify", lambda: [rdp_simplify(c, epsilon=EPSILON_MM) for c in contours_mm],
+                     points=n_pts)
+    run("rdp_simplify_many", lambda: rdp_simplify_many(contours_mm, epsilon=EPSILON_MM), points=n_pts)
+    run("densify_polyline_mm", lambda: [densify_polyline_mm(c, step_mm=STEP_MM) for c in contours_mm],
+        points=n_pts)
+    cmds = run("build_command_sequence_from_contours_xy",
+               lambda: build_command_sequence_from_contours_xy(simplified, pen_up_z=1, pen_down_z=0),
+               points=sum(len(c) for c in simplified))
+    results[-1]["commands"] = len(cmds)
+    return results
+
+
+def environment() -> Dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "git_rev": rev,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> bool:
+    # Print current/baseline min-time ratio per (input, stage); True if no regression beyond tolerance.
+    base = {(r["input"], r["stage"]): r for r in baseline["results"]}
+    ok = True
+    print(f"\n[compare] against {baseline.get('created', '?')} (git {baseline.get('environment', {}).get('git_rev')})")
+    if baseline.get("environment", {}).get("machine") != current["environment"]["machine"]:
+        print("  warning: baseline was recorded on a different machine type")
+    print(f"  {'input':<16} {'stage':<42} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for r in current["results"]:
+        b = base.get((r["input"], r["stage"]))
+        if b is None:
+            continue
+        ratio = r["min_s"] / max(b["min_s"], 1e-9)
+        flag = ""
+        if ratio > 1.0 + tolerance:
+            flag, ok = "  REGRESSION", False
+        elif ratio < 1.0 / (1.0 + tolerance):
+            flag = "  faster"
+        print(f"  {r['input']:<16} {r['stage']:<42} {b['min_s'] * 1e3:>10.3f} {r['min_s'] * 1e3:>10.3f} "
+              f"{ratio:>6.2f}x{flag}")
+    return ok
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h or w)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=parse_size, nargs="+", default=DEFAULT_SIZES, help="synthetic sizes, e.g. 176x240 4000x4000")
+    ap.add_argument("--quick", action="store_true", help=f"only synthetic sizes up to {QUICK_MAX_SIDE}px")
+    ap.add_argument("--no-sample", action="store_true", help="skip the shipped sample input")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per stage measurement")
+    ap.add_argument("--max-repeats", type=int, default=50)
+    ap.add_argument("--out", default=DEFAULT_OUT, help="JSON results path ('' = do not write)")
+    ap.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio before flagging")
+    args = ap.parse_args()
+
+    sizes = [s for s in args.sizes if not args.quick or max(s) <= QUICK_MAX_SIDE]
+    results: List[Dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = []
+        if not args.no_sample:
+            inputs.append(("sample_canny", SAMPLE_HEX, SAMPLE_W, SAMPLE_H))
+        for w, h in sizes:
+            path = os.path.join(tmp, f"synth_{w}x{h}.txt")
+            write_packed_hex(path, synthetic_edge_map(w, h, seed=args.seed))
+            inputs.append((f"synth_{w}x{h}", path, w, h))
+
+        for label, path, w, h in inputs:
+            print(f"[{label}] {w}x{h}")
+            results += bench_input(label, path, w, h, args.min_time, args.max_repeats)
+
+    report = {
+        "schema": SCHEMA,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "params": {"seed": args.seed, "min_time_s": args.min_time, "max_repeats": args.max_repeats,
+                   "bitorder": BITORDER, "min_contour_len_px": MIN_CONTOUR_LEN_PX, "pixel_to_mm": PIXEL_TO_MM,
+                   "step_mm": STEP_MM, "epsilon_mm": EPSILON_MM},
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("schema") != SCHEMA:
+            sys.exit(f"Unknown baseline schema: {baseline.get('schema')}")
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
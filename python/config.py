@@ -4,8 +4,12 @@
 FPGA_1_PORT = ''        ### << YOUR SERIAL PORT HERE >> ###
 FPGA_2_PORT = ''        ### << YOUR SERIAL PORT HERE >> ###
 STM32_PORT = ''         ### << YOUR SERIAL PORT HERE >> ###
+STM32_PORTS = []        # several plotters for io_utils/plot_scheduler.py (empty = [STM32_PORT])
 
 BAUD = 115200           # Baud Rate (fixed)
+STM32_WINDOW = 1        # STM32 commands in flight (1 = stop-and-wait; the current firmware UART path is only reliable at 1)
+STM32_STREAMING = False # GUI: start plotting while later contours are still being planned (no preview image)
+STM32_ACK_TIMEOUT_S = 30    # a plotter silent this long fails the transfer (GUI job / run_plotter; the scheduler retries elsewhere)
 
 
 # Image dimensions and payload length
@@ -20,14 +24,45 @@ CROP_LEFT = 4   # Number of columns to crop from left
 
 # FPGA communication settings
 BITORDER = "big"    # try "little" if needed
+FPGA_EDGE_TH_HIGH = 40  # Canny TH_HIGH as built by PenPlotter_System.sv (Canny.sv default: 240); used by the FPGA model
+FPGA_TX_FORMAT = "rle"  # edge-map reply format requested from the FPGA: "raw" / "1bpp" / "rle" (boards without support reply raw)
+
+# Edge filter settings (process_and_save), shared by GUI jobs and batch_plan.py;
+# part of the edge cache key, so both produce the same cached edge maps
+EDGE_PARAMS = {"gaussian_ksize": 5, "gaussian_sigma": 1.0, "sobel_ksize": 3, "canny_low": 50, "canny_high": 150}
 
 # Contour extraction settings
 MIN_CONTOUR_LEN_PX = 2  # Minimum contour length in pixels
+CONTOUR_MODE = "contour"  # "contour" (findContours outlines) or "centerline" (skeleton trace, each stroke drawn once)
+
+# Stroke graph planning (merge polylines at shared junctions into continuous pen-down walks)
+STROKE_PLAN = False             # most useful with CONTOUR_MODE = "centerline"
+STROKE_RETRACE_MAX_PX = 10      # longest pen-down retrace allowed to save one pen lift (0 = never retrace)
+
+# Contour order optimization settings
+TOUR_IMPROVE_TIME_S = 0.3   # time budget for 2-opt/Or-opt after greedy reorder (0 = off)
+
+# Profiling settings
+PIPELINE_TRACE = False      # write per-stage timing/memory trace (Chrome trace JSON) for each GUI job
+
+# Stage cache (edge map / contour order / commands, keyed by input pixels + parameters, see pipeline_cache.py)
+PIPELINE_CACHE = True       # repeat plots of the same image skip filtering and path planning
+CACHE_DIR = "./cache"
+CACHE_MAX_MB = 256          # least recently used entries are deleted beyond this size
+
+# Plot-time estimate (machine model, see io_utils/plot_time.py; defaults match the firmware)
+PLOT_DRAW_SPEED_MM_S = 1e6 / 1500 / 20      # ARR_DRAWING at 1 MHz, STEPS_PER_MM = 20
+PLOT_TRAVEL_SPEED_MM_S = 1e6 / 1000 / 20    # ARR_TRAVEL
+PLOT_ACCEL_MM_S2 = 0        # 0 = firmware ramp (1/4 of the move, max 1200 steps); > 0 = trapezoid profile
+PLOT_Z_MOVE_S = 0.2         # servo delay per pen up/down
+PLOT_LINK_LATENCY_S = 0.004 # per-command UART round trip (USB-serial latency)
 
 # Physical conversion settings
 PIXEL_TO_MM = 0.5   # 1 pixel = 0.5 mm
 STEP_MM = 0.2       # for densification of contours
 EPSILON_MM = 1    # for RDP simplification (0.03 ~ 0.15 recommended)
+COMMAND_PEEPHOLE = True     # drop redundant commands (zero-length, in-place pen changes, collinear) before sending
+COLLINEAR_TOL_MM = 0.05     # max deviation for merging collinear moves after 0.1 mm quantization
 
 # File paths (For Testing standalone, set your own paths here)
 # RECEIVE_PATH = "./sample/05_canny_packed_1bpp_hex.txt"   # Input hex text file path
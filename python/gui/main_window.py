@@ -14,8 +14,8 @@ from io_utils.fpga_uart import FPGAUartManager
 from io_utils.stm32_uart import STM32UartManager
 
 from config import *
-from main_pipeline import run_pipeline
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QThread
+from gui.workers import PlotJobWorker
 
 class MainWindow(QMainWindow):
     def __init__(self, fpga_port, stm_port):
@@ -44,6 +44,9 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("펜 플로터 허브")
         self.setStyleSheet(style_sheets.STYLE_SHEET)
         self.upload_img_path = None
+        self.job_thread = None      # 실행 중인 작업 스레드 (QThread)
+        self.job_worker = None      # 실행 중인 작업 (PlotJobWorker)
+        self.job_bar = None         # 작업 진행률을 표시하는 로딩바
 
         if not os.path.exists('images'): os.makedirs('images')
 
@@ -363,6 +366,9 @@ class MainWindow(QMainWindow):
 
     def _apply_new_target_size(self, w: int, h: int):
         """Update TARGET_W/H and related UI based on image resolution"""
+        # 실행 중인 작업의 크기 설정이 바뀌지 않도록 작업 중에는 무시
+        if self.job_worker is not None:
+            return
         if w <= 0 or h <= 0:
             raise ValueError(f"Invalid image size: {w}x{h}")
 
@@ -378,14 +384,22 @@ class MainWindow(QMainWindow):
         self.adjustSize()
 
     def _get_next_index(self):
+        # 작업마다 실제로 기록되는 파일 기준으로 다음 번호를 고름 (이전 작업 기록 덮어쓰기 방지)
         idx = 0
-        while os.path.exists(f"images/image_{idx}.mem") or \
-                os.path.exists(f"images/filter_{idx}.mem"):
+        while any(os.path.exists(p) for p in (
+                f"images/edges_{idx}.frame",
+                f"images/out_commands_{idx}.txt",
+                f"images/source_{idx}.png",
+                f"images/filter_{idx}.mem",
+                f"images/image_{idx}.mem")):
             idx += 1
         return idx
 
     def on_tab_changed(self, index):
         """탭이 바뀔 때마다 실행되는 제어 로직"""
+        # 작업 중에는 수신 중단/버튼 초기화를 하지 않음 (취소는 버튼으로만)
+        if self.job_worker is not None:
+            return
         self.fpga_manager.is_receiving = False
         # 버튼이 항상 표시되도록 강제 설정
         self.btn_start.setVisible(True)
@@ -440,6 +454,13 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "오류", f"이미지 로드 실패: {e}")
 
     def process_and_start(self):
+        # 작업 실행 중에는 같은 버튼이 취소 버튼으로 동작
+        if self.job_worker is not None:
+            self.btn_start.setEnabled(False)
+            self.btn_start.setText("취소 중...")
+            self.job_worker.cancel()
+            return
+
         # 현재 탭에 맞는 로딩바 선택 및 표시
         current_tab = self.tabs.currentIndex()
         if current_tab == 0:
@@ -455,156 +476,121 @@ class MainWindow(QMainWindow):
         current_bar.setVisible(True)
         self.update_progress(0, "준비 중", current_bar)
         
-        self.btn_start.setEnabled(False)
-        self.btn_start.setText("처리 중...")
-        QApplication.processEvents()
-        
-        idx = 0
-        while os.path.exists(f"images/image_{idx}.mem"):
-            idx += 1
+        idx = self._get_next_index()
 
         paths = {
             'mem': f"images/image_{idx}.mem",
-            'filtered': f"images/05_canny_packed_1bpp_hex_{idx}.txt",
             'binary': f"images/filtered_{idx}_binary.txt",
             'source': f"images/source_{idx}.png",
-            'commands': f"images/out_commands_{idx}.txt"
+            'edges': f"images/edges_{idx}.frame",
+            'commands': f"images/out_commands_{idx}.txt",
+            'trace': f"images/trace_{idx}.json"
         }
 
+        # 입력 이미지는 GUI 스레드에서 미리 준비 (QImage/캔버스는 작업 스레드에서 접근 금지)
+        source_img, camera_size = None, None
         try:
-            # 카메라 탭인 경우 먼저 FPGA에서 데이터 수신
-            if self.tabs.currentIndex() == 2:
-                self.update_progress(5, "FPGA 트리거 송신", current_bar)
-                self.label_camera_status.setText("📷 FPGA 트리거 송신 및 수신 대기 중...")
-                QApplication.processEvents()
-                
-                save_path = f"images/filter_{idx}.mem"
-                
-                success = self.fpga_manager.trigger_and_receive_mode(
-                    save_path,
-                    lambda p: self.label_camera_status.setText(f"데이터 수신 중... {p}%"),
-                    target_size=(self.TARGET_W * self.TARGET_H)
-                )
-                
-                if not success:
-                    if not self.fpga_manager.is_receiving:
-                        raise Exception("수신이 중단되었습니다.")
-                    else:
-                        raise Exception("수신 실패 (타임아웃 또는 보드 무응답)")
-                
-                # 수신된 데이터를 이미지로 변환하여 표시
-                with open(save_path, 'r') as f:
-                    hex_data = f.read().split()
-                pixels = [(int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)) for h in hex_data]
-                img = Image.new("RGB", (self.TARGET_W, self.TARGET_H))
-                img.putdata(pixels)
-                
-                from PIL.ImageQt import ImageQt
-                qimg = ImageQt(img)
-                pixmap = QPixmap.fromImage(qimg).scaled(self.DISPLAY_W, self.DISPLAY_H, Qt.AspectRatioMode.KeepAspectRatio)
-                self.label_camera_status.setPixmap(pixmap)
-                
-            self.update_progress(10, "이미지 로딩", current_bar)
-            
-            # 현재 선택된 탭에 따라 이미지 소스 가져오기
-            if self.tabs.currentIndex() == 0:
+            if current_tab == 0:
                 if not self.upload_img_path:
                     raise Exception("이미지를 먼저 로드하세요.")
-                img = Image.open(self.upload_img_path)
-            elif self.tabs.currentIndex() == 1:
+                source_img = Image.open(self.upload_img_path)
+                source_img.load()
+            elif current_tab == 1:
                 qimg = self.paint_canvas.get_image()
                 ptr = qimg.bits()
                 ptr.setsize(qimg.height() * qimg.width() * 4)
-                img = Image.frombuffer("RGBA", (qimg.width(), qimg.height()), ptr, 'raw', "RGBA", 0, 1).convert("RGB")
-            elif self.tabs.currentIndex() == 2:
-                # 카메라 탭의 경우 이미 위에서 img 생성됨
-                pass
-
-            self.update_progress(20, "리사이징", current_bar)
-            print(f"이미지 리사이징 중: {self.TARGET_W}*{self.TARGET_H} -> 176*240")
-            img_resized = img.resize((176, 240), Image.Resampling.LANCZOS)
-            img_resized.save(paths['source'])
-
-            self.update_progress(35, "필터 처리", current_bar)
-            self.btn_start.setText("이미지 처리 중...")
-            QApplication.processEvents()
-
-            from image_processing.filtered_hex_img_gen import process_and_save
-            process_and_save(
-                paths['source'],
-                out_dir="images",
-                idx=idx,
-                gaussian_ksize=5,
-                gaussian_sigma=1.0,
-                sobel_ksize=3,
-                canny_low=50,
-                canny_high=150,
-                hex_mode="stream",
-                save_packed_1bpp=True,
-            )
-
-            self.update_progress(55, "경로 최적화", current_bar)
-            if os.path.exists(paths['filtered']):
-                self.btn_start.setText("경로 최적화 중...")
-                QApplication.processEvents()
-
-                combined_arr = run_pipeline(
-                    w=self.TARGET_W,
-                    h=self.TARGET_H,
-                    receive_path=paths['filtered'],
-                    command_path=paths['commands']
-                )
-
-                self.update_progress(75, "결과 생성", current_bar)
-                if combined_arr is not None:
-                    import cv2
-                    from PyQt6.QtGui import QImage
-
-                    rgb_image = cv2.cvtColor(combined_arr, cv2.COLOR_BGR2RGB)
-                    h, w, ch = rgb_image.shape
-                    bytes_per_line = ch * w
-                    qt_img = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-
-                    self.label_result.setPixmap(QPixmap.fromImage(qt_img).scaled(
-                        self.label_result.width() - 40,
-                        self.label_result.height() - 40,
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation
-                    ))
-                    self.label_result.setText("")
-            else:
-                raise Exception("이미지 처리 결과 파일(.txt)을 찾을 수 없습니다.")
-
-            self.update_progress(85, "플로팅 전송", current_bar)
-            if os.path.exists(paths['commands']):
-                self.btn_start.setText("STM32 플로팅 준비 중...")
-                QApplication.processEvents()
-
-                def stm_cb(p):
-                    # STM 전송 진행률을 85%~100% 범위로 매핑
-                    mapped_progress = 85 + int(p * 0.15)
-                    self.update_progress(mapped_progress, f"플로팅 전송", current_bar)
-                    self.btn_start.setText(f"STM32 플로팅 중... {p}%")
-                    QApplication.processEvents()
-
-                stm_success = self.stm_manager.send_coordinates_file(paths['commands'], stm_cb)
-
-                if stm_success:
-                    self.update_progress(100, "완료", current_bar)
-                    StatusDialog("SUCCESS", "플로팅 완료!", self).exec()
-
+                source_img = Image.frombuffer("RGBA", (qimg.width(), qimg.height()), ptr, 'raw', "RGBA", 0, 1).convert("RGB")
+            elif current_tab == 2:
+                camera_size = (self.TARGET_W, self.TARGET_H)
         except Exception as e:
             current_bar.setVisible(False)
             QMessageBox.critical(self, "오류", str(e))
-        
-        finally:
-            # 작업 완료 후 로딩바 숨김 및 버튼 복구
-            QTimer.singleShot(1000, lambda: current_bar.setVisible(False))
-            
-            # 버튼 상태 복구 (실종 방지)
-            self.btn_start.setEnabled(True)
-            self.btn_start.setText("전송 및 플로팅 시작")
-            self.btn_start.setVisible(True)  # 명시적으로 표시
-            self.btn_start.show()  # show() 메서드도 호출
-            self.btn_start.raise_()  # 위젯을 최상위로 올림
-            QApplication.processEvents()
\ No newline at end of file
+            return
+
+        self.job_bar = current_bar
+        self.btn_start.setText("작업 취소")
+        self.tabs.tabBar().setEnabled(False)    # 작업 중 탭 전환 방지
+
+        # 작업 스레드 구성: 진행 상황은 시그널로만 GUI에 전달
+        self.job_thread = QThread(self)
+        self.job_worker = PlotJobWorker(self.fpga_manager, self.stm_manager, paths, idx,
+                                        source_img=source_img, camera_size=camera_size)
+        self.job_worker.moveToThread(self.job_thread)
+
+        self.job_thread.started.connect(self.job_worker.run)
+        self.job_worker.progress.connect(self._on_job_progress)
+        self.job_worker.status.connect(self._on_job_status)
+        self.job_worker.camera_status.connect(self.label_camera_status.setText)
+        self.job_worker.camera_image.connect(self._on_camera_image)
+        self.job_worker.result_image.connect(self._on_result_image)
+        self.job_worker.finished.connect(self._on_job_finished)
+        self.job_worker.finished.connect(self.job_thread.quit)
+        self.job_thread.finished.connect(self.job_worker.deleteLater)
+        self.job_thread.finished.connect(self.job_thread.deleteLater)
+
+        self.job_thread.start()
+
+    def _on_job_progress(self, value, message):
+        self.update_progress(value, message, self.job_bar)
+
+    def _on_job_status(self, text):
+        # 취소 요청 이후에는 버튼 문구를 덮어쓰지 않음
+        if self.job_worker is not None and not self.job_worker.is_cancelled():
+            self.btn_start.setText(f"작업 취소 ({text})")
+
+    def _on_camera_image(self, img):
+        from PIL.ImageQt import ImageQt
+        qimg = ImageQt(img)
+        pixmap = QPixmap.fromImage(qimg).scaled(self.DISPLAY_W, self.DISPLAY_H, Qt.AspectRatioMode.KeepAspectRatio)
+        self.label_camera_status.setPixmap(pixmap)
+
+    def _on_result_image(self, combined_arr):
+        import cv2
+
+        rgb_image = cv2.cvtColor(combined_arr, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_image.shape
+        bytes_per_line = ch * w
+        qt_img = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
+
+        self.label_result.setPixmap(QPixmap.fromImage(qt_img).scaled(
+            self.label_result.width() - 40,
+            self.label_result.height() - 40,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        ))
+        self.label_result.setText("")
+
+    def _on_job_finished(self, success, message):
+        current_bar = self.job_bar
+        cancelled = self.job_worker is not None and self.job_worker.is_cancelled()
+        self.job_worker = None
+        self.job_thread = None
+        self.tabs.tabBar().setEnabled(True)
+
+        if success:
+            StatusDialog("SUCCESS", message, self).exec()
+        elif cancelled:
+            # 사용자가 요청한 취소는 오류가 아니므로 안내만 표시
+            current_bar.setVisible(False)
+            StatusDialog("CANCELLED", message, self).exec()
+        else:
+            current_bar.setVisible(False)
+            QMessageBox.critical(self, "오류", message)
+
+        # 작업 완료 후 로딩바 숨김 및 버튼 복구
+        QTimer.singleShot(1000, lambda: current_bar.setVisible(False))
+
+        # 버튼 상태 복구 (실종 방지)
+        self.btn_start.setEnabled(True)
+        self.btn_start.setText("전송 및 플로팅 시작")
+        self.btn_start.setVisible(True)  # 명시적으로 표시
+        self.btn_start.show()  # show() 메서드도 호출
+        self.btn_start.raise_()  # 위젯을 최상위로 올림
+
+    def closeEvent(self, event):
+        # 창을 닫을 때 실행 중인 작업을 취소하고 스레드 종료 대기
+        if self.job_worker is not None:
+            self.job_worker.cancel()
+            self.job_thread.quit()
+            self.job_thread.wait(3000)
+        super().closeEvent(event)
@@ -0,0 +1,196 @@
+import threading
+
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+from PIL import Image
+
+from config import STM32_WINDOW, STM32_STREAMING, STM32_ACK_TIMEOUT_S, PIPELINE_TRACE, PIPELINE_CACHE, CACHE_DIR, CACHE_MAX_MB, \
+    EDGE_PARAMS
+from io_utils.frame_store import write_frame, FMT_1BPP
+from io_utils.hex_codec import read_hex_file
+from main_pipeline import run_pipeline, iter_pipeline_commands
+from pipeline_cache import cache_key, make_cache
+from pipeline_trace import make_tracer
+
+FRAME_SIZE = (176, 240)     # FPGA 프레임 크기 (W, H)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class PlotJobWorker(QObject):
+    """
+    FPGA 수신 -> 필터 처리 -> 경로 최적화 -> STM32 전송을 작업 스레드에서 실행.
+    GUI 갱신은 모두 시그널로만 전달하고, cancel()로 언제든 중단할 수 있다.
+
+    Usage:
+        thread = QThread(); worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+    """
+    progress = pyqtSignal(int, str)         # (0-100, 단계 메시지)
+    status = pyqtSignal(str)                # 시작 버튼에 표시할 상태 문구
+    camera_status = pyqtSignal(str)         # 카메라 탭 상태 문구
+    camera_image = pyqtSignal(object)       # 수신한 카메라 프레임 (PIL Image)
+    result_image = pyqtSignal(object)       # 시각화 결과 (BGR ndarray)
+    finished = pyqtSignal(bool, str)        # (성공 여부, 메시지)
+
+    def __init__(self, fpga_manager, stm_manager, paths, idx, source_img=None, camera_size=None):
+        super().__init__()
+        self.fpga_manager = fpga_manager
+        self.stm_manager = stm_manager
+        self.paths = paths
+        self.idx = idx
+        self.source_img = source_img        # 이미지/스케치 탭: PIL Image (GUI 스레드에서 미리 변환)
+        self.camera_size = camera_size      # 카메라 탭: (W, H), 이 경우 FPGA에서 먼저 수신
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+        self.fpga_manager.is_receiving = False
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def _check_cancel(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def run(self):
+        try:
+            img = self.source_img
+            if self.camera_size is not None:
+                img = self._receive_camera_frame()
+
+            self._check_cancel()
+            cache = make_cache(PIPELINE_CACHE, CACHE_DIR, CACHE_MAX_MB)
+            edges, edge_key = None, None
+            if cache is not None:
+                # 같은 원본 픽셀 + 같은 크기/필터 설정이면 리사이징과 필터 단계를 건너뜀
+                edge_key = cache_key("edges", np.asarray(img), img.mode, FRAME_SIZE, sorted(EDGE_PARAMS.items()))
+                edges = cache.get_edges(edge_key)
+            if edges is None:
+                self.progress.emit(20, "리사이징")
+                print(f"이미지 리사이징 중: {img.size[0]}*{img.size[1]} -> {FRAME_SIZE[0]}*{FRAME_SIZE[1]}")
+                img_resized = img.resize(FRAME_SIZE, Image.Resampling.LANCZOS)
+                img_resized.save(self.paths['source'])
+
+                self._check_cancel()
+                self.progress.emit(35, "필터 처리")
+                self.status.emit("이미지 처리 중...")
+                from image_processing.filtered_hex_img_gen import process_and_save
+                edges = process_and_save(
+                    self.paths['source'],
+                    out_dir="images",
+                    idx=self.idx,
+                    save_hex=False,     # 엣지 맵은 메모리로 바로 전달
+                    **EDGE_PARAMS,
+                )
+                if cache is not None:
+                    cache.put_edges(edge_key, edges)
+            else:
+                self.progress.emit(35, "필터 처리 (캐시)")
+                print("캐시된 엣지 맵 사용: 리사이징/필터 단계 생략")
+            # 재생/검증용으로 엣지 맵을 바이너리 프레임(1bpp)으로 보관
+            write_frame(self.paths['edges'], edges, FMT_1BPP)
+
+            self._check_cancel()
+            if STM32_STREAMING:
+                self._plot_streaming(edges, cache)
+                return
+
+            self.progress.emit(55, "경로 최적화")
+            self.status.emit("경로 최적화 중...")
+            # 메모리 내 파이프라인: 엣지 맵 -> 명령 리스트 (명령 파일은 기록용으로만 저장)
+            tracer = make_tracer(PIPELINE_TRACE, job=f"job_{self.idx}")
+            cmds, combined_arr = run_pipeline(source=edges, command_path=self.paths['commands'], tracer=tracer,
+                                              cache=cache)
+            if cache is not None:
+                print(cache.stats())
+            if tracer.enabled and self.paths.get('trace'):
+                # chrome://tracing 또는 Perfetto 에서 단계별 시간/메모리 확인
+                tracer.save_chrome_trace(self.paths['trace'])
+                print(tracer.summary())
+
+            self.progress.emit(75, "결과 생성")
+            if combined_arr is not None:
+                self.result_image.emit(combined_arr)
+
+            self._check_cancel()
+            self.progress.emit(85, "플로팅 전송")
+            if not cmds:
+                self.finished.emit(False, "전송할 명령이 없습니다.")
+                return
+            self.status.emit("STM32 플로팅 준비 중...")
+
+            def stm_cb(p):
+                # STM 전송 진행률을 85%~100% 범위로 매핑
+                self.progress.emit(85 + int(p * 0.15), "플로팅 전송")
+                self.status.emit(f"STM32 플로팅 중... {p}%")
+
+            stm_success = self.stm_manager.send_commands(
+                cmds, stm_cb, window=STM32_WINDOW, ack_timeout=STM32_ACK_TIMEOUT_S, cancel_event=self._cancel
+            )
+            self._check_cancel()
+            if not stm_success:
+                self.finished.emit(False, "STM32 전송 실패")
+                return
+
+            self.progress.emit(100, "완료")
+            self.finished.emit(True, "플로팅 완료!")
+
+        except JobCancelled:
+            self.finished.emit(False, "작업이 취소되었습니다.")
+        except Exception as e:
+            if self._cancel.is_set():
+                self.finished.emit(False, "작업이 취소되었습니다.")
+            else:
+                self.finished.emit(False, str(e))
+
+    def _plot_streaming(self, edges, cache=None):
+        # 스트리밍 모드: 경로 계획과 STM32 전송을 겹쳐서 실행 (미리보기 이미지 없음)
+        self.progress.emit(55, "플로팅 전송")
+        self.status.emit("경로 계획 + STM32 플로팅 중...")
+
+        def stm_cb(p):
+            # 전체 명령 수는 계획이 끝나야 알 수 있으므로 그 이후부터 55%~100% 로 표시
+            self.progress.emit(55 + int(p * 0.45), "플로팅 전송")
+            self.status.emit(f"STM32 플로팅 중... {p}%")
+
+        stream = iter_pipeline_commands(source=edges, command_path=self.paths['commands'], cache=cache)
+        stm_success = self.stm_manager.send_stream(
+            stream, stm_cb, window=STM32_WINDOW, ack_timeout=STM32_ACK_TIMEOUT_S, cancel_event=self._cancel
+        )
+        self._check_cancel()
+        if not stm_success:
+            self.finished.emit(False, "STM32 전송 실패")
+            return
+        self.progress.emit(100, "완료")
+        self.finished.emit(True, "플로팅 완료!")
+
+    def _receive_camera_frame(self):
+        # 카메라 탭: FPGA 트리거 송신 후 프레임 수신
+        w, h = self.camera_size
+        self.progress.emit(5, "FPGA 트리거 송신")
+        self.camera_status.emit("📷 FPGA 트리거 송신 및 수신 대기 중...")
+
+        save_path = f"images/filter_{self.idx}.mem"
+        success = self.fpga_manager.trigger_and_receive_mode(
+            save_path,
+            lambda p: self.camera_status.emit(f"데이터 수신 중... {p}%"),
+            target_size=(w * h)
+        )
+        if not success:
+            if not self.fpga_manager.is_receiving:
+                raise Exception("수신이 중단되었습니다.")
+            else:
+                raise Exception("수신 실패 (타임아웃 또는 보드 무응답)")
+
+        # 수신된 데이터를 이미지로 변환하여 표시 (픽셀당 1바이트 엣지맵, RGB888 이면 컬러)
+        data = read_hex_file(save_path)
+        mode = "RGB" if len(data) >= w * h * 3 else "L"
+        img = Image.frombytes(mode, (w, h), data[:w * h * len(mode)]).convert("RGB")
+        self.camera_image.emit(img)
+
+        self.progress.emit(10, "이미지 로딩")
+        return img
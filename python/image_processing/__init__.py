@@ -1,19 +1,32 @@
 # contour_optimization/__init__.py
 from .contour_gen import extract_contours_all, draw_contours_overlay, count_points
-from .optimizer import greedy_reorder_contours, total_penup_distance
+from .optimizer import greedy_reorder_contours, improve_contour_order, total_penup_distance
 from .visualizer import draw_contours_and_penup_links, print_contour_paths
-from .segment import densify_polyline_mm, contour_pixels_to_mm
-from .simplify import rdp_simplify
+from .segment import densify_polyline_mm, count_densified_points_mm, contour_pixels_to_mm
+from .simplify import rdp_simplify, rdp_simplify_many
+from .skeleton import skeletonize, extract_centerlines
+from .stroke_graph import build_stroke_graph, plan_pen_down_walks
+from .fpga_edge_model import FPGAEdgeModel, fpga_edge_reply, rgb888_to_rgb565
 
 __all__ = [
     "extract_contours_all",
     "draw_contours_overlay",
     "count_points",
     "greedy_reorder_contours",
+    "improve_contour_order",
     "total_penup_distance",
     "draw_contours_and_penup_links",
     "print_contour_paths",
     "densify_polyline_mm",
+    "count_densified_points_mm",
     "contour_pixels_to_mm",
     "rdp_simplify",
+    "rdp_simplify_many",
+    "skeletonize",
+    "extract_centerlines",
+    "build_stroke_graph",
+    "plan_pen_down_walks",
+    "FPGAEdgeModel",
+    "fpga_edge_reply",
+    "rgb888_to_rgb565",
 ]
\ No newline at end of file
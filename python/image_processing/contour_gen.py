@@ -2,6 +2,8 @@ from typing import List
 import numpy as np
 import cv2
 
+from .skeleton import extract_centerlines
+
 # Deprecated
 # def extract_external_contours(img255: np.ndarray, min_len_px: int) -> List[np.ndarray]:
 #     # Extract external contours only and return each contour as an (N, 2) array.
@@ -26,12 +28,19 @@ def extract_contours_all(
     min_len_px: int,
     method: int = cv2.CHAIN_APPROX_NONE,
     retrieval: int = cv2.RETR_LIST,
+    mode: str = "contour",
 ) -> List[np.ndarray]:
     # Extract all visible contours (not only external) and return each contour as an (N, 2) array.
+    # mode="contour": cv2.findContours boundaries (a 1-pixel stroke is walked on both sides)
+    # mode="centerline": skeletonize and trace open centerline polylines (each stroke once)
     if img255.ndim != 2:
         raise ValueError(f"Expected a single-channel image, got shape={img255.shape}")
     if img255.dtype != np.uint8:
         raise ValueError("img255 must be uint8 with values {0,255}.")
+    if mode == "centerline":
+        return extract_centerlines(img255, min_len_px)
+    if mode != "contour":
+        raise ValueError(f"Unknown contour mode: {mode!r} (use 'contour' or 'centerline')")
 
     result = cv2.findContours(img255.copy(), retrieval, method)
     contours = result[0] if len(result) == 2 else result[1]
@@ -2,6 +2,8 @@ import os
 import cv2
 import numpy as np
 
+from io_utils.hex_codec import write_hex_file
+
 
 def save_hex_txt_bytes(
     data: bytes,
@@ -14,19 +16,14 @@ def save_hex_txt_bytes(
     - stream: continuous hex string (e.g., "AA00FF...")
     - tokens: space-separated tokens (e.g., "AA 00 FF ...")
     """
-    hex_str = data.hex()
-    if upper:
-        hex_str = hex_str.upper()
-
     if mode == "stream":
-        text = hex_str
+        sep = ""
     elif mode == "tokens":
-        text = " ".join(hex_str[i:i+2] for i in range(0, len(hex_str), 2))
+        sep = " "
     else:
         raise ValueError("mode must be 'stream' or 'tokens'")
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(text)
+    write_hex_file(path, data, sep=sep, upper=upper)
 
 
 def process_and_save(
@@ -40,7 +37,12 @@ def process_and_save(
     canny_high: int = 150,
     hex_mode: str = "stream",      # "stream" or "tokens"
     save_packed_1bpp: bool = True, # optional: 8 pixels -> 1 byte packing
-) -> None:
+    save_hex: bool = True,         # False: skip the hex .txt dumps (in-memory pipeline)
+) -> np.ndarray:
+    """
+    Gray -> Gaussian -> Sobel -> Canny on an image file; saves stage PNGs
+    (and hex dumps if save_hex) and returns the Canny edge map, uint8 {0,255}.
+    """
     # Ensure output directory exists
     os.makedirs(out_dir, exist_ok=True)
 
@@ -74,11 +76,12 @@ def process_and_save(
 
     # Save per-pixel hex txt (0x00 or 0xFF per pixel)
     # This is a raw raster dump: length = H*W bytes
-    edges_bytes = edges.tobytes()
-    save_hex_txt_bytes(edges_bytes, os.path.join(out_dir, f"05_canny_pixels_hex_{idx}.txt"), mode=hex_mode)
+    if save_hex:
+        edges_bytes = edges.tobytes()
+        save_hex_txt_bytes(edges_bytes, os.path.join(out_dir, f"05_canny_pixels_hex_{idx}.txt"), mode=hex_mode)
 
     # Optional: save packed 1bpp (8 pixels -> 1 byte), matching your FPGA/PC unpacking style
-    if save_packed_1bpp:
+    if save_hex and save_packed_1bpp:
         # Convert to 0/1 first
         edges01 = (edges > 0).astype(np.uint8)
 
@@ -89,9 +92,11 @@ def process_and_save(
 
     print("Saved outputs to:", os.path.abspath(out_dir))
     print(f"PNG: 01_gray_{idx}.png / 02_gaussian_{idx}.png / 03_sobel_mag_{idx}.png / 04_canny_{idx}.png")
-    print(f"HEX (per-pixel bytes): 05_canny_pixels_hex_{idx}.txt")
-    if save_packed_1bpp:
+    if save_hex:
+        print(f"HEX (per-pixel bytes): 05_canny_pixels_hex_{idx}.txt")
+    if save_hex and save_packed_1bpp:
         print(f"HEX (packed 1bpp): 05_canny_packed_1bpp_hex_{idx}.txt")
+    return edges
 
 if __name__ == "__main__":
     IMAGE_PATH = "images/hello.png"  # change this
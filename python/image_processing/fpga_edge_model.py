@@ -0,0 +1,253 @@
+# image_processing/fpga_edge_model.py
+"""
+Bit-exact NumPy model of the FPGA edge path (fpga/src/edge_detection, as built by PenPlotter_System.sv):
+the bytes the board sends back after a 0xAA image upload or a 0xBB camera capture, without the board.
+
+    model = FPGAEdgeModel()
+    reply = model.process_image(img_obj)        # (H, W) uint8 {0, 255}, same as send_image_to_fpga receives
+
+What the RTL does, and the model reproduces:
+    UART_RX_CMD      RGB888 -> RGB565 by truncation (camera frames are RGB565 already)
+    Edge_Controller  RGB565 -> RGB888 by bit replication; streams pixels 0 .. N-2 (the last pixel is never sent)
+    Grayscale        (77 R + 150 G + 29 B) >> 8 (the +30/-30 brightness terms cancel)
+    Gaussian_Blur    [1 2 1; 2 4 2; 1 2 1] >> 4; the last two outputs of a frame repeat the third-to-last
+    Canny            own 3x3 Sobel on the blurred stream (Sobel.sv is not in the data path),
+                     mag = min((|gx| + |gy|) >> 1, 255), direction from |gx| vs 2|gy|,
+                     NMS on a magnitude window whose direction is taken one pixel to the right,
+                     single threshold mag >= TH_HIGH (TH_LOW is unused: there is no hysteresis)
+    sync delay       o_de is a fixed 2*W + 6 cycle delay, so the frame buffer is written 2*W + 2 pixels
+                     ahead of the data; writing stops when the controller returns to IDLE, which leaves
+                     the last 2*W + 12 bytes of the reply at their power-on value (0)
+The line buffers are plain W-sample delays with no row reset, so the rows above the first one (and the
+pixels left of column 0) come from the tail of the previous frame; pass it as `prev` (None = first frame
+after reset, i.e. zeros). Together with the write-ahead this is why the first rows and columns of a reply
+are noise (config.CROP_TOP / CROP_LEFT).
+
+Golden compare against the RTL (fpga/sim/tb_edge/tb_Edge_System.sv):
+    python -m image_processing.fpga_edge_model vectors <dir> img1.png img2.png ...   # edge_in_<k>.mem
+    (run tb_Edge_System in Vivado: make sim TOP=Edge_System, +VEC_DIR=<dir> +FRAMES=<n>)
+    python -m image_processing.fpga_edge_model compare <dir>                       # vs edge_out_<k>.mem
+"""
+from __future__ import annotations
+import os
+from typing import Optional
+import numpy as np
+from PIL import Image
+
+from config import W, H, FPGA_EDGE_TH_HIGH
+from io_utils.hex_codec import write_hex_file, decode_hex_words
+
+
+def rgb888_to_rgb565(rgb: np.ndarray) -> np.ndarray:
+    # UART_RX_CMD: {r[7:3], g[7:2], b[7:3]}
+    rgb = np.asarray(rgb, dtype=np.uint16)
+    return (rgb[..., 0] >> 3 << 11) | (rgb[..., 1] >> 2 << 5) | (rgb[..., 2] >> 3)
+
+
+def fpga_grayscale(rgb565: np.ndarray) -> np.ndarray:
+    # Edge_Controller bit replication ({r5, r5[4:2]} ...) followed by Grayscale.sv
+    v = np.asarray(rgb565, dtype=np.int32)
+    r5, g6, b5 = v >> 11, (v >> 5) & 0x3F, v & 0x1F
+    r8, g8, b8 = (r5 << 3) | (r5 >> 2), (g6 << 2) | (g6 >> 4), (b5 << 3) | (b5 >> 2)
+    return (r8 * 77 + g8 * 150 + b8 * 29) >> 8
+
+
+def _delay(a: np.ndarray, d: int) -> np.ndarray:
+    # a[i - d], zeros (register / BRAM reset value) before the start of the stream
+    out = np.zeros_like(a)
+    out[d:] = a[:len(a) - d]
+    return out
+
+
+def _window(a: np.ndarray, width: int):
+    # 3x3 line-buffer window after each sample: (p11, p12, p13, p21, p22, p23, p31, p32, p33);
+    # p33 is the newest sample, p23/p13 the samples one/two lines (width samples) earlier.
+    return tuple(_delay(a, row * width + col) for row in (2, 1, 0) for col in (2, 1, 0))
+
+
+def fpga_edge_reply(rgb565: np.ndarray, prev: Optional[np.ndarray] = None,
+                    th_high: int = FPGA_EDGE_TH_HIGH) -> np.ndarray:
+    """
+    Edge frame the FPGA sends back for one RGB565 frame.
+
+    Args:
+        rgb565: (h, w) uint16 frame as stored in the capture / PC image frame buffer
+        prev: the frame processed before this one since reset (None = first frame after reset)
+        th_high: Canny TH_HIGH parameter
+    Returns:
+        (h, w) uint8 {0, 255}, in transmit (raster) order
+    """
+    rgb565 = np.asarray(rgb565)
+    if rgb565.ndim != 2:
+        raise ValueError(f"rgb565 must be a 2-D frame, got shape {rgb565.shape}")
+    h, w = rgb565.shape
+    if w < 3 or h <= 7:
+        raise ValueError(f"frame too small for the edge pipeline: {w}x{h}")
+    if prev is not None and np.shape(prev) != rgb565.shape:
+        raise ValueError(f"prev shape {np.shape(prev)} does not match frame shape {rgb565.shape}")
+    n = w * h
+    m = n - 1                       # samples per frame in the stream
+
+    # One continuous stream: previous frame then this one (state carries over between frames)
+    x_prev = np.zeros(m, np.int32) if prev is None else fpga_grayscale(prev).reshape(-1)[:m]
+    x = np.concatenate([x_prev, fpga_grayscale(rgb565).reshape(-1)[:m]])
+
+    # Gaussian_Blur: sum register, then o_data = sum >> 4 one sample later; o_de is 3 cycles late,
+    # so the last two samples of a frame repeat the value held when the stream stops.
+    p11, p12, p13, p21, p22, p23, p31, p32, p33 = _window(x, w)
+    gauss = (p11 + 2 * p12 + p13 + 2 * p21 + 4 * p22 + 2 * p23 + p31 + 2 * p32 + p33) >> 4
+    for end in (m, 2 * m):
+        gauss[end - 2:end] = gauss[end - 3]
+
+    # Canny stage 1/2: Sobel on the blurred stream (11-bit signed, no overflow for 8-bit input)
+    p11, p12, p13, p21, p22, p23, p31, p32, p33 = _window(gauss, w)
+    gx = (p13 + 2 * p23 + p33) - (p11 + 2 * p21 + p31)
+    gy = (p31 + 2 * p32 + p33) - (p11 + 2 * p12 + p13)
+    agx, agy = np.abs(gx), np.abs(gy)
+    mag = np.minimum((agx + agy) >> 1, 255)
+    direction = np.where(agx > 2 * agy, 0,
+                np.where(agy > 2 * agx, 2,
+                np.where((gx < 0) == (gy < 0), 3, 1)))
+
+    # Canny stage 3/4: the magnitude line buffer is fed one sample late (mag_val register);
+    # center_dir is read from lb2_dir at the m23 position, i.e. the pixel right of m22.
+    mag = _delay(mag, 1)
+    m11, m12, m13, m21, m22, m23, m31, m32, m33 = _window(mag, w)
+    center_dir = _delay(_delay(direction, 1), w)
+    keep = np.select(
+        [center_dir == 0, center_dir == 1, center_dir == 2, center_dir == 3],
+        [(m22 >= m21) & (m22 >= m23), (m22 >= m13) & (m22 >= m31),
+         (m22 >= m12) & (m22 >= m32), (m22 >= m11) & (m22 >= m33)])
+    nms = np.where(keep, m22, 0)
+    final = np.where(nms >= th_high, 255, 0).astype(np.uint8)[m:]     # this frame's samples
+
+    # Sync delay: output sample i carries final[i + 2w + 2] (0 once the stream has ended)
+    ahead = 2 * w + 2
+    out_vals = np.zeros(m, np.uint8)
+    out_vals[:max(0, m - ahead)] = final[ahead:]
+
+    # Edge_Controller: o_de sample i arrives at cycle 2w + 15 + i after SEND_FRAME starts and is written
+    # to address i until the controller is back in IDLE. WAIT_EDGE_DONE always ends on its first cycle
+    # (the count is already past W*(H-7) - 100), so that is cycle n + 2; later samples go to address 0
+    # after UART_TX_Controller has read it.
+    n_written = min(m, n - 2 * w - 12)
+
+    reply = np.zeros(n, np.uint8)       # never-written addresses keep the BRAM power-on value
+    reply[:n_written] = out_vals[:n_written]
+    return reply.reshape(h, w)
+
+
+class FPGAEdgeModel:
+    """
+    Stateful stand-in for the board: consecutive frames see each other's line-buffer history,
+    like consecutive 0xAA / 0xBB requests after one reset.
+    """
+
+    def __init__(self, width: int = W, height: int = H, th_high: int = FPGA_EDGE_TH_HIGH):
+        self.width = width
+        self.height = height
+        self.th_high = th_high
+        self._prev: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        self._prev = None
+
+    def process_rgb565(self, rgb565: np.ndarray) -> np.ndarray:
+        rgb565 = np.asarray(rgb565, dtype=np.uint16)
+        if rgb565.shape != (self.height, self.width):
+            raise ValueError(f"expected a {self.width}x{self.height} frame, got shape {rgb565.shape}")
+        reply = fpga_edge_reply(rgb565, self._prev, self.th_high)
+        self._prev = rgb565
+        return reply
+
+    def process_rgb888(self, rgb: np.ndarray) -> np.ndarray:
+        # Raw 0xAA payload pixels, (H, W, 3) uint8
+        return self.process_rgb565(rgb888_to_rgb565(rgb))
+
+    def process_image(self, img_obj) -> np.ndarray:
+        # Same resize as FPGAUartManager.send_image_to_fpga
+        rgb_img = img_obj.resize((self.width, self.height), Image.Resampling.LANCZOS).convert("RGB")
+        return self.process_rgb888(np.asarray(rgb_img, dtype=np.uint8))
+
+
+# --- golden compare with the RTL testbench (fpga/sim/tb_edge) ---
+def write_rgb565_mem(path: str, rgb565: np.ndarray) -> None:
+    # $readmemh input: one 4-digit hex word per line
+    write_hex_file(path, np.asarray(rgb565, dtype=">u2").reshape(-1), word_bytes=2, per_line=1)
+
+
+def read_rgb565_mem(path: str, width: int = W, height: int = H) -> np.ndarray:
+    with open(path, "r") as f:
+        words = np.frombuffer(decode_hex_words(f.read(), 4), dtype=">u2")
+    if len(words) != width * height:
+        raise ValueError(f"{path}: {len(words)} words, expected {width * height}")
+    return words.astype(np.uint16).reshape(height, width)
+
+
+def read_reply_mem(path: str, width: int = W, height: int = H):
+    """
+    Testbench output (one byte per line, as $fwrite "%02x"): returns (values, known) where
+    `known` is False for bytes the simulator reported as X/Z (uninitialised BRAM/registers).
+    """
+    with open(path, "r") as f:
+        data, known = decode_hex_words(f.read(), 2, unknown=True)
+    if len(data) != width * height:
+        raise ValueError(f"{path}: {len(data)} bytes, expected {width * height}")
+    values = np.frombuffer(data, dtype=np.uint8)
+    return values.reshape(height, width), known.reshape(height, width)
+
+
+def write_vectors(out_dir: str, image_paths, width: int = W, height: int = H) -> int:
+    # Testbench inputs edge_in_<k>.mem (PC upload path: resize, RGB888 -> RGB565) for the given images
+    os.makedirs(out_dir, exist_ok=True)
+    for k, path in enumerate(image_paths):
+        with Image.open(path) as img:
+            rgb = np.asarray(img.resize((width, height), Image.Resampling.LANCZOS).convert("RGB"), dtype=np.uint8)
+        write_rgb565_mem(os.path.join(out_dir, f"edge_in_{k}.mem"), rgb888_to_rgb565(rgb))
+    return len(image_paths)
+
+
+def compare_vectors(vec_dir: str, width: int = W, height: int = H, th_high: int = FPGA_EDGE_TH_HIGH) -> bool:
+    """
+    Run the model over edge_in_0.mem, edge_in_1.mem, ... in order (one reset before the first frame,
+    like the testbench) and compare with the simulator's edge_out_<k>.mem. Prints one line per frame.
+    """
+    model = FPGAEdgeModel(width, height, th_high)
+    ok = True
+    k = 0
+    while os.path.exists(os.path.join(vec_dir, f"edge_in_{k}.mem")):
+        expected = model.process_rgb565(read_rgb565_mem(os.path.join(vec_dir, f"edge_in_{k}.mem"), width, height))
+        out_path = os.path.join(vec_dir, f"edge_out_{k}.mem")
+        if not os.path.exists(out_path):
+            print(f"frame {k}: no {os.path.basename(out_path)}")
+            ok = False
+            k += 1
+            continue
+        got, known = read_reply_mem(out_path, width, height)
+        diff = known & (got != expected)
+        n_x = int((~known).sum())
+        status = "OK" if not diff.any() else "MISMATCH"
+        print(f"frame {k}: {status} ({int(diff.sum())} differing bytes, {n_x} X/Z bytes not compared, "
+              f"{int((expected > 0).sum())} edge pixels)")
+        for y, x in list(zip(*np.nonzero(diff)))[:10]:
+            print(f"    ({x}, {y}): rtl {got[y, x]:02x}  model {expected[y, x]:02x}")
+        ok = ok and not diff.any()
+        k += 1
+    if k == 0:
+        print(f"No edge_in_<k>.mem vectors in {vec_dir}")
+        return False
+    return ok
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == "vectors":
+        n_frames = write_vectors(args[1], args[2:])
+        print(f"Wrote {n_frames} frame(s) to {args[1]}; run tb_Edge_System with +VEC_DIR={args[1]} +FRAMES={n_frames}")
+    elif len(args) == 2 and args[0] == "compare":
+        sys.exit(0 if compare_vectors(args[1]) else 1)
+    else:
+        print("usage: python -m image_processing.fpga_edge_model vectors <dir> <image> [<image> ...]\n"
+              "       python -m image_processing.fpga_edge_model compare <dir>")
+        sys.exit(2)
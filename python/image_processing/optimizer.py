@@ -1,4 +1,5 @@
 from __future__ import annotations
+import time
 from typing import List, Tuple, Optional
 import numpy as np
 
@@ -14,9 +15,106 @@ def euclidean(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.hypot(d[0], d[1]))
 
 
+class _EndpointGrid:
+    """
+    Uniform grid over contour endpoints for nearest-neighbour queries.
+
+    Endpoint id 2*i is the start of contour i and 2*i+1 is its end, so the
+    lowest id among equally distant candidates reproduces the tie-breaking of
+    the linear scan (lowest contour index first, keep before reverse).
+    Picked contours are removed lazily through an alive mask; the grid is
+    rebuilt over the survivors once most of it has been consumed.
+    """
+
+    def __init__(self, contours: List[np.ndarray]):
+        n = len(contours)
+        pts = np.empty((2 * n, 2), dtype=np.float32)
+        for i, c in enumerate(contours):
+            pts[2 * i] = c[0]
+            pts[2 * i + 1] = c[-1]
+        self.pts = pts
+        self.alive = np.ones(n, dtype=bool)
+        self.n_alive = n
+        self._build()
+
+    def _build(self) -> None:
+        ids = np.flatnonzero(np.repeat(self.alive, 2)).astype(np.int64)
+        p = self.pts[ids].astype(np.float64)
+        lo = p.min(axis=0)
+        span = p.max(axis=0) - lo
+
+        # Aim for about two endpoints per cell
+        area = max(float(span[0]), 1.0) * max(float(span[1]), 1.0)
+        cell = max(float(np.sqrt(2.0 * area / len(ids))), 1e-6)
+        ncx = int(span[0] // cell) + 1
+        ncy = int(span[1] // cell) + 1
+
+        cx = np.minimum((p[:, 0] - lo[0]) // cell, ncx - 1).astype(np.int64)
+        cy = np.minimum((p[:, 1] - lo[1]) // cell, ncy - 1).astype(np.int64)
+        cell_id = cy * ncx + cx
+
+        # CSR layout: ids of one grid row are contiguous, ordered by column
+        order = np.argsort(cell_id, kind="stable")
+        self.ids = ids[order]
+        self.start = np.searchsorted(cell_id[order], np.arange(ncx * ncy + 1))
+        self.lo, self.cell, self.ncx, self.ncy = lo, cell, ncx, ncy
+        self.n_built = self.n_alive
+
+    def remove(self, i: int) -> None:
+        self.alive[i] = False
+        self.n_alive -= 1
+        if 0 < self.n_alive < self.n_built // 4:
+            self._build()
+
+    def _query_square(self, cur: np.ndarray, cx: int, cy: int, r: int):
+        x0, x1 = max(cx - r, 0), min(cx + r, self.ncx - 1)
+        y0, y1 = max(cy - r, 0), min(cy + r, self.ncy - 1)
+        if x0 > x1 or y0 > y1:
+            return None
+        chunks = [
+            self.ids[self.start[row * self.ncx + x0]:self.start[row * self.ncx + x1 + 1]]
+            for row in range(y0, y1 + 1)
+        ]
+        cand = np.concatenate(chunks)
+        cand = cand[self.alive[cand >> 1]]
+        if len(cand) == 0:
+            return None
+
+        # Same float32 arithmetic as euclidean()
+        d = self.pts[cand] - cur
+        dist = np.hypot(d[:, 0], d[:, 1])
+        best_d = dist.min()
+        best_id = int(cand[dist == best_d].min())
+        return best_id, float(best_d)
+
+    def nearest(self, cur_pt: np.ndarray) -> Tuple[int, bool, float]:
+        # Return (contour index, reversed, distance) of the closest alive endpoint.
+        cur = cur_pt.astype(np.float32)
+        cx = int(np.floor((float(cur[0]) - self.lo[0]) / self.cell))
+        cy = int(np.floor((float(cur[1]) - self.lo[1]) / self.cell))
+        full_r = max(cx, self.ncx - 1 - cx, cy, self.ncy - 1 - cy)
+
+        r = 1
+        while True:
+            hit = self._query_square(cur, cx, cy, r)
+            if hit is not None:
+                best_id, best_d = hit
+                # Every point closer than r*cell lies inside the searched square;
+                # leave a margin for float32 rounding of the distances.
+                if best_d * (1.0 + 1e-5) + 1e-6 < r * self.cell or r >= full_r:
+                    return best_id >> 1, bool(best_id & 1), best_d
+                r = int((best_d * (1.0 + 1e-5) + 1e-6) // self.cell) + 1
+            elif r >= full_r:
+                raise RuntimeError("No alive endpoints left in the grid.")
+            else:
+                r *= 2
+            r = min(r, full_r)
+
+
 def greedy_reorder_contours(
     contours: List[np.ndarray],
     start_point: Optional[np.ndarray] = None,
+    search: str = "grid",
 ) -> Tuple[List[np.ndarray], float]:
     """
     Reorder contours with a greedy heuristic to minimize pen-up travel distance.
@@ -26,11 +124,15 @@ def greedy_reorder_contours(
     Args:
         contours: list of contours, each contour is an (N,2) array in pixel coords.
         start_point: optional (2,) point. If None, start at the first contour's start.
+        search: "grid" (endpoint grid index, ~O(n log n)) or "scan" (linear scan
+            per pick, O(n^2)). Both give the same order and distance.
 
     Returns:
         ordered_contours: list of contours reordered; each contour may be reversed.
         total_penup_dist: sum of pen-up distances (in pixels) between contours.
     """
+    if search not in ("grid", "scan"):
+        raise ValueError("search must be 'grid' or 'scan'")
     if not contours:
         return [], 0.0
 
@@ -38,6 +140,9 @@ def greedy_reorder_contours(
     if not remaining:
         return [], 0.0
 
+    if search == "grid":
+        return _greedy_reorder_grid(remaining, start_point)
+
     # Choose initial contour:
     # If start_point is not given, pick the longest contour as a stable starting choice.
     if start_point is None:
@@ -91,6 +196,35 @@ def greedy_reorder_contours(
     return ordered, total
 
 
+def _greedy_reorder_grid(
+    remaining: List[np.ndarray],
+    start_point: Optional[np.ndarray],
+) -> Tuple[List[np.ndarray], float]:
+    # Same greedy rule as the scan, with nearest endpoints looked up in a grid.
+    grid = _EndpointGrid(remaining)
+
+    if start_point is None:
+        idx0 = int(np.argmax([len(c) for c in remaining]))
+        grid.remove(idx0)
+        ordered = [remaining[idx0]]
+        cur_pt = remaining[idx0][-1]
+        total = 0.0
+    else:
+        ordered = []
+        cur_pt = np.asarray(start_point)
+        total = 0.0
+
+    while grid.n_alive:
+        i, rev, d = grid.nearest(cur_pt)
+        grid.remove(i)
+        nxt = remaining[i][::-1].copy() if rev else remaining[i]
+        ordered.append(nxt)
+        cur_pt = nxt[-1]
+        total += d
+
+    return ordered, total
+
+
 def total_penup_distance(contours: List[np.ndarray], start_point: Optional[np.ndarray] = None) -> float:
     # Compute pen-up distance for a given contour order (no direction changes assumed here).
     if not contours:
@@ -107,4 +241,167 @@ def total_penup_distance(contours: List[np.ndarray], start_point: Optional[np.nd
         total += euclidean(cur, s)
         cur = c[-1]
 
-    return total
\ No newline at end of file
+    return total
+
+def _tour_endpoints(
+    s0: np.ndarray, e0: np.ndarray, order: np.ndarray, rev: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Start/end points of each tour position after applying direction flags.
+    S = np.where(rev[:, None], e0[order], s0[order])
+    E = np.where(rev[:, None], s0[order], e0[order])
+    return S, E
+
+
+def _tour_penup(S: np.ndarray, E: np.ndarray, p0: np.ndarray) -> float:
+    # Pen-up distance of a tour: p0 -> first start, then each end -> next start.
+    prev = np.vstack([p0[None, :], E[:-1]])
+    d = S - prev
+    return float(np.hypot(d[:, 0], d[:, 1]).sum())
+
+
+def _dist(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    d = a - b
+    return np.hypot(d[..., 0], d[..., 1])
+
+
+def _two_opt_pass(s0, e0, order, rev, p0, deadline, eps) -> bool:
+    # Segment reversal [i..j]; reversing a segment also flips every contour in it.
+    n = len(order)
+    improved = False
+    S, E = _tour_endpoints(s0, e0, order, rev)
+    for i in range(n):
+        if time.perf_counter() > deadline:
+            break
+        a = p0 if i == 0 else E[i - 1]
+        j = np.arange(i, n)
+        has_b = j < n - 1
+        b = S[np.minimum(j + 1, n - 1)]
+
+        old = _dist(a, S[i]) + np.where(has_b, _dist(E[j], b), 0.0)
+        new = _dist(a, E[j]) + np.where(has_b, _dist(S[i], b), 0.0)
+        delta = new - old
+        k = int(np.argmin(delta))
+        if delta[k] < -eps:
+            jj = i + k
+            order[i:jj + 1] = order[i:jj + 1][::-1].copy()
+            rev[i:jj + 1] = ~rev[i:jj + 1][::-1]
+            S, E = _tour_endpoints(s0, e0, order, rev)
+            improved = True
+    return improved
+
+
+def _or_opt_pass(s0, e0, order, rev, p0, deadline, eps, max_seg_len) -> bool:
+    # Move a run of 1..max_seg_len contours to another gap, optionally reversed.
+    improved = False
+    n = len(order)
+    has_d = np.arange(n + 1) < n
+    stale = True
+    i = 0
+    while i < n:
+        if time.perf_counter() > deadline:
+            break
+        if stale:
+            S, E = _tour_endpoints(s0, e0, order, rev)
+            # Gap k sits between position k-1 (or p0) and position k (or the tour end)
+            C = np.vstack([p0[None, :], E])
+            D = np.vstack([S, S[-1:]])
+            gap_cost = np.where(has_d, _dist(C, D), 0.0)
+            stale = False
+
+        best = (-eps, None)
+        for L in range(1, max_seg_len + 1):
+            j = i + L - 1
+            if j >= n:
+                break
+            a = p0 if i == 0 else E[i - 1]
+            removal_gain = _dist(a, S[i]) + (
+                _dist(E[j], S[j + 1]) - _dist(a, S[j + 1]) if j < n - 1 else 0.0
+            )
+
+            fwd = _dist(C, S[i]) + np.where(has_d, _dist(E[j], D), 0.0) - gap_cost
+            bwd = _dist(C, E[j]) + np.where(has_d, _dist(S[i], D), 0.0) - gap_cost
+            for flip, ins in ((False, fwd), (True, bwd)):
+                ins = ins.copy()
+                ins[i:j + 2] = np.inf   # gaps touching or inside the segment
+                k = int(np.argmin(ins))
+                delta = float(ins[k] - removal_gain)
+                if delta < best[0]:
+                    best = (delta, (L, k, flip))
+
+        if best[1] is None:
+            i += 1
+            continue
+
+        L, k, flip = best[1]
+        seg_o, seg_r = order[i:i + L].copy(), rev[i:i + L].copy()
+        if flip:
+            seg_o, seg_r = seg_o[::-1], ~seg_r[::-1]
+        rest_o = np.concatenate([order[:i], order[i + L:]])
+        rest_r = np.concatenate([rev[:i], rev[i + L:]])
+        k2 = k if k < i else k - L
+        order[:] = np.concatenate([rest_o[:k2], seg_o, rest_o[k2:]])
+        rev[:] = np.concatenate([rest_r[:k2], seg_r, rest_r[k2:]])
+        stale = True
+        improved = True
+        i += 1
+    return improved
+
+
+def improve_contour_order(
+    ordered_contours: List[np.ndarray],
+    start_point: Optional[np.ndarray] = None,
+    time_budget_s: float = 0.3,
+    max_rounds: int = 50,
+    max_seg_len: int = 3,
+) -> Tuple[List[np.ndarray], float, List[float]]:
+    """
+    Improve a contour order (e.g. the greedy result) with 2-opt and Or-opt moves
+    until no move helps, max_rounds is reached or the time budget runs out.
+
+    Moves:
+      - 2-opt: reverse a run of contours, flipping each contour's direction.
+      - Or-opt: move a run of 1..max_seg_len contours elsewhere, optionally reversed.
+    Only strictly improving moves are applied, so the result is never worse
+    than the input order.
+
+    Args:
+        ordered_contours: list of (N,2) contours, already direction-fixed.
+        start_point: optional (2,) pen start. If None, the pen starts at the
+            first contour's start point (same convention as greedy_reorder_contours).
+        time_budget_s: wall-clock budget in seconds.
+    Returns:
+        improved_contours: reordered contours; each contour may be reversed.
+        total_penup_dist: pen-up distance of the improved order.
+        history: pen-up distance before the first round and after each round.
+    """
+    contours = [c for c in ordered_contours if c is not None and len(c) > 0]
+    if not contours:
+        return [], 0.0, [0.0]
+
+    s0 = np.array([c[0] for c in contours], dtype=np.float64)
+    e0 = np.array([c[-1] for c in contours], dtype=np.float64)
+    p0 = s0[0].copy() if start_point is None else np.asarray(start_point, dtype=np.float64)
+
+    order = np.arange(len(contours))
+    rev = np.zeros(len(contours), dtype=bool)
+    best_total = _tour_penup(s0, e0, p0)
+    history = [best_total]
+    eps = 1e-9
+
+    deadline = time.perf_counter() + time_budget_s
+    for _ in range(max_rounds):
+        if time.perf_counter() > deadline:
+            break
+        changed = _two_opt_pass(s0, e0, order, rev, p0, deadline, eps)
+        changed |= _or_opt_pass(s0, e0, order, rev, p0, deadline, eps, max_seg_len)
+        total = _tour_penup(*_tour_endpoints(s0, e0, order, rev), p0)
+        history.append(total)
+        if not changed:
+            break
+
+    # Guard against float drift: never hand back something worse than the input
+    if history[-1] > best_total:
+        return contours, best_total, history
+
+    out = [contours[o][::-1].copy() if r else contours[o] for o, r in zip(order, rev)]
+    return out, history[-1], history
@@ -4,12 +4,23 @@ from typing import Iterable
 import numpy as np
 
 
+def _densify_segment_counts(pts_mm: np.ndarray, step_mm: float) -> tuple[np.ndarray, np.ndarray]:
+    # Per segment: (already short enough?, number of output points it contributes).
+    v = np.diff(pts_mm, axis=0)
+    dist = np.hypot(v[:, 0], v[:, 1]).astype(np.float64)
+    short = dist <= step_mm
+    counts = np.where(short, 1, np.ceil(np.where(short, 1.0, dist / step_mm))).astype(np.int64)
+    return short, counts
+
+
 def densify_polyline_mm(
     pts_mm: np.ndarray,
     step_mm: float = 0.2,
 ) -> np.ndarray:
     """
     Insert intermediate points so that distance between consecutive points <= step_mm.
+    Per-segment subdivision counts are computed up front and all points are
+    written into one preallocated output array.
 
     Args:
         pts_mm: (N,2) polyline points in millimeters
@@ -19,28 +30,47 @@ def densify_polyline_mm(
     """
     if pts_mm.ndim != 2 or pts_mm.shape[1] != 2:
         raise ValueError(f"pts_mm must be (N,2), got {pts_mm.shape}")
+    if step_mm <= 0:
+        raise ValueError(f"step_mm must be positive, got {step_mm}")
     if len(pts_mm) < 2:
         return pts_mm.copy()
+    if not np.issubdtype(pts_mm.dtype, np.floating):
+        pts_mm = pts_mm.astype(np.float64)
+
+    short, counts = _densify_segment_counts(pts_mm, step_mm)
+    out = np.empty((1 + int(counts.sum()), 2), dtype=pts_mm.dtype)
+    out[0] = pts_mm[0]
 
-    out = [pts_mm[0]]
-    for i in range(len(pts_mm) - 1):
-        p0 = pts_mm[i]
-        p1 = pts_mm[i + 1]
-        v = p1 - p0
-        dist = float(np.hypot(v[0], v[1]))
+    # For every output point: owning segment and step k in 1..n_seg
+    seg = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(1, len(seg) + 1) - np.repeat(np.cumsum(counts) - counts, counts)
 
-        if dist <= step_mm or dist == 0.0:
-            out.append(p1)
-            continue
+    # Subdivided segments: p0 + (k / n_seg) * v, same as stepping t along the segment
+    t = (k / counts[seg]).astype(pts_mm.dtype)
+    v = pts_mm[seg + 1] - pts_mm[seg]
+    out[1:] = pts_mm[seg] + t[:, None] * v
 
-        # Number of segments needed so that each segment <= step_mm
-        n_seg = int(np.ceil(dist / step_mm))
-        # Insert intermediate points (excluding p0, including p1 at the end)
-        for k in range(1, n_seg + 1):
-            t = k / n_seg
-            out.append(p0 + t * v)
+    # Segments that were short enough keep their end point exactly
+    short_idx = np.flatnonzero(short)
+    out[np.cumsum(counts)[short_idx]] = pts_mm[short_idx + 1]
+    return out
 
-    return np.vstack(out)
+
+def count_densified_points_mm(
+    pts_mm: np.ndarray,
+    step_mm: float = 0.2,
+) -> int:
+    """
+    Number of points densify_polyline_mm(pts_mm, step_mm) would return,
+    without building the densified array.
+    """
+    if pts_mm.ndim != 2 or pts_mm.shape[1] != 2:
+        raise ValueError(f"pts_mm must be (N,2), got {pts_mm.shape}")
+    if step_mm <= 0:
+        raise ValueError(f"step_mm must be positive, got {step_mm}")
+    if len(pts_mm) < 2:
+        return len(pts_mm)
+    return 1 + int(_densify_segment_counts(pts_mm, step_mm)[1].sum())
 
 
 def contour_pixels_to_mm(
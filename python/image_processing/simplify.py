@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import List
 import numpy as np
 
 
@@ -17,6 +18,67 @@ def _perp_dist_point_to_segment(p: np.ndarray, a: np.ndarray, b: np.ndarray) ->
     return float(np.hypot(d[0], d[1]))
 
 
+def _perp_dist_points_to_segments(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Vectorized _perp_dist_point_to_segment over rows of p/a/b.
+    # Row-wise dot products go through stacked matmul, which rounds like np.dot.
+    ab = b - a
+    ap = p - a
+    denom = (ab[:, None, :] @ ab[:, :, None])[:, 0, 0]
+    degenerate = denom == 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (ap[:, None, :] @ ab[:, :, None])[:, 0, 0] / np.where(degenerate, 1, denom)
+    t = np.clip(t, 0.0, 1.0).astype(p.dtype, copy=False)
+    t[degenerate] = 0.0
+
+    d = p - (a + t[:, None] * ab)
+    return np.hypot(d[:, 0], d[:, 1])
+
+
+def _rdp_keep_mask(pts: np.ndarray, starts: np.ndarray, ends: np.ndarray, epsilon: float) -> np.ndarray:
+    """
+    RDP keep mask for several polylines stored back to back in pts.
+
+    Polyline k occupies pts[starts[k]:ends[k]]. All open (i0, i1) spans of one
+    recursion level are processed together: every interior point of every span
+    gets its distance in one array operation, and the farthest point of each
+    span (first one on ties, like the scalar loop) splits it if > epsilon.
+    """
+    keep = np.zeros(len(pts), dtype=bool)
+    nonempty = ends > starts
+    keep[starts[nonempty]] = True
+    keep[ends[nonempty] - 1] = True
+
+    lo = starts[nonempty].astype(np.int64)
+    hi = ends[nonempty].astype(np.int64) - 1
+    while True:
+        open_span = hi - lo >= 2
+        lo, hi = lo[open_span], hi[open_span]
+        if len(lo) == 0:
+            break
+
+        # Interior indices of every span, flattened, plus the owning span of each
+        n_inner = hi - lo - 1
+        span = np.repeat(np.arange(len(lo)), n_inner)
+        offsets = np.cumsum(n_inner) - n_inner
+        idx = np.arange(len(span)) - offsets[span] + lo[span] + 1
+
+        d = _perp_dist_points_to_segments(pts[idx], pts[lo[span]], pts[hi[span]])
+
+        max_d = np.maximum.reduceat(d, offsets)
+        is_max = d == max_d[span]
+        far = np.minimum.reduceat(np.where(is_max, idx, len(pts)), offsets)
+
+        # Compare in float64 like the scalar loop (float(d) > epsilon): for float32 input a
+        # float32 comparison would round epsilon too and drop points sitting just above it.
+        split = max_d.astype(np.float64) > epsilon
+        keep[far[split]] = True
+        lo, hi, far = lo[split], hi[split], far[split]
+        lo, hi = np.concatenate([lo, far]), np.concatenate([far, hi])
+
+    return keep
+
+
 def rdp_simplify(poly: np.ndarray, epsilon: float) -> np.ndarray:
     """
     Ramer-Douglas-Peucker polyline simplification.
@@ -33,27 +95,39 @@ def rdp_simplify(poly: np.ndarray, epsilon: float) -> np.ndarray:
     if n <= 2:
         return poly.copy()
 
-    keep = np.zeros(n, dtype=bool)
-    keep[0] = True
-    keep[-1] = True
-
-    stack = [(0, n - 1)]
-    while stack:
-        i0, i1 = stack.pop()
-        a = poly[i0]
-        b = poly[i1]
-
-        max_d = -1.0
-        idx = -1
-        for i in range(i0 + 1, i1):
-            d = _perp_dist_point_to_segment(poly[i], a, b)
-            if d > max_d:
-                max_d = d
-                idx = i
-
-        if max_d > epsilon and idx != -1:
-            keep[idx] = True
-            stack.append((i0, idx))
-            stack.append((idx, i1))
-
+    keep = _rdp_keep_mask(poly, np.array([0]), np.array([n]), epsilon)
     return poly[keep].copy()
+
+
+def rdp_simplify_many(polys: List[np.ndarray], epsilon: float) -> List[np.ndarray]:
+    """
+    Batched rdp_simplify: simplify a whole list of polylines in one call.
+
+    All polylines are concatenated and simplified together, so the per-call
+    overhead is paid once per recursion level instead of once per contour.
+
+    Args:
+        polys: list of (N,2) polylines in mm (float)
+        epsilon: max allowed deviation in mm
+    Returns:
+        list of simplified polylines, same order as polys
+    """
+    for poly in polys:
+        if poly.ndim != 2 or poly.shape[1] != 2:
+            raise ValueError(f"poly must be (N,2), got {poly.shape}")
+    if not polys:
+        return []
+
+    # Simplify each dtype group separately so no polyline is upcast
+    out: List[np.ndarray] = [None] * len(polys)
+    for dtype in {p.dtype for p in polys}:
+        group = [i for i, p in enumerate(polys) if p.dtype == dtype]
+        lengths = np.array([len(polys[i]) for i in group], dtype=np.int64)
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        pts = np.concatenate([polys[i] for i in group], axis=0)
+
+        keep = _rdp_keep_mask(pts, starts, ends, epsilon)
+        for i, s, e in zip(group, starts, ends):
+            out[i] = polys[i].copy() if e - s <= 2 else pts[s:e][keep[s:e]].copy()
+    return out
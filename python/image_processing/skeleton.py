@@ -0,0 +1,127 @@
+from typing import List, Tuple
+import numpy as np
+
+
+# 8 neighbours as (dy, dx); orthogonal first so the trace prefers 4-connected steps
+_NEIGHBOURS = [(-1, 0), (0, 1), (1, 0), (0, -1), (-1, 1), (1, 1), (1, -1), (-1, -1)]
+
+
+def skeletonize(img255: np.ndarray) -> np.ndarray:
+    # Zhang-Suen thinning; returns uint8 {0,255} with 1-pixel-wide strokes.
+    # Works on the flat indices of the remaining foreground pixels only, so each pass costs
+    # O(stroke pixels) rather than O(image size).
+    if img255.ndim != 2:
+        raise ValueError(f"Expected a single-channel image, got shape={img255.shape}")
+    h, w = img255.shape
+    W = w + 2
+    p = np.pad((img255 > 0).astype(np.uint8), 1).ravel()
+    pos = np.flatnonzero(p)
+    # P2..P9 clockwise from north, as flat offsets in the padded image
+    offsets = np.array([-W, -W + 1, 1, W + 1, W, W - 1, -1, -W - 1])
+
+    while pos.size:
+        changed = False
+        for step in (0, 1):
+            nb = p[pos[None, :] + offsets[:, None]]        # (8, N)
+            P2, P4, P6, P8 = nb[0], nb[2], nb[4], nb[6]
+            B = nb.sum(axis=0)                               # neighbour count
+            A = ((nb == 0) & (np.roll(nb, -1, axis=0) == 1)).sum(axis=0)   # 0->1 transitions around the ring
+            if step == 0:
+                cond = ((P2 & P4 & P6) == 0) & ((P4 & P6 & P8) == 0)
+            else:
+                cond = ((P2 & P4 & P8) == 0) & ((P2 & P6 & P8) == 0)
+
+            remove = (B >= 2) & (B <= 6) & (A == 1) & cond
+            if remove.any():
+                p[pos[remove]] = 0
+                pos = pos[~remove]
+                changed = True
+        if not changed:
+            break
+    return p.reshape(h + 2, W)[1:-1, 1:-1] * 255
+
+
+def _pixel_graph(sk: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # CSR neighbour lists over skeleton pixels. A diagonal link is dropped when the two pixels
+    # already touch through an orthogonal neighbour, so corners do not form little triangles.
+    h, w = sk.shape
+    on = sk > 0
+    ys, xs = np.nonzero(on)
+    idx = np.full((h + 2, w + 2), -1, dtype=np.int64)
+    idx[ys + 1, xs + 1] = np.arange(len(ys))
+    onp = np.pad(on, 1)
+
+    src_parts, dst_parts = [], []
+    for dy, dx in _NEIGHBOURS:
+        nb = idx[ys + 1 + dy, xs + 1 + dx]
+        ok = nb >= 0
+        if dy != 0 and dx != 0:
+            ok &= ~onp[ys + 1 + dy, xs + 1] & ~onp[ys + 1, xs + 1 + dx]
+        src_parts.append(np.nonzero(ok)[0])
+        dst_parts.append(nb[ok])
+
+    src = np.concatenate(src_parts)
+    dst = np.concatenate(dst_parts)
+    order = np.argsort(src, kind="stable")      # keeps the orthogonal-first order within a pixel
+    src, nbr = src[order], dst[order]
+    start = np.zeros(len(ys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(ys)), out=start[1:])
+
+    # rev[s] = slot of the opposite direction of edge s (links are symmetric)
+    n = len(ys)
+    key = src * n + nbr
+    key_order = np.argsort(key)
+    rev = key_order[np.searchsorted(key[key_order], nbr * n + src)]
+    return np.stack([xs, ys], axis=1).astype(np.int32), nbr, start, rev
+
+
+def trace_skeleton(sk: np.ndarray, min_len_px: int) -> List[np.ndarray]:
+    # Split the skeleton at endpoints/junctions (degree != 2) and walk each pixel chain once.
+    # Open chains run node to node; closed loops (all degree 2) repeat their first point at the end.
+    xy, nbr_arr, start_arr, rev_arr = _pixel_graph(sk)
+    nbr = nbr_arr.tolist()
+    start = start_arr.tolist()
+    rev = rev_arr.tolist()
+    deg = np.diff(start_arr)
+    used = [False] * len(nbr)
+
+    def walk(u: int, slot: int) -> List[int]:
+        path = [u]
+        while True:
+            # Take edge `slot` out of the pixel path[-1] (both directions marked walked)
+            used[slot] = used[rev[slot]] = True
+            cur = nbr[slot]
+            path.append(cur)
+            s0 = start[cur]
+            if start[cur + 1] - s0 != 2:
+                return path
+            # degree-2 pixel: continue through the other slot unless the loop has closed
+            slot = s0 if not used[s0] else s0 + 1
+            if used[slot]:
+                return path
+
+    paths: List[List[int]] = []
+    # 1) chains that start at an endpoint or junction
+    for u in np.nonzero(deg != 2)[0].tolist():
+        if start[u] == start[u + 1]:
+            paths.append([u])   # isolated pixel
+            continue
+        for s in range(start[u], start[u + 1]):
+            if not used[s]:
+                paths.append(walk(u, s))
+    # 2) what is left are closed loops without any node
+    for u in np.nonzero(deg == 2)[0].tolist():
+        for s in range(start[u], start[u + 1]):
+            if not used[s]:
+                paths.append(walk(u, s))
+
+    return [xy[p] for p in paths if len(p) >= min_len_px]
+
+
+def extract_centerlines(img255: np.ndarray, min_len_px: int) -> List[np.ndarray]:
+    # Centerline polylines of the edge map as (N, 2) int32 (x, y) arrays, one pass per stroke.
+    if img255.ndim != 2:
+        raise ValueError(f"Expected a single-channel image, got shape={img255.shape}")
+    if img255.dtype != np.uint8:
+        raise ValueError("img255 must be uint8 with values {0,255}.")
+    return trace_skeleton(skeletonize(img255), min_len_px)
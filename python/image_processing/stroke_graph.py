@@ -0,0 +1,230 @@
+from __future__ import annotations
+import heapq
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+def _polyline_length(c: np.ndarray) -> float:
+    if len(c) < 2:
+        return 0.0
+    return float(np.linalg.norm(np.diff(c.astype(np.float64), axis=0), axis=1).sum())
+
+
+def build_stroke_graph(polylines: List[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[int, int, int, float]]]:
+    """
+    Graph whose nodes are polyline endpoints (shared pixels = shared node) and whose edges are the polylines.
+
+    Returns:
+        nodes: (M, 2) node coordinates
+        edges: list of (u, v, polyline_index, length); a closed polyline is a self-loop u == v
+    """
+    node_id: Dict[Tuple[int, int], int] = {}
+    coords: List[Tuple[int, int]] = []
+
+    def node(pt: np.ndarray) -> int:
+        key = (int(pt[0]), int(pt[1]))
+        i = node_id.get(key)
+        if i is None:
+            i = node_id[key] = len(coords)
+            coords.append(key)
+        return i
+
+    edges = []
+    for k, c in enumerate(polylines):
+        if len(c) == 0:
+            continue
+        edges.append((node(c[0]), node(c[-1]), k, _polyline_length(c)))
+    return np.array(coords, dtype=np.int64).reshape(-1, 2), edges
+
+
+def _bounded_dijkstra(adj, src: int, limit: float) -> Tuple[Dict[int, float], Dict[int, Tuple[int, int]]]:
+    # Shortest distances from src up to `limit`; pred[v] = (previous node, edge index).
+    dist = {src: 0.0}
+    pred: Dict[int, Tuple[int, int]] = {}
+    heap = [(0.0, src)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist.get(u, np.inf):
+            continue
+        for e, v, w in adj[u]:
+            nd = d + w
+            if nd <= limit and nd < dist.get(v, np.inf):
+                dist[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(heap, (nd, v))
+    return dist, pred
+
+
+def _components(n_nodes: int, edges) -> np.ndarray:
+    # Connected component label of every node (union-find over the edges).
+    parent = list(range(n_nodes))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v, _, _ in edges:
+        parent[find(u)] = find(v)
+    return np.array([find(x) for x in range(n_nodes)], dtype=np.int64)
+
+
+def _pair_odd_nodes(n_nodes: int, edges, max_retrace: float) -> Tuple[List[int], float, int]:
+    # Greedily pair odd-degree nodes by graph distance (cheapest pairs first, each path <= max_retrace).
+    # A pair only saves a pen lift while its component still has more than 2 odd nodes
+    # (k odd nodes need max(1, k/2) walks), so the last two odd nodes of a component are never paired.
+    # Returns the edge indices to traverse twice, the retraced length and the number of pairs.
+    deg = np.zeros(n_nodes, dtype=np.int64)
+    adj: List[List[Tuple[int, int, float]]] = [[] for _ in range(n_nodes)]
+    for e, (u, v, _, w) in enumerate(edges):
+        deg[u] += 1
+        deg[v] += 1
+        if u != v:
+            adj[u].append((e, v, w))
+            adj[v].append((e, u, w))
+    odd = np.nonzero(deg % 2)[0].tolist()
+    if max_retrace <= 0 or len(odd) < 2:
+        return [], 0.0, 0
+
+    comp = _components(n_nodes, edges)
+    odd_left = dict(zip(*np.unique(comp[odd], return_counts=True)))
+    odd = [u for u in odd if odd_left[comp[u]] > 2]
+
+    odd_set = set(odd)
+    candidates = []
+    preds = {}
+    for u in odd:
+        dist, pred = _bounded_dijkstra(adj, u, max_retrace)
+        preds[u] = pred
+        for v, d in dist.items():
+            if v > u and v in odd_set:
+                candidates.append((d, u, v))
+    candidates.sort()
+
+    matched = set()
+    dup: List[int] = []
+    retrace = 0.0
+    pairs = 0
+    for d, u, v in candidates:
+        if u in matched or v in matched or odd_left[comp[u]] <= 2:
+            continue
+        odd_left[comp[u]] -= 2
+        matched.update((u, v))
+        pairs += 1
+        retrace += d
+        pred = preds[u]
+        x = v
+        while x != u:
+            x, e = pred[x]
+            dup.append(e)
+    return dup, retrace, pairs
+
+
+def _euler_walks(n_nodes: int, edges, odd_left: List[int]) -> List[List[Tuple[int, int]]]:
+    # Hierholzer over the (multi)graph plus one virtual node joined to every remaining odd node.
+    # Cutting the circuits at the virtual node gives len(odd_left)/2 open trails per component,
+    # the minimum for a connected component. Returns trails as [(edge index, from node), ...].
+    virt = n_nodes
+    all_edges = [(u, v) for (u, v, _, _) in edges] + [(virt, o) for o in odd_left]
+    n_real = len(edges)
+    adj: List[List[Tuple[int, int]]] = [[] for _ in range(n_nodes + 1)]
+    for e, (u, v) in enumerate(all_edges):
+        adj[u].append((e, v))
+        if u != v:
+            adj[v].append((e, u))
+    used = [False] * len(all_edges)
+    ptr = [0] * (n_nodes + 1)
+
+    def circuit(start: int) -> List[Tuple[int, int]]:
+        # Iterative Hierholzer; returns [(edge, from node)] in traversal order.
+        stack = [(start, -1, -1)]
+        out = []
+        while stack:
+            v, e_in, frm = stack[-1]
+            lst = adj[v]
+            while ptr[v] < len(lst) and used[lst[ptr[v]][0]]:
+                ptr[v] += 1
+            if ptr[v] < len(lst):
+                e, w = lst[ptr[v]]
+                used[e] = True
+                stack.append((w, e, v))
+            else:
+                stack.pop()
+                if e_in >= 0:
+                    out.append((e_in, frm))
+        out.reverse()
+        return out
+
+    trails: List[List[Tuple[int, int]]] = []
+    starts = [virt] + list(range(n_nodes))
+    for s in starts:
+        if ptr[s] >= len(adj[s]):
+            continue
+        seq = circuit(s)
+        cur: List[Tuple[int, int]] = []
+        for e, frm in seq:
+            if e >= n_real:         # virtual edge: pen lift
+                if cur:
+                    trails.append(cur)
+                cur = []
+            else:
+                cur.append((e, frm))
+        if cur:
+            trails.append(cur)
+    return trails
+
+
+def plan_pen_down_walks(
+    polylines: List[np.ndarray],
+    max_retrace_px: float = 0.0,
+) -> Tuple[List[np.ndarray], Dict]:
+    """
+    Merge polylines that share endpoints/junctions into as few continuous pen-down walks as possible.
+
+    Polylines are edges of a graph on their endpoints (best with mode="centerline" output, where
+    chains meet at exact junction pixels). Each connected component with k odd-degree nodes needs
+    max(1, k/2) walks. Odd nodes whose graph distance is <= max_retrace_px are paired (cheapest
+    pairs first) and the edges on that path are drawn twice, which removes one pen lift per pair.
+    Pairing stops at the last two odd nodes of a component, where it would save no lift.
+
+    Args:
+        polylines: list of (N, 2) point arrays (pixel coordinates)
+        max_retrace_px: longest pen-down retrace allowed to save one pen lift (0 = never retrace)
+    Returns:
+        walks: list of (N, 2) arrays, one per pen-down stroke (same dtype as the input)
+        info: dict with nodes, odd_nodes, pairs, retrace_px, polylines, walks
+    """
+    if max_retrace_px < 0:
+        raise ValueError(f"max_retrace_px must be >= 0, got {max_retrace_px}")
+    nodes, edges = build_stroke_graph(polylines)
+    n_nodes = len(nodes)
+
+    dup, retrace, pairs = _pair_odd_nodes(n_nodes, edges, max_retrace_px)
+    edges_mg = edges + [edges[e] for e in dup]
+
+    deg = np.zeros(n_nodes, dtype=np.int64)
+    for u, v, _, _ in edges_mg:
+        deg[u] += 1
+        deg[v] += 1
+    odd_left = np.nonzero(deg % 2)[0].tolist()
+
+    walks: List[np.ndarray] = []
+    for trail in _euler_walks(n_nodes, edges_mg, odd_left):
+        parts = []
+        for i, (e, frm) in enumerate(trail):
+            u, _, k, _ = edges_mg[e]
+            c = polylines[k] if frm == u else polylines[k][::-1]
+            parts.append(c if i == 0 else c[1:])    # shared junction point only once
+        walks.append(np.concatenate(parts, axis=0))
+
+    info = {
+        "nodes": n_nodes,
+        "odd_nodes": int(np.count_nonzero(np.bincount(
+            [u for u, _, _, _ in edges] + [v for _, v, _, _ in edges], minlength=n_nodes) % 2)),
+        "pairs": pairs,
+        "retrace_px": retrace,
+        "polylines": len(edges),
+        "walks": len(walks),
+    }
+    return walks, info
@@ -1,6 +1,56 @@
 # io_utils/__init__.py
 from .unpacker import load_hex_txt_to_bytes, extract_payload_after_header, unpack_payload_to_image, to_img255
-from .packet_gen import build_command_sequence_from_contours_xy
+from .packet_gen import (
+    build_command_sequence_from_contours_xy,
+    iter_command_sequence_from_contours_xy,
+    format_cmd,
+    parse_cmd,
+    encode_cmd_binary,
+    decode_cmd_binary,
+    decode_binary_stream,
+    ascii_to_binary,
+    optimize_command_stream,
+    iter_optimized_commands,
+)
+from .command_stream import CommandStream
+from .plot_time import (
+    MachineModel,
+    machine_model_from_config,
+    estimate_plot_time,
+    estimate_penup_time,
+    format_estimate,
+)
+from .frame_store import (
+    FMT_1BPP,
+    FMT_8BPP,
+    FMT_RGB888,
+    write_frame,
+    read_frame_header,
+    open_frame,
+    load_frame,
+    import_hex_frame,
+    import_legacy_dir,
+)
+from .hex_codec import (
+    encode_hex,
+    decode_hex,
+    decode_hex_words,
+    hex_to_bit_text,
+    write_hex_file,
+    iter_hex_file,
+    read_hex_file,
+    write_bit_text_file,
+)
+from .edge_link import (
+    TX_RAW,
+    TX_1BPP,
+    TX_RLE,
+    format_select,
+    rle_encode,
+    rle_decode,
+    encode_edge_reply,
+    decode_edge_reply,
+)
 
 __all__ = [
     "load_hex_txt_to_bytes",
@@ -8,6 +58,46 @@ __all__ = [
     "unpack_payload_to_image",
     "to_img255",
     "build_command_sequence_from_contours_xy",
+    "iter_command_sequence_from_contours_xy",
+    "format_cmd",
+    "parse_cmd",
+    "encode_cmd_binary",
+    "decode_cmd_binary",
+    "decode_binary_stream",
+    "ascii_to_binary",
+    "optimize_command_stream",
+    "iter_optimized_commands",
+    "CommandStream",
+    "MachineModel",
+    "machine_model_from_config",
+    "estimate_plot_time",
+    "estimate_penup_time",
+    "format_estimate",
+    "FMT_1BPP",
+    "FMT_8BPP",
+    "FMT_RGB888",
+    "write_frame",
+    "read_frame_header",
+    "open_frame",
+    "load_frame",
+    "import_hex_frame",
+    "import_legacy_dir",
+    "encode_hex",
+    "decode_hex",
+    "decode_hex_words",
+    "hex_to_bit_text",
+    "write_hex_file",
+    "iter_hex_file",
+    "read_hex_file",
+    "write_bit_text_file",
+    "TX_RAW",
+    "TX_1BPP",
+    "TX_RLE",
+    "format_select",
+    "rle_encode",
+    "rle_decode",
+    "encode_edge_reply",
+    "decode_edge_reply",
     # "FpgaReceiver",
     # "Stm32Sender",
 ]
@@ -0,0 +1,105 @@
+# io_utils/command_stream.py
+"""
+Run a command generator on a producer thread and hand its lines to the sender through a
+bounded queue, so the first command reaches the plotter while later contours are still
+being planned. The queue bound keeps the producer at most `maxsize` lines ahead.
+
+    stream = CommandStream(iter_pipeline_commands(...), maxsize=256)
+    stm.send_stream(stream, window=STM32_WINDOW)
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+_DONE = object()
+
+
+class CommandStream:
+    def __init__(self, source: Iterable, maxsize: int = 256, cancel_event: Optional[threading.Event] = None):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be >= 1, got {maxsize}")
+        self._source = source
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._cancel = cancel_event
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        self.produced = 0           # lines handed to the queue so far
+        self.finished = False       # producer exhausted the source
+        self.t_start = None
+        self.t_first = None         # time the first line was available to the sender
+        self.t_done = None          # time the producer finished
+
+    def start(self) -> "CommandStream":
+        if self._thread is None:
+            self.t_start = time.perf_counter()
+            self._thread = threading.Thread(target=self._produce, name="CommandStream", daemon=True)
+            self._thread.start()
+        return self
+
+    def _produce(self) -> None:
+        try:
+            for line in self._source:
+                if not self._put(line):
+                    return
+                self.produced += 1
+                if self.t_first is None:
+                    self.t_first = time.perf_counter()
+            self.finished = True
+            self.t_done = time.perf_counter()
+        except BaseException as e:      # re-raised on the consumer side
+            self._error = e
+        finally:
+            # Close a generator source here too, so a cancelled job releases what it holds
+            # (e.g. the command file of iter_pipeline_commands) without waiting for GC
+            try:
+                close = getattr(self._source, "close", None)
+                if close is not None:
+                    close()
+            finally:
+                self._put(_DONE)
+
+    def _put(self, item) -> bool:
+        # Blocking put that gives up when the consumer closed the stream.
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator:
+        self.start()
+        while True:
+            if self._cancel is not None and self._cancel.is_set():
+                self.close()
+                raise InterruptedError("Command stream cancelled")
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def close(self) -> None:
+        # Stop the producer (it exits at its next put) and drop what is queued.
+        self._stop.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def __enter__(self) -> "CommandStream":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,146 @@
+# io_utils/edge_link.py
+"""
+Wire formats for the FPGA -> PC edge-map reply (0xAA / 0xBB).
+
+The PC picks the format per request by sending two bytes before the trigger:
+    CMD_TX_FORMAT (0xCF), mode        e.g. CF 02 BB
+A board that does not know the command drops both bytes in IDLE (UART_RX_CMD ignores
+unknown commands) and keeps sending the legacy reply, so requesting a format is always safe.
+
+Replies:
+    TX_RAW   legacy, no header: w*h bytes, one per pixel (0x00 / 0xFF)
+    TX_1BPP  header + (w*h+7)//8 bytes, packed row-major (BITORDER, like unpacker.py)
+    TX_RLE   header + run lengths (see rle_encode)
+
+Header (6 bytes, big-endian), only in front of the packed modes:
+    magic   B   0xA5  (never the first byte of a raw reply, whose bytes are 0x00 / 0xFF)
+    mode    B   TX_1BPP / TX_RLE - the mode actually used, which may differ from the request
+    length  I   number of payload bytes that follow
+
+A device asked for TX_RLE answers with TX_1BPP when the runs would not be shorter.
+"""
+from __future__ import annotations
+import struct
+from typing import Tuple
+import numpy as np
+
+from config import BITORDER
+from .unpacker import unpack_payload_to_image
+
+TX_RAW = 0
+TX_1BPP = 1
+TX_RLE = 2
+TX_FORMATS = {"raw": TX_RAW, "1bpp": TX_1BPP, "rle": TX_RLE}
+
+CMD_TX_FORMAT = 0xCF
+REPLY_MAGIC = 0xA5
+REPLY_HEADER = struct.Struct(">BBI")
+
+
+def tx_format_code(fmt) -> int:
+    # "raw" / "1bpp" / "rle" (or the mode number) -> mode number
+    if isinstance(fmt, str):
+        if fmt not in TX_FORMATS:
+            raise ValueError(f"Unknown FPGA reply format '{fmt}' (expected one of {', '.join(TX_FORMATS)})")
+        return TX_FORMATS[fmt]
+    if fmt not in TX_FORMATS.values():
+        raise ValueError(f"Unknown FPGA reply mode {fmt}")
+    return int(fmt)
+
+
+def format_select(fmt) -> bytes:
+    # Bytes to send before the trigger to request a reply format.
+    return bytes([CMD_TX_FORMAT, tx_format_code(fmt)])
+
+
+def rle_encode(bits) -> bytes:
+    """
+    Run-length code a flat binary pixel stream (nonzero = edge).
+
+    Runs alternate background / edge, starting with background (a leading edge pixel gives
+    a first run of 0). Each run is one byte; a run longer than 255 is sent as 255, 0, 255, 0, ..., rest,
+    i.e. zero-length runs of the other colour in between.
+    """
+    bits = np.asarray(bits).ravel() != 0
+    if bits.size == 0:
+        return b""
+    bounds = np.flatnonzero(bits[1:] != bits[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], bounds, [bits.size])))
+    if bits[0]:
+        runs = np.concatenate(([0], runs))
+
+    q, r = np.divmod(runs, 255)
+    count = 2 * q + 1                       # bytes per run
+    starts = np.cumsum(count) - count
+    local = np.arange(int(count.sum())) - np.repeat(starts, count)
+    last = local == np.repeat(2 * q, count)
+    out = np.where(last, np.repeat(r, count), np.where(local % 2 == 0, 255, 0))
+    return out.astype(np.uint8).tobytes()
+
+
+def rle_decode(data: bytes, n: int) -> np.ndarray:
+    # Inverse of rle_encode: n pixels as a flat uint8 {0,1} array.
+    runs = np.frombuffer(data, dtype=np.uint8)
+    values = (np.arange(runs.size) % 2).astype(np.uint8)
+    bits = np.repeat(values, runs)
+    if bits.size != n:
+        raise ValueError(f"Run lengths cover {bits.size} pixels, expected {n}.")
+    return bits
+
+
+def encode_edge_reply(edges, fmt, bitorder: str = BITORDER) -> bytes:
+    # Device side (emulator): edge map (nonzero = edge) -> reply bytes in the requested format.
+    mode = tx_format_code(fmt)
+    flat = np.asarray(edges).ravel()
+    if mode == TX_RAW:
+        return np.where(flat > 0, 255, 0).astype(np.uint8).tobytes()
+    packed = np.packbits(flat > 0, bitorder=bitorder).tobytes()
+    payload = packed
+    if mode == TX_RLE:
+        runs = rle_encode(flat)
+        if len(runs) < len(packed):
+            payload = runs
+        else:
+            mode = TX_1BPP
+    return REPLY_HEADER.pack(REPLY_MAGIC, mode, len(payload)) + payload
+
+
+def reply_size(received, n: int) -> int:
+    """
+    Total reply length as far as it is known from the bytes received so far:
+    n for a raw reply, the header size until the header is complete, then header + payload.
+    """
+    if not received or received[0] != REPLY_MAGIC:
+        return n
+    if len(received) < REPLY_HEADER.size:
+        return REPLY_HEADER.size
+    _, _, length = REPLY_HEADER.unpack_from(received)
+    return REPLY_HEADER.size + length
+
+
+def decode_edge_reply(reply: bytes, n: int, bitorder: str = BITORDER) -> Tuple[int, bytes]:
+    """
+    Decode a complete reply for n pixels.
+
+    Returns:
+        (mode, pixels): the mode the device used and n bytes, one per pixel (0x00 / 0xFF),
+        i.e. what a raw reply carries
+    """
+    if not reply or reply[0] != REPLY_MAGIC:
+        if len(reply) != n:
+            raise ValueError(f"Raw reply must be {n} bytes, got {len(reply)} bytes.")
+        return TX_RAW, bytes(reply)
+    if len(reply) < REPLY_HEADER.size:
+        raise ValueError(f"Reply header incomplete ({len(reply)} bytes).")
+    _, mode, length = REPLY_HEADER.unpack_from(reply)
+    payload = reply[REPLY_HEADER.size:]
+    if len(payload) != length:
+        raise ValueError(f"Reply payload must be {length} bytes, got {len(payload)} bytes.")
+    if mode == TX_1BPP:
+        bits = unpack_payload_to_image(payload, n, 1, bitorder=bitorder).ravel()
+    elif mode == TX_RLE:
+        bits = rle_decode(payload, n)
+    else:
+        raise ValueError(f"Unknown reply mode {mode} in header.")
+    return mode, (bits * 255).astype(np.uint8).tobytes()
+
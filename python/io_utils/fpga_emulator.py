@@ -0,0 +1,330 @@
+# io_utils/fpga_emulator.py
+"""
+Local FPGA stand-in behind a pseudo-terminal (Linux/macOS only), for exercising FPGAUartManager
+without a board.
+
+It follows UART_RX_CMD / UART_TX_Controller:
+  - 0xAA: receive W*H*3 RGB888 bytes, run the edge filter, reply W*H bytes
+  - 0xBB: take a frame from `camera` (RGB565), run the edge filter, reply W*H bytes
+  - 0x30: legacy .mem upload (no longer in fpga/src): receive W*H*3 bytes, reply the edge map as
+          W*H RGB888 triplets (what process_serial_communication stores)
+  - 0xCF <mode>: reply format for 0xAA / 0xBB (io_utils/edge_link.py), kept until reset(); modes not
+          in `tx_formats` are ignored like on a board without the command (tx_formats=(TX_RAW,))
+  - any other command byte is ignored
+The edge filter is the bit-exact model (image_processing.fpga_edge_model), with the board's
+frame-to-frame line-buffer history. Both directions are paced at `baudrate` (8N1). While a frame
+is being processed / sent the command FSM does not read, so bytes arriving then fill the
+`fifo_depth`-byte RX FIFO and the rest are dropped, like on the board.
+
+Faults apply to the next reply, in injection order:
+    emu.inject("stall", seconds=2.0, at=0.5)    # pause after `at` of the reply has been sent
+    emu.inject("short", missing=100)            # reply ends early
+    emu.inject("silent")                        # no reply at all
+
+Usage:
+    with FPGAEmulator() as emu:
+        FPGAUartManager(emu.port, settle_s=0).send_image_to_fpga(img, "reply.txt")
+"""
+from __future__ import annotations
+import collections
+import os
+import select
+import threading
+import time
+import tty
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import W, H, BAUD, FPGA_EDGE_TH_HIGH
+from image_processing.fpga_edge_model import FPGAEdgeModel, rgb888_to_rgb565
+from io_utils.edge_link import TX_RAW, TX_1BPP, TX_RLE, CMD_TX_FORMAT, encode_edge_reply
+
+CMD_MEM_UPLOAD = 0x30
+CMD_PC_MODE = 0xAA
+CMD_CAMERA_MODE = 0xBB
+FAULT_KINDS = ("stall", "short", "silent")
+
+
+def test_pattern(k: int, width: int = W, height: int = H) -> np.ndarray:
+    # Default camera: a gradient with a disc that moves a little every frame, RGB565
+    yy, xx = np.mgrid[0:height, 0:width]
+    rgb = np.zeros((height, width, 3), np.uint8)
+    rgb[..., 0] = xx * 255 // max(width - 1, 1)
+    rgb[..., 1] = yy * 255 // max(height - 1, 1)
+    cx, cy, r = (width // 3 + 4 * k) % width, height // 2, min(width, height) // 4
+    rgb[(xx - cx) ** 2 + (yy - cy) ** 2 < r * r] = (255, 255, 255)
+    return rgb888_to_rgb565(rgb)
+
+
+class FPGAEmulator:
+    def __init__(self, width=W, height=H, baudrate=BAUD, fifo_depth=32, th_high=FPGA_EDGE_TH_HIGH,
+                 camera: Optional[Callable[[int], np.ndarray]] = None, link_latency_s=0.0,
+                 tx_formats=(TX_RAW, TX_1BPP, TX_RLE)):
+        self.width = width
+        self.height = height
+        self.byte_time_s = 10.0 / baudrate if baudrate else 0.0   # 8N1 on the wire
+        self.fifo_depth = fifo_depth
+        self.link_latency_s = link_latency_s
+        self.camera = camera or (lambda k: test_pattern(k, width, height))
+        self.model = FPGAEdgeModel(width, height, th_high)
+        self.tx_formats = tuple(tx_formats)
+        self.tx_format = TX_RAW
+
+        self.requests: List[Dict] = []     # one entry per handled command: mode, bytes in/out, times
+        self.edge_maps: List[bytes] = []   # edge maps as computed, one byte per pixel
+        self.replies: List[bytes] = []     # reply bytes as encoded for the wire (before faults)
+        self.rx_dropped = 0                # bytes lost to a full RX FIFO
+        self.tx_lost = 0                   # reply bytes nobody read (PC side closed / not reading)
+        self.ignored = 0                   # unknown command bytes
+
+        self._faults: collections.deque = collections.deque()
+        self._rx = bytearray()
+        self._rx_cond = threading.Condition()
+        self._busy = False                 # FSM in processing / WAIT_TX_DONE (not popping the FIFO)
+        self._frames = 0                   # camera frames taken
+        self._reset_count = 0
+        self._master = self._slave = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.port = None
+
+    # --- lifecycle ---
+    def start(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._rx_loop, daemon=True),
+            threading.Thread(target=self._fsm_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._rx_cond:
+            self._rx_cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def inject(self, kind: str, **params) -> None:
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"Unknown fault '{kind}' (expected one of {', '.join(FAULT_KINDS)})")
+        self._faults.append((kind, params))
+
+    def reset(self) -> None:
+        # Reset button: drop buffered bytes and the line-buffer history (an upload in progress is abandoned).
+        with self._rx_cond:
+            self._rx.clear()
+            self._reset_count += 1
+            self._rx_cond.notify_all()
+        self.model.reset()
+        self.tx_format = TX_RAW
+
+    def wait_idle(self, timeout=10.0):
+        # Block until the FSM is back in IDLE with nothing buffered.
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._rx_cond:
+                if not self._busy and not self._rx:
+                    return True
+            time.sleep(0.005)
+        return False
+
+    # --- UART model ---
+    def _rx_loop(self):
+        # Pace incoming bytes at the baud rate and push them into the RX FIFO.
+        chunk_size = max(1, int(0.005 / self.byte_time_s)) if self.byte_time_s else 65536
+        while not self._stop.is_set():
+            r, _, _ = select.select([self._master], [], [], 0.05)
+            if not r:
+                continue
+            try:
+                chunk = os.read(self._master, chunk_size)
+            except BlockingIOError:
+                continue
+            except OSError:
+                break
+            if self.link_latency_s:
+                time.sleep(self.link_latency_s)
+            if self.byte_time_s:
+                time.sleep(len(chunk) * self.byte_time_s)
+            with self._rx_cond:
+                if self._busy:
+                    room = max(0, self.fifo_depth - len(self._rx))
+                    self.rx_dropped += max(0, len(chunk) - room)
+                    chunk = chunk[:room]
+                self._rx.extend(chunk)
+                self._rx_cond.notify_all()
+
+    def _pop(self, n: int) -> Optional[bytes]:
+        # Blocking read of n bytes from the RX FIFO (None when stopping or after reset()).
+        with self._rx_cond:
+            resets = self._reset_count
+            while len(self._rx) < n:
+                if self._stop.is_set() or self._reset_count != resets:
+                    return None
+                self._rx_cond.wait(0.1)
+            out = bytes(self._rx[:n])
+            del self._rx[:n]
+            return out
+
+    def _set_busy(self, busy: bool) -> None:
+        with self._rx_cond:
+            self._busy = busy
+
+    def _transmit(self, payload: bytes) -> int:
+        # Send the reply paced at the baud rate, applying the next queued fault; returns bytes sent.
+        kind, params = self._faults.popleft() if self._faults else (None, {})
+        if kind == "silent":
+            return 0
+        if kind == "short":
+            payload = payload[:max(0, len(payload) - int(params.get("missing", 1)))]
+        stall_at = int(len(payload) * params.get("at", 0.5)) if kind == "stall" else -1
+
+        if self.link_latency_s:
+            time.sleep(self.link_latency_s)
+        chunk_size = max(1, int(0.005 / self.byte_time_s)) if self.byte_time_s else 4096
+        t0 = time.perf_counter()
+        sent = 0
+        while sent < len(payload) and not self._stop.is_set():
+            if sent == stall_at:
+                time.sleep(float(params.get("seconds", 1.0)))
+                t0 = time.perf_counter() - sent * self.byte_time_s
+            end = min(len(payload), sent + chunk_size)
+            if sent < stall_at < end:
+                end = stall_at
+            if not self._write_or_drop(payload[sent:end]):
+                break
+            sent = end
+            ahead = t0 + sent * self.byte_time_s - time.perf_counter()
+            if ahead > 0:
+                time.sleep(ahead)
+        return sent
+
+    def _write_or_drop(self, data: bytes) -> bool:
+        # Like a UART with nobody listening: bytes the PC side does not take within 0.1 s are lost.
+        view = memoryview(data)
+        while view:
+            _, w, _ = select.select([], [self._master], [], 0.1)
+            if not w:
+                self.tx_lost += len(view)
+                return True
+            try:
+                n = os.write(self._master, view)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return False
+            view = view[n:]
+        return True
+
+    # --- command FSM (UART_RX_CMD) ---
+    def _fsm_loop(self):
+        n = self.width * self.height
+        while not self._stop.is_set():
+            cmd = self._pop(1)
+            if cmd is None:
+                continue
+            t_start = time.perf_counter()
+            mode = cmd[0]
+            if mode in (CMD_PC_MODE, CMD_MEM_UPLOAD):
+                data = self._pop(n * 3)
+                if data is None:
+                    continue
+                self._set_busy(True)
+                rgb = np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)
+                edges = self.model.process_rgb888(rgb)
+                if mode == CMD_PC_MODE:
+                    reply = encode_edge_reply(edges, self.tx_format)
+                else:
+                    reply = np.repeat(edges.ravel(), 3).tobytes()
+                bytes_in = 1 + len(data)
+            elif mode == CMD_CAMERA_MODE:
+                self._set_busy(True)
+                edges = self.model.process_rgb565(np.asarray(self.camera(self._frames), dtype=np.uint16))
+                reply = encode_edge_reply(edges, self.tx_format)
+                self._frames += 1
+                bytes_in = 1
+            elif mode == CMD_TX_FORMAT:
+                fmt = self._pop(1)
+                if fmt is not None and fmt[0] in self.tx_formats:
+                    self.tx_format = fmt[0]
+                else:
+                    self.ignored += 1
+                continue
+            else:
+                self.ignored += 1
+                continue
+
+            t_rx = time.perf_counter()
+            self.edge_maps.append(edges.tobytes())
+            self.replies.append(reply)
+            sent = self._transmit(reply)
+            self.requests.append({"mode": mode, "bytes_in": bytes_in, "bytes_out": sent,
+                                  "rx_s": t_rx - t_start, "tx_s": time.perf_counter() - t_rx})
+            self._set_busy(False)
+
+
+if __name__ == "__main__":
+    # Standalone check / benchmark:  python -m io_utils.fpga_emulator [baud]
+    import sys
+    from PIL import Image
+    from io_utils.fpga_uart import FPGAUartManager
+    from io_utils.hex_codec import read_hex_file
+
+    baud = int(sys.argv[1]) if len(sys.argv) > 1 else BAUD
+    img = Image.open("./sample/00_original.png")
+    out = "./fpga_emulator_reply.txt"
+
+    try:
+        with FPGAEmulator(baudrate=baud) as emu:
+            mgr = FPGAUartManager(emu.port, baudrate=baud, settle_s=0, reply_timeout_s=2.0)
+            t0 = time.perf_counter()
+            ok = mgr.send_image_to_fpga(img, out)
+            dt = time.perf_counter() - t0
+            same = ok and read_hex_file(out) == emu.edge_maps[-1]
+            print(f"0xAA: ok={ok} {dt:.2f}s (upload {mgr.last_tx_rate:.0f} B/s), reply matches model={same}")
+
+            for fmt in ("raw", "1bpp", "rle"):
+                mgr.tx_format = fmt
+                t0 = time.perf_counter()
+                ok = mgr.trigger_and_receive_mode(out, target_size=W * H)
+                dt = time.perf_counter() - t0
+                same = ok and read_hex_file(out) == emu.edge_maps[-1]
+                print(f"0xBB {fmt}: ok={ok} {dt:.2f}s, {mgr.last_rx_bytes} bytes (mode {mgr.last_rx_mode}), "
+                      f"reply matches model={same}")
+
+            for kind, params, expect in (("stall", {"seconds": 0.5}, True), ("stall", {"seconds": 3.0}, False),
+                                         ("short", {"missing": 10}, False), ("silent", {}, False)):
+                emu.inject(kind, **params)
+                t0 = time.perf_counter()
+                ok = mgr.trigger_and_receive_mode(out, target_size=W * H)
+                emu.wait_idle(timeout=30)
+                print(f"fault {kind} {params}: ok={ok} (expected {expect}) after {time.perf_counter() - t0:.2f}s")
+            print(f"RX FIFO drops: {emu.rx_dropped}, reply bytes lost: {emu.tx_lost}")
+
+        # A board without the reply-format command: the request is ignored and the raw reply still decodes
+        with FPGAEmulator(baudrate=baud, tx_formats=(TX_RAW,)) as emu:
+            mgr = FPGAUartManager(emu.port, baudrate=baud, settle_s=0, reply_timeout_s=2.0, tx_format="rle")
+            ok = mgr.send_image_to_fpga(img, out)
+            same = ok and read_hex_file(out) == emu.edge_maps[-1]
+            print(f"raw-only board: ok={ok}, {mgr.last_rx_bytes} bytes (mode {mgr.last_rx_mode}), "
+                  f"reply matches model={same}")
+    finally:
+        if os.path.exists(out):
+            os.remove(out)
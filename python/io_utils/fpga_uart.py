@@ -1,25 +1,109 @@
-import serial
+import asyncio
 import time
 import os
+import numpy as np
 from PIL import Image
-from config import W, H
+from config import W, H, FPGA_TX_FORMAT
+from .serial_transport import SerialTransport, run_sync
+from .edge_link import tx_format_code, format_select, reply_size, decode_edge_reply
+from .hex_codec import write_hex_file, decode_hex_words, write_bit_text_file
 
 
 class FPGAUartManager:
-    def __init__(self, port, baudrate=115200):
+    def __init__(self, port, baudrate=115200, chunk_size=4096, max_ahead_s=0.05,
+                 settle_s=3.0, trigger_gap_s=0.1, reply_timeout_s=10.0, tx_format=FPGA_TX_FORMAT):
         self.port = port
         self.baudrate = baudrate
+        self.chunk_size = chunk_size      # bytes per write
+        self.max_ahead_s = max_ahead_s    # how far writes may run ahead of the wire
+        self.settle_s = settle_s          # 포트 오픈 후 FPGA 보드 리셋 대기 시간
+        self.trigger_gap_s = trigger_gap_s  # 트리거 바이트와 데이터 사이 간격
+        self.reply_timeout_s = reply_timeout_s  # 응답 데이터가 끊긴 채 기다리는 최대 시간
         self.is_receiving = False
+        self.last_tx_rate = None          # measured bytes/s of the last upload
+        tx_format_code(tx_format)
+        self.tx_format = tx_format        # 요청할 엣지맵 응답 형식 ("raw" / "1bpp" / "rle", edge_link.py)
+        self.last_rx_mode = None          # mode the FPGA actually replied with (TX_RAW / TX_1BPP / TX_RLE)
+        self.last_rx_bytes = None         # bytes on the wire for the last edge-map reply
+
+    async def _write_paced(self, t, payload, progress_cb=None, pct_start=0, pct_end=100):
+        """
+        Write a contiguous payload in chunk_size pieces, paced to the link.
+
+        The drain rate starts at the nominal 8N1 rate (baud/10 bytes/s) and is
+        re-measured from out_waiting when the driver reports it, so the
+        OS transmit queue never holds more than ~max_ahead_s of data.
+        """
+        view = memoryview(payload)
+        total = len(view)
+        nominal = self.baudrate / 10.0
+        rate = nominal
+        t0 = time.time()
+        sent = 0
+        while sent < total:
+            chunk = view[sent:sent + self.chunk_size]
+            await t.write(chunk)
+            sent += len(chunk)
+
+            elapsed = time.time() - t0
+            queued = t.out_waiting
+            if queued is None:
+                queued = max(0.0, sent - rate * elapsed)    # nominal estimate
+            elif elapsed > 0.1:
+                rate = max(nominal * 0.1, (sent - queued) / elapsed)   # measured drain rate
+
+            ahead = queued / rate
+            if ahead > self.max_ahead_s:
+                await asyncio.sleep(ahead - self.max_ahead_s)
+
+            if progress_cb:
+                progress_cb(pct_start + int((sent / total) * (pct_end - pct_start)))
+
+        await t.flush()
+        self.last_tx_rate = total / max(time.time() - t0, 1e-9)
+        print(f"TX {total} bytes at {self.last_tx_rate:.0f} B/s")
+
+    async def _open_session(self, t, trigger, tx_format=None):
+        """포트 안정화 대기 -> 버퍼 비우기 -> (응답 형식 선택) -> 트리거 바이트 송신"""
+        await asyncio.sleep(self.settle_s)
+        t.reset_input_buffer()
+        select = format_select(tx_format) if tx_format is not None else b""
+        await t.write(select + bytes([trigger]), flush=True)
+        await asyncio.sleep(self.trigger_gap_s)
+
+    async def _read_reply(self, t, n, progress=None):
+        """n 바이트 응답 수신 (reply_timeout_s 동안 데이터가 없으면 TimeoutError)"""
+        try:
+            return await t.read_exactly(n, idle_timeout=self.reply_timeout_s, progress=progress)
+        except TimeoutError as e:
+            raise TimeoutError(f"FPGA 응답 없음 (Timeout): {e}") from None
+
+    async def _read_edge_reply(self, t, n, progress=None):
+        """
+        Read an edge-map reply for n pixels in whichever format the FPGA sent (raw, or header + 1bpp / RLE).
+
+        Args:
+            progress: called with (bytes received, reply length) while the reply arrives
+
+        Returns:
+            n bytes, one per pixel (0x00 / 0xFF)
+        """
+        reply = bytearray(await self._read_reply(t, 1))
+        while len(reply) < reply_size(reply, n):
+            total, base = reply_size(reply, n), len(reply)
+            cb = (lambda k: progress(base + k, total)) if progress else None
+            reply += await self._read_reply(t, total - base, cb)
+        self.last_rx_mode, pixels = decode_edge_reply(bytes(reply), n)
+        self.last_rx_bytes = len(reply)
+        return pixels
 
 
     def save_as_mem(self, img_obj, mem_path, target_size):
         """이미지를 FPGA용 .mem 형식으로 변환"""
         rgb_img = img_obj.resize(target_size, Image.Resampling.LANCZOS).convert("RGB")
         try:
-            with open(mem_path, "w") as f:
-                pixels = list(rgb_img.getdata())
-                for i, (r, g, b) in enumerate(pixels):
-                    f.write(f"{r:02x}{g:02x}{b:02x}" + ("\n" if (i + 1) % 8 == 0 else " "))
+            # "rrggbb" 토큰, 한 줄에 8픽셀
+            write_hex_file(mem_path, np.asarray(rgb_img, dtype=np.uint8), word_bytes=3, sep=" ", per_line=8)
             return True
         except Exception as e:
             print(f"파일 저장 실패: {e}")
@@ -27,98 +111,72 @@ class FPGAUartManager:
 
     def process_serial_communication(self, mem_path, filtered_path, progress_cb=None, target_size=None):
         """AA 트리거 송신 -> 데이터 송신 -> 데이터 수신 로직"""
-        ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=20)
-        try:
-            if ser.is_open:
-                time.sleep(3)
-                ser.reset_input_buffer()
-                ser.reset_output_buffer()
-
-                # [A] 트리거 송신
-                ser.write(bytes.fromhex("30"))
-                ser.flush()
-                time.sleep(0.1)
-
-                # [B] 데이터 송신
-                with open(mem_path, 'r') as f:
-                    pixels = f.read().split()
-
-                total = len(pixels)
-                for i, hex_val in enumerate(pixels):
-                    if len(hex_val) == 6:
-                        ser.write(bytes.fromhex(hex_val))
-                    if i % 500 == 0:
-                        time.sleep(0.001)
-                    if progress_cb and i % 1000 == 0:
-                        progress_cb(int((i / total) * 100))
-
-                # [C] 데이터 수신 대기
-                start_wait = time.time()
-                while ser.in_waiting == 0:
-                    if time.time() - start_wait > 10:
-                        raise Exception("FPGA 응답 없음 (Timeout)")
-                    time.sleep(0.01)
-
-                # [D] 데이터 수신
-                received_raw = ser.read(target_size)
-                if received_raw:
-                    with open(filtered_path, "w") as f_out:
-                        # f_out.write(HEADER_FPGA)   # header
-                        for j in range(0, len(received_raw), 3):
-                            chunk = received_raw[j:j + 3]
-                            if len(chunk) == 3:
-                                f_out.write(chunk.hex())
-                    return True
+        return run_sync(self.process_serial_communication_async(mem_path, filtered_path, progress_cb, target_size))
+
+    async def process_serial_communication_async(self, mem_path, filtered_path, progress_cb=None, target_size=None):
+        async with SerialTransport(self.port, self.baudrate) as t:
+            # [A] 트리거 송신
+            await self._open_session(t, 0x30)
+
+            # [B] 데이터 송신 (토큰을 한 번에 바이트 버퍼로 변환 후 청크 단위 송신)
+            with open(mem_path, 'r') as f:
+                payload = decode_hex_words(f.read(), 6, skip_other=True)
+            await self._write_paced(t, payload, progress_cb)
+
+            # [C] 데이터 수신 (첫 바이트 및 수신 중 끊김 모두 reply_timeout_s 제한)
+            received_raw = await self._read_reply(t, target_size)
+            if received_raw:
+                # f_out.write(HEADER_FPGA)   # header
+                # 완전한 RGB 3바이트 단위까지만 저장
+                write_hex_file(filtered_path, received_raw[:len(received_raw) - len(received_raw) % 3])
+                return True
             return False
-        finally:
-            ser.close()
 
     def trigger_and_receive_mode(self, save_path, progress_cb=None, target_size=None):
         """[개선] 0xBB 트리거 송신 직후 즉시 수신 모드로 전환 (카메라 탭용)"""
+        return run_sync(self.trigger_and_receive_mode_async(save_path, progress_cb, target_size))
+
+    async def trigger_and_receive_mode_async(self, save_path, progress_cb=None, target_size=None):
         self.is_receiving = True
         received_data = bytearray()
-        start_time = time.time()  # 타임아웃 체크용
 
         try:
             # 포트를 열고 송수신을 한 세션에서 처리
-            ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
-
-            if ser.is_open:
-                # 1. 트리거(0xBB) 송신 - 카메라 모드
-                ser.write(bytes.fromhex("BB"))
-                ser.flush()
+            async with SerialTransport(self.port, self.baudrate) as t:
+                # 1. 응답 형식 선택 + 트리거(0xBB) 송신 - 카메라 모드 (이전 요청의 잔여 수신 데이터는 버림)
+                t.reset_input_buffer()
+                await t.write(format_select(self.tx_format) + bytes.fromhex("BB"), flush=True)
                 print("Trigger 0xBB sent. Entering receive mode...")
 
-                # 2. 즉시 수신 루프 진입
-                while self.is_receiving and len(received_data) < target_size:
-                    # 10초간 데이터가 전혀 오지 않으면 튕김 방지를 위해 탈출
-                    if time.time() - start_time > 10:
-                        print("Timeout: No response from FPGA")
-                        break
-
-                    if ser.in_waiting > 0:
-                        chunk = ser.read(ser.in_waiting)
-                        received_data.extend(chunk)
-                        start_time = time.time()  # 데이터가 들어오면 타이머 리셋
-
-                        # 진행률 업데이트 (매번 또는 완료 시)
-                        if progress_cb:
-                            p = int((len(received_data) / target_size) * 100)
-                            progress_cb(min(p, 100))
-
-                    # GUI가 멈추지 않도록 제어권 반환 (Main 쪽에서 호출 시 필요)
-                    time.sleep(0.001)
-
-                if len(received_data) >= target_size:
-                    with open(save_path, "w") as f:
-                        f.write(received_data.hex())
+                # 2. 즉시 수신 루프 진입 (0.1초마다 is_receiving 취소 여부 확인)
+                #    응답 길이는 첫 바이트/헤더를 받은 뒤 확정 (raw: target_size, 1bpp/RLE: 헤더 + 길이)
+                last_rx = time.time()
+                expected = target_size
+                while self.is_receiving and len(received_data) < expected:
+                    chunk = await t.read_any(timeout=0.1, max_bytes=expected - len(received_data))
+                    if not chunk:
+                        # 10초간 데이터가 전혀 오지 않으면 튕김 방지를 위해 탈출
+                        if time.time() - last_rx > self.reply_timeout_s:
+                            print("Timeout: No response from FPGA")
+                            break
+                        continue
+                    received_data.extend(chunk)
+                    last_rx = time.time()  # 데이터가 들어오면 타이머 리셋
+                    expected = reply_size(received_data, target_size)
+
+                    if progress_cb:
+                        p = int((len(received_data) / expected) * 100)
+                        progress_cb(min(p, 100))
+
+                if len(received_data) >= expected:
+                    self.last_rx_mode, pixels = decode_edge_reply(bytes(received_data), target_size)
+                    self.last_rx_bytes = len(received_data)
+                    write_hex_file(save_path, pixels)
                     return True
             return False
         except Exception as e:
             print(f"통신 에러: {e}")
             return False
-        finally:
-            if 'ser' in locals(): ser.close()
 
     def send_image_to_fpga(self, img_obj, filtered_path, progress_cb=None):
         """
@@ -132,86 +190,39 @@ class FPGAUartManager:
         Returns:
             bool: 성공 여부
         """
-        ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=20)
-        try:
-            if ser.is_open:
-                time.sleep(3)
-                ser.reset_input_buffer()
-                ser.reset_output_buffer()
+        return run_sync(self.send_image_to_fpga_async(img_obj, filtered_path, progress_cb))
 
-                # 이미지를 WxH로 리사이징하고 RGB로 변환
+    async def send_image_to_fpga_async(self, img_obj, filtered_path, progress_cb=None):
+        try:
+            async with SerialTransport(self.port, self.baudrate) as t:
+                # 이미지를 WxH로 리사이징하고 RGB888 연속 버퍼로 변환 (행 우선, R/G/B 순)
                 rgb_img = img_obj.resize((W, H), Image.Resampling.LANCZOS).convert("RGB")
-                pixels = list(rgb_img.getdata())
-                total_pixels = len(pixels)
+                payload = np.asarray(rgb_img, dtype=np.uint8).tobytes()
 
                 # [A] 트리거 송신 (0xAA) - 이미지 전송/드로잉 모드
-                ser.write(bytes.fromhex("AA"))
-                ser.flush()
-                time.sleep(0.1)
-
-                # [B] RGB888 데이터 송신 (R, G, B를 각각 별도의 바이트로 전송)
-                for i, (r, g, b) in enumerate(pixels):
-                    ser.write(bytes([r, g, b]))
-                    
-                    # 진행률 업데이트 (송신: 0-50%)
-                    if progress_cb and i % 1000 == 0:
-                        progress_cb(int((i / total_pixels) * 50))  # 송신은 0-50%
-                    
-                    # 너무 빠르게 보내지 않도록 약간의 딜레이
-                    if i % 500 == 0:
-                        time.sleep(0.001)
-
-                ser.flush()
+                await self._open_session(t, 0xAA, self.tx_format)
+
+                # [B] RGB888 데이터 송신 (청크 단위, 링크 속도에 맞춰 페이싱) - 진행률 0-50%
+                await self._write_paced(t, payload, progress_cb, 0, 50)
                 if progress_cb:
                     progress_cb(50)  # 송신 완료
 
-                # [C] 데이터 수신 대기
-                start_wait = time.time()
-                while ser.in_waiting == 0:
-                    if time.time() - start_wait > 10:
-                        raise Exception("FPGA 응답 없음 (Timeout)")
-                    time.sleep(0.01)
-
-                # [D] 데이터 수신 (W*H 바이트) - 청크 단위로 읽으면서 진행률 업데이트
-                target_size = W * H  # 픽셀당 1바이트
-                received_raw = bytearray()
-                while len(received_raw) < target_size:
-                    if ser.in_waiting > 0:
-                        chunk = ser.read(min(ser.in_waiting, target_size - len(received_raw)))
-                        received_raw.extend(chunk)
-                        
-                        # 진행률 업데이트 (수신: 50-100%)
-                        if progress_cb:
-                            p = 50 + int((len(received_raw) / target_size) * 50)
-                            progress_cb(min(p, 100))
-                    time.sleep(0.001)
-                
-                received_raw = bytes(received_raw)
-                
+                # [C] 데이터 수신 (raw / 1bpp / RLE -> W*H 바이트, 픽셀당 1바이트) - 진행률 50-100%
+                progress = None
+                if progress_cb:
+                    progress = lambda n, total: progress_cb(min(50 + int((n / total) * 50), 100))
+                received_raw = await self._read_edge_reply(t, W * H, progress)
+
                 if received_raw:
-                    with open(filtered_path, "w") as f_out:
-                        # Hex 텍스트 형식으로 저장 (2자리씩)
-                        for byte_val in received_raw:
-                            f_out.write(f"{byte_val:02x}")
+                    # Hex 텍스트 형식으로 저장 (2자리씩)
+                    write_hex_file(filtered_path, received_raw)
                     return True
             return False
         except Exception as e:
             print(f"FPGA 통신 에러: {e}")
             return False
-        finally:
-            ser.close()
 
     def convert_hex_to_binary_text(self, hex_path, bin_path):
         """수신된 Hex 파일을 일자 나열된 Binary 텍스트로 변환"""
-        with open(hex_path, 'r') as f_mem:
-            hex_content = f_mem.read()
-
-        all_bits = []
-        for char in hex_content:
-            if char in '0123456789abcdefABCDEF':
-                # 16진수 한 자리를 4비트로 변환하여 8비트(1바이트) 쌍을 맞춤
-                decimal_val = int(char, 16)
-                all_bits.append(format(decimal_val, '08b'))
-
-        with open(bin_path, 'w') as f_bin:
-            f_bin.write("".join(all_bits))
\ No newline at end of file
+        # 16진수 한 자리를 4비트로 변환하여 8비트(1바이트) 쌍을 맞춤 (hex_codec.hex_to_bit_text)
+        write_bit_text_file(hex_path, bin_path)
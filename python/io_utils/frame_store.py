@@ -0,0 +1,219 @@
+# io_utils/frame_store.py
+"""
+Binary frame files readable with np.memmap (no hex parsing).
+
+Layout: a 32-byte little-endian header followed by the raw frame bytes.
+    magic    4s  b"PPFR"
+    version  B   1
+    fmt      B   FMT_1BPP / FMT_8BPP / FMT_RGB888
+    bitorder B   0 = "big" (MSB first), 1 = "little"  (1bpp only)
+    reserved B
+    width    I
+    height   I
+    offset   I   start of the frame data (32)
+    length   Q   number of data bytes
+    (4 pad bytes)
+
+Data is row-major: 1bpp is packed (w*h+7)//8 bytes, 8bpp is w*h bytes,
+RGB888 is w*h*3 bytes in R, G, B order.
+"""
+from __future__ import annotations
+import glob
+import os
+import re
+import struct
+from typing import Dict, NamedTuple, Optional
+import numpy as np
+
+from .unpacker import load_hex_txt_to_bytes
+
+FMT_1BPP = 1
+FMT_8BPP = 8
+FMT_RGB888 = 24
+
+FRAME_EXT = ".frame"
+_MAGIC = b"PPFR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBBBIIIQ4x")
+_BITORDERS = ("big", "little")
+
+
+class FrameHeader(NamedTuple):
+    fmt: int
+    width: int
+    height: int
+    bitorder: str
+    offset: int
+    length: int
+
+
+def frame_nbytes(fmt: int, width: int, height: int) -> int:
+    # Number of data bytes for a frame of the given format and size.
+    if fmt == FMT_1BPP:
+        return (width * height + 7) // 8
+    if fmt == FMT_8BPP:
+        return width * height
+    if fmt == FMT_RGB888:
+        return width * height * 3
+    raise ValueError(f"Unknown frame format {fmt}")
+
+
+def write_frame(
+    path: str,
+    data,
+    fmt: int,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    bitorder: str = "big",
+) -> FrameHeader:
+    """
+    Write a frame file.
+
+    Args:
+        data: either an image array - (h,w) for 1bpp (nonzero = 1) / 8bpp, (h,w,3) for RGB888 -
+              or raw frame bytes (then width and height are required)
+        fmt: FMT_1BPP, FMT_8BPP or FMT_RGB888
+        bitorder: bit order of packed 1bpp data
+    """
+    if bitorder not in _BITORDERS:
+        raise ValueError("bitorder must be 'big' or 'little'")
+
+    if isinstance(data, np.ndarray):
+        height, width = data.shape[:2]
+        if fmt == FMT_1BPP:
+            payload = np.packbits(data.reshape(-1) > 0, bitorder=bitorder).tobytes()
+        elif fmt == FMT_RGB888 and (data.ndim != 3 or data.shape[2] != 3):
+            raise ValueError(f"RGB888 frame must be (h,w,3), got {data.shape}")
+        elif fmt == FMT_8BPP and data.ndim != 2:
+            raise ValueError(f"8bpp frame must be (h,w), got {data.shape}")
+        else:
+            payload = np.ascontiguousarray(data, dtype=np.uint8).tobytes()
+    else:
+        if width is None or height is None:
+            raise ValueError("width and height are required for raw frame bytes")
+        payload = bytes(data)
+
+    expected = frame_nbytes(fmt, width, height)
+    if len(payload) != expected:
+        raise ValueError(f"Frame data must be {expected} bytes, got {len(payload)} bytes.")
+
+    header = FrameHeader(fmt, width, height, bitorder, _HEADER.size, len(payload))
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, fmt, _BITORDERS.index(bitorder), 0,
+                             width, height, header.offset, header.length))
+        f.write(payload)
+    return header
+
+
+def read_frame_header(path: str) -> FrameHeader:
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ValueError(f"{path}: too short for a frame header")
+    magic, version, fmt, bitorder, _, width, height, offset, length = _HEADER.unpack(raw)
+    if magic != _MAGIC:
+        raise ValueError(f"{path}: not a frame file (magic {magic!r})")
+    if version != _VERSION:
+        raise ValueError(f"{path}: unsupported frame version {version}")
+    if length != frame_nbytes(fmt, width, height):
+        raise ValueError(f"{path}: header length {length} does not match {width}x{height} fmt {fmt}")
+    return FrameHeader(fmt, width, height, _BITORDERS[bitorder], offset, length)
+
+
+def open_frame(path: str):
+    """
+    Memory-map a frame without parsing or copying.
+
+    Returns:
+        header: FrameHeader
+        data: read-only np.memmap - (h,w) for 8bpp, (h,w,3) for RGB888,
+              packed (length,) bytes for 1bpp
+    """
+    header = read_frame_header(path)
+    if header.fmt == FMT_8BPP:
+        shape = (header.height, header.width)
+    elif header.fmt == FMT_RGB888:
+        shape = (header.height, header.width, 3)
+    else:
+        shape = (header.length,)
+    return header, np.memmap(path, dtype=np.uint8, mode="r", offset=header.offset, shape=shape)
+
+
+def load_frame(path: str) -> np.ndarray:
+    # Decoded frame: 1bpp -> (h,w) uint8 {0,1}; 8bpp/RGB888 -> memmap view as in open_frame.
+    header, data = open_frame(path)
+    if header.fmt != FMT_1BPP:
+        return data
+    bits = np.unpackbits(data, bitorder=header.bitorder)[: header.width * header.height]
+    return bits.reshape((header.height, header.width))
+
+
+# --- importer for the legacy hex artifacts in images/ ---
+_LEGACY_PATTERNS = (
+    # (glob, regex for idx, fmt, output name)
+    ("image_*.mem", r"image_(\d+)\.mem$", FMT_RGB888, "image_{idx}"),
+    ("filter_*.mem", r"filter_(\d+)\.mem$", FMT_8BPP, "filter_{idx}"),
+    ("05_canny_packed_1bpp_hex_*.txt", r"_hex_(\d+)\.txt$", FMT_1BPP, "canny_1bpp_{idx}"),
+    ("05_canny_pixels_hex_*.txt", r"_hex_(\d+)\.txt$", FMT_8BPP, "canny_8bpp_{idx}"),
+)
+
+
+def import_hex_frame(
+    hex_path: str,
+    out_path: str,
+    fmt: int,
+    width: int,
+    height: int,
+    bitorder: str = "big",
+) -> FrameHeader:
+    """
+    Convert one hex text artifact (.mem / .txt, stream or token layout) to a frame file.
+    Extra trailing bytes are dropped; too few bytes raise ValueError.
+    """
+    raw = load_hex_txt_to_bytes(hex_path)
+    need = frame_nbytes(fmt, width, height)
+    if len(raw) < need:
+        raise ValueError(f"{hex_path}: need {need} bytes for {width}x{height}, have {len(raw)}")
+    return write_frame(out_path, raw[:need], fmt, width, height, bitorder=bitorder)
+
+
+def import_legacy_dir(
+    src_dir: str,
+    dst_dir: str,
+    width: int,
+    height: int,
+    bitorder: str = "big",
+) -> Dict[str, str]:
+    """
+    Import every known hex artifact in src_dir (image_*.mem, filter_*.mem,
+    05_canny_*_hex_*.txt) into frame files in dst_dir.
+
+    Returns:
+        mapping of source path -> frame path (files that failed are reported and skipped)
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    done: Dict[str, str] = {}
+    for pattern, idx_re, fmt, name in _LEGACY_PATTERNS:
+        for src in sorted(glob.glob(os.path.join(src_dir, pattern))):
+            m = re.search(idx_re, os.path.basename(src))
+            if m is None:
+                continue
+            dst = os.path.join(dst_dir, name.format(idx=m.group(1)) + FRAME_EXT)
+            try:
+                import_hex_frame(src, dst, fmt, width, height, bitorder=bitorder)
+                done[src] = dst
+            except ValueError as e:
+                print(f"Skip {src}: {e}")
+    return done
+
+
+if __name__ == "__main__":
+    # Import legacy hex artifacts: python -m io_utils.frame_store [src_dir] [dst_dir] [W] [H]
+    import sys
+    from config import W, H
+    src = sys.argv[1] if len(sys.argv) > 1 else "./images"
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.join(src, "frames")
+    w = int(sys.argv[3]) if len(sys.argv) > 3 else W
+    h = int(sys.argv[4]) if len(sys.argv) > 4 else H
+    imported = import_legacy_dir(src, dst, w, h)
+    print(f"Imported {len(imported)} file(s) into {os.path.abspath(dst)}")
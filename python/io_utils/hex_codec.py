@@ -0,0 +1,214 @@
+# io_utils/hex_codec.py
+"""
+Hex text codec for the .mem / .txt layouts used across the project.
+
+Everything is done in bulk (bytes.hex, bytes.translate, binascii, NumPy lookup tables);
+there is no per-pixel Python loop.
+
+Encode layouts (encode_hex / write_hex_file arguments):
+    stream        "aa00ff..."                    (default)               FPGA replies, 05_canny_*_hex
+    byte tokens   "AA 00 FF ..."                 sep=" ", upper=True     save_hex_txt_bytes(mode="tokens")
+    RGB888 .mem   "rrggbb rrggbb ...(8)\\n..."    word_bytes=3, sep=" ", per_line=8    image_*.mem (save_as_mem)
+    $readmemh     "abcd\\n..."                    word_bytes=2, per_line=1             edge_in_<k>.mem
+With per_line every word is followed by its separator (the last one on a line by "\\n"),
+otherwise separators only go between words.
+
+Decoding:
+    decode_hex(text)                 any layout -> bytes; everything but hex digits is ignored
+    decode_hex_words(text, digits)   whitespace-separated words ($readmemh / .mem), optionally with X/Z words
+    hex_to_bit_text(text)            each hex digit as 8 binary characters (convert_hex_to_binary_text)
+
+Streaming (bounded memory for large files): write_hex_file, iter_hex_file, read_hex_file.
+"""
+from __future__ import annotations
+import binascii
+import re
+from typing import Iterator, Union
+import numpy as np
+
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+_NON_HEX = bytes(sorted(set(range(256)) - set(HEX_DIGITS)))
+_IS_HEX = np.zeros(256, dtype=bool)
+_IS_HEX[np.frombuffer(HEX_DIGITS, dtype=np.uint8)] = True
+# hex digit (ASCII code) -> its value as 8 binary characters, e.g. "f" -> "00001111"
+_BIT_TEXT = np.zeros((256, 8), dtype=np.uint8)
+for _c in HEX_DIGITS:
+    _BIT_TEXT[_c] = np.frombuffer(format(int(chr(_c), 16), "08b").encode("ascii"), dtype=np.uint8)
+_COMMENT = re.compile(r"//[^\n]*")
+
+CHUNK_BYTES = 1 << 20
+
+BytesLike = Union[bytes, bytearray, memoryview, np.ndarray]
+
+
+def _as_bytes(data: BytesLike) -> bytes:
+    if isinstance(data, np.ndarray):
+        return np.ascontiguousarray(data).tobytes()
+    return bytes(data)
+
+
+def encode_hex(data: BytesLike, word_bytes: int = 1, sep: str = "", per_line: int = 0,
+               upper: bool = False) -> str:
+    """
+    Encode bytes as hex text.
+
+    Args:
+        data: bytes, or an array (its raw bytes in memory order - use a big-endian dtype for words)
+        word_bytes: bytes per word (1 = byte tokens, 2 = 16-bit words, 3 = RGB888 pixels)
+        sep: separator between words on a line ("" or a single character)
+        per_line: words per line, 0 = everything on one line
+        upper: upper-case hex digits
+    """
+    raw = _as_bytes(data)
+    if len(sep) > 1:
+        raise ValueError("sep must be '' or a single character")
+    if word_bytes < 1 or len(raw) % word_bytes:
+        raise ValueError(f"{len(raw)} bytes is not a whole number of {word_bytes}-byte words")
+    text = raw.hex()
+    if upper:
+        text = text.upper()
+    n = len(raw) // word_bytes
+    if n == 0 or (not sep and not per_line):
+        return text
+
+    width = 2 * word_bytes
+    out = np.empty((n, width + 1), dtype=np.uint8)
+    out[:, :width] = np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape(n, width)
+    out[:, width] = ord(sep or "\n")
+    keep = np.ones((n, width + 1), dtype=bool)
+    if not sep:
+        keep[:, width] = False
+    if per_line:
+        out[per_line - 1::per_line, width] = ord("\n")
+        keep[per_line - 1::per_line, width] = True
+    else:
+        keep[-1, width] = False
+    return out[keep].tobytes().decode("ascii")
+
+
+def hex_digits(text: Union[str, bytes]) -> bytes:
+    # Only the hex digits of text (ASCII bytes), everything else dropped.
+    if isinstance(text, str):
+        text = text.encode("latin-1", errors="ignore")
+    return text.translate(None, _NON_HEX)
+
+
+def decode_hex(text: Union[str, bytes]) -> bytes:
+    # Any layout (stream, tokens, lines) -> bytes; ValueError on an odd digit count.
+    digits = hex_digits(text)
+    if len(digits) % 2:
+        raise ValueError(f"Hex string length must be even, got {len(digits)}.")
+    return binascii.unhexlify(digits)
+
+
+def decode_hex_words(text: Union[str, bytes], digits: int, unknown: bool = False,
+                     skip_other: bool = False):
+    """
+    Decode whitespace-separated hex words of up to `digits` digits ($readmemh / .mem files).
+    "//" comments are ignored; shorter words are zero-padded like $readmemh does.
+
+    Args:
+        digits: digits per word (2 = bytes, 4 = 16-bit, 6 = RGB888)
+        unknown: accept words with X/Z (any non-hex) digits; they decode as 0
+        skip_other: drop words of any other length instead of raising ValueError
+
+    Returns:
+        bytes (words big-endian, digits // 2 bytes each); with unknown=True, (bytes, known)
+        where known is a bool array with one entry per word
+    """
+    if isinstance(text, bytes):
+        text = text.decode("latin-1")
+    if "//" in text:
+        text = _COMMENT.sub("", text)
+    words = text.split()
+    lens = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    if skip_other:
+        words = [w for w, k in zip(words, lens == digits) if k]
+    elif (lens > digits).any():
+        i = int(np.argmax(lens > digits))
+        raise ValueError(f"Hex word '{words[i]}' is longer than {digits} digits")
+    elif (lens < digits).any():
+        words = [w.zfill(digits) for w in words]
+
+    arr = np.frombuffer("".join(words).encode("latin-1"), dtype=np.uint8).reshape(len(words), digits)
+    known = None
+    if unknown:
+        known = _IS_HEX[arr].all(axis=1)
+        if not known.all():
+            arr = arr.copy()
+            arr[~known] = ord("0")
+    elif not _IS_HEX[arr].all():
+        raise ValueError("Non-hex digits in hex words")
+    data = binascii.unhexlify(arr.tobytes()) if digits % 2 == 0 else _unhexlify_odd(arr)
+    return (data, known) if unknown else data
+
+
+def _unhexlify_odd(arr: np.ndarray) -> bytes:
+    # Odd digit counts (e.g. 1-digit words): pad every word with a leading "0".
+    padded = np.full((arr.shape[0], arr.shape[1] + 1), ord("0"), dtype=np.uint8)
+    padded[:, 1:] = arr
+    return binascii.unhexlify(padded.tobytes())
+
+
+def hex_to_bit_text(text: Union[str, bytes]) -> str:
+    # Every hex digit as 8 binary characters ("f" -> "00001111"), the layout of convert_hex_to_binary_text.
+    digits = np.frombuffer(hex_digits(text), dtype=np.uint8)
+    return _BIT_TEXT[digits].tobytes().decode("ascii")
+
+
+# --- files (chunked, so large files never need the whole text in memory) ---
+def write_hex_file(path: str, data: BytesLike, word_bytes: int = 1, sep: str = "", per_line: int = 0,
+                   upper: bool = False, chunk_bytes: int = CHUNK_BYTES) -> int:
+    """
+    encode_hex(data, ...) written to path chunk by chunk. Returns the number of bytes encoded.
+    """
+    raw = memoryview(_as_bytes(data))
+    if word_bytes < 1 or len(raw) % word_bytes:
+        raise ValueError(f"{len(raw)} bytes is not a whole number of {word_bytes}-byte words")
+    # chunks hold whole words (and whole lines), so the layout is the same as one encode_hex call
+    unit = word_bytes * max(per_line, 1)
+    step = max(1, chunk_bytes // unit) * unit
+    with open(path, "w", encoding="ascii") as f:
+        for start in range(0, len(raw), step):
+            if start and sep and not per_line:
+                f.write(sep)
+            f.write(encode_hex(raw[start:start + step], word_bytes, sep, per_line, upper))
+    return len(raw)
+
+
+def iter_hex_file(path: str, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    # Decoded bytes of a hex text file of any layout, one chunk at a time.
+    carry = b""
+    n = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            digits = carry + hex_digits(block)
+            n += len(digits) - len(carry)
+            cut = len(digits) & ~1
+            carry = digits[cut:]
+            if cut:
+                yield binascii.unhexlify(digits[:cut])
+    if carry:
+        raise ValueError(f"Hex string length must be even, got {n}.")
+
+
+def read_hex_file(path: str) -> bytes:
+    # Whole file decoded with the decode_hex rules, read in chunks.
+    return b"".join(iter_hex_file(path))
+
+
+def write_bit_text_file(hex_path: str, bin_path: str, chunk_bytes: int = CHUNK_BYTES) -> int:
+    # hex_to_bit_text of a whole file, streamed. Returns the number of hex digits converted.
+    n = 0
+    with open(hex_path, "rb") as f_in, open(bin_path, "w", encoding="ascii") as f_out:
+        while True:
+            block = f_in.read(chunk_bytes)
+            if not block:
+                break
+            digits = hex_digits(block)
+            n += len(digits)
+            f_out.write(_BIT_TEXT[np.frombuffer(digits, dtype=np.uint8)].tobytes().decode("ascii"))
+    return n
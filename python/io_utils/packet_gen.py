@@ -1,6 +1,8 @@
 # packet_gen/commands.py
 from __future__ import annotations
-from typing import List
+import re
+import struct
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 import numpy as np
 
 
@@ -14,11 +16,146 @@ def format_cmd(x_mm: float, y_mm: float, z: int) -> str:
     return f"x:{x_mm:05.1f}y:{y_mm:05.1f}z:{z:d}\n"
 
 
+_CMD_RE = re.compile(r"x:(-?[0-9.]+)y:(-?[0-9.]+)z:(-?\d+)")
+
+
+def parse_cmd(line: str) -> Tuple[float, float, int]:
+    # Parse one ASCII command line back to (x_mm, y_mm, z).
+    m = _CMD_RE.search(line)
+    if m is None:
+        raise ValueError(f"Not a command line: {line!r}")
+    return float(m.group(1)), float(m.group(2)), int(m.group(3))
+
+
+# Binary frame (6 bytes, little-endian):
+#   [0]    SYNC (0xA5)
+#   [1:3]  X as int16, 0.1 mm units
+#   [3:5]  Y as int16, 0.1 mm units
+#   [5]    flags: bit0 = pen state (z), bits1-3 reserved (0),
+#          bits4-7 = XOR of the nibbles of bytes [1:5] and the low flag nibble
+BINARY_SYNC = 0xA5
+BINARY_FRAME_LEN = 6
+_FRAME = struct.Struct("<BhhB")
+
+
+def _frame_check(body: bytes, flags_lo: int) -> int:
+    # 4-bit XOR checksum over the payload bytes and the low nibble of flags.
+    c = flags_lo & 0x0F
+    for b in body:
+        c ^= (b >> 4) ^ (b & 0x0F)
+    return c
+
+
+def _to_fixed(v_mm: float) -> int:
+    # Quantize to 0.1 mm exactly like the ASCII "%05.1f" formatting.
+    q = int(round(round(v_mm, 1) * 10))
+    if not -32768 <= q <= 32767:
+        raise ValueError(f"Coordinate {v_mm} mm does not fit int16 at 0.1 mm resolution.")
+    return q
+
+
+def encode_cmd_binary(x_mm: float, y_mm: float, z: int) -> bytes:
+    """
+    Encode one command as a 6-byte binary frame (see BINARY_SYNC layout above).
+    """
+    if z not in (0, 1):
+        raise ValueError(f"Binary frames carry a 1-bit pen state, got z={z}")
+    body = struct.pack("<hh", _to_fixed(x_mm), _to_fixed(y_mm))
+    flags = (_frame_check(body, z) << 4) | z
+    return bytes([BINARY_SYNC]) + body + bytes([flags])
+
+
+def decode_cmd_binary(frame: bytes) -> Tuple[float, float, int]:
+    """
+    Decode one 6-byte binary frame to (x_mm, y_mm, z). Raises ValueError on a bad frame.
+    """
+    if len(frame) != BINARY_FRAME_LEN:
+        raise ValueError(f"Frame must be {BINARY_FRAME_LEN} bytes, got {len(frame)}.")
+    sync, xq, yq, flags = _FRAME.unpack(frame)
+    if sync != BINARY_SYNC:
+        raise ValueError(f"Bad sync byte 0x{sync:02X}.")
+    if flags & 0x0E or (flags >> 4) != _frame_check(frame[1:5], flags):
+        raise ValueError("Frame checksum mismatch.")
+    return xq / 10.0, yq / 10.0, flags & 0x01
+
+
+def decode_binary_stream(data: bytes) -> Tuple[List[Tuple[float, float, int]], int]:
+    """
+    Reference decoder for a byte stream of binary frames.
+    On a bad frame it drops one byte and hunts for the next sync byte.
+
+    Returns:
+        cmds: list of (x_mm, y_mm, z)
+        n_skipped: number of bytes discarded while resynchronizing
+    """
+    cmds: List[Tuple[float, float, int]] = []
+    i, skipped = 0, 0
+    n = len(data)
+    while i + BINARY_FRAME_LEN <= n:
+        if data[i] == BINARY_SYNC:
+            try:
+                cmds.append(decode_cmd_binary(bytes(data[i:i + BINARY_FRAME_LEN])))
+                i += BINARY_FRAME_LEN
+                continue
+            except ValueError:
+                pass
+        i += 1
+        skipped += 1
+    return cmds, skipped + (n - i)
+
+
+def ascii_to_binary(cmds: List[str]) -> bytes:
+    # Convert ASCII command lines (format_cmd output) to one binary frame stream.
+    return b"".join(encode_cmd_binary(*parse_cmd(line)) for line in cmds if line.strip())
+
+
+def iter_command_sequence_from_contours_xy(
+    contours_xy: Iterable[np.ndarray],
+    pen_up_z: int = 1,
+    pen_down_z: int = 0,
+    fmt: str = "ascii",
+) -> Iterator[Union[str, bytes]]:
+    """
+    Generator form of build_command_sequence_from_contours_xy: yields the same commands, one
+    contour at a time, so contours_xy may itself be a lazy iterator (streaming to the plotter).
+    """
+    if fmt == "ascii":
+        emit = format_cmd
+    elif fmt == "binary":
+        emit = encode_cmd_binary
+    else:
+        raise ValueError("fmt must be 'ascii' or 'binary'")
+
+    # Initial state: pen up at current position (position may be ignored by MCU)
+    yield emit(0.0, 0.0, pen_up_z)
+
+    for c in contours_xy:
+        if c is None or len(c) == 0:
+            continue
+
+        # Move to contour start with pen up
+        x0, y0 = float(c[0, 0]), float(c[0, 1])
+        yield emit(x0, y0, pen_up_z)
+
+        # Draw contour with pen down
+        for p in c:
+            x, y = float(p[0]), float(p[1])
+            yield emit(x, y, pen_down_z)
+
+        # Lift pen after finishing contour
+        x1, y1 = float(c[-1, 0]), float(c[-1, 1])
+        yield emit(x1, y1, pen_up_z)
+
+    # Return to origin (0, 0) at the end
+    yield emit(0.0, 0.0, pen_up_z)
+
+
 def build_command_sequence_from_contours_xy(
     contours_xy: List[np.ndarray],
     pen_up_z: int = 1,
     pen_down_z: int = 0,
-) -> List[str]:
+    fmt: str = "ascii",
+) -> List[Union[str, bytes]]:
     """
     Build commands:
       - Start with pen up
@@ -29,32 +166,155 @@ def build_command_sequence_from_contours_xy(
 
     Args:
         contours_mm: list of (N,2) mm polylines (already densified)
+        fmt: "ascii" (format_cmd lines) or "binary" (6-byte encode_cmd_binary frames)
     Returns:
-        list of command strings
+        list of command strings (ascii) or frames (binary)
     """
-    cmds: List[str] = []
+    return list(iter_command_sequence_from_contours_xy(contours_xy, pen_up_z, pen_down_z, fmt))
 
-    # Initial state: pen up at current position (position may be ignored by MCU)
-    cmds.append(format_cmd(0.0, 0.0, pen_up_z))
 
-    for c in contours_xy:
-        if c is None or len(c) == 0:
+def _merge_ok(a, c, pts, tol_q: float) -> bool:
+    # True if every point lies within tol_q of segment a->c and projects inside it (no backtracking).
+    ax, ay, cx, cy = a[0], a[1], c[0], c[1]
+    vx, vy = cx - ax, cy - ay
+    L2 = vx * vx + vy * vy
+    if L2 == 0:
+        return False
+    lim = tol_q * tol_q * L2
+    for p in pts:
+        px, py = p[0] - ax, p[1] - ay
+        cross = vx * py - vy * px
+        dot = vx * px + vy * py
+        if cross * cross > lim or dot < 0 or dot > L2:
+            return False
+    return True
+
+
+def _peep_decode(cmds):
+    # (x, y, z) in integer 0.1 mm units plus the original command; blank ASCII lines are skipped.
+    for cmd in cmds:
+        if isinstance(cmd, (bytes, bytearray)):
+            x, y, z = decode_cmd_binary(cmd)
+        elif cmd.strip():
+            x, y, z = parse_cmd(cmd)
+        else:
             continue
+        yield (_to_fixed(x), _to_fixed(y), z, cmd)
 
-        # Move to contour start with pen up
-        x0, y0 = float(c[0, 0]), float(c[0, 1])
-        cmds.append(format_cmd(x0, y0, pen_up_z))
 
-        # Draw contour with pen down
-        for p in c:
-            x, y = float(p[0]), float(p[1])
-            cmds.append(format_cmd(x, y, pen_down_z))
+def _peep_zero_length(items, stats):
+    # 1) a command equal to the previous one (same XY and z) is dropped; the first is kept
+    prev = None
+    for it in items:
+        if prev is not None and it[:3] == prev[:3]:
+            stats["zero_length"] += 1
+            continue
+        prev = it
+        yield it
 
-        # Lift pen after finishing contour
-        x1, y1 = float(c[-1, 0]), float(c[-1, 1])
-        cmds.append(format_cmd(x1, y1, pen_up_z))
 
-    # Return to origin (0, 0) at the end
-    cmds.append(format_cmd(0.0, 0.0, pen_up_z))
+def _peep_z_collapse(items, stats):
+    # 2) pen change in place, followed by a move that keeps the new pen state (one item lookahead)
+    prev = cur = None
+    for nxt in items:
+        if cur is not None:
+            if (prev is not None and cur[:2] == prev[:2] and cur[2] != prev[2]
+                    and nxt[2] == cur[2] and nxt[:2] != cur[:2]):
+                stats["z_collapsed"] += 1
+            else:
+                yield cur
+                prev = cur
+        cur = nxt
+    if cur is not None:
+        yield cur
+
+
+def _peep_collinear(items, stats, tol_q, max_merge):
+    # 3) collinear merge; gaps[k] = points dropped between res[k-1] and res[k].
+    # A merge never reaches back over more than max_merge points, so anything older than
+    # max_merge + 2 entries is final and can be yielded.
+    res, gaps = [], []
+    for c in items:
+        gap = []
+        while len(res) >= 2:
+            a, b = res[-2], res[-1]
+            pts = gaps[-1] + [b] + gap
+            if not (a[2] == b[2] == c[2] and len(pts) <= max_merge and _merge_ok(a, c, pts, tol_q)):
+                break
+            res.pop()
+            gaps.pop()
+            gap = pts
+            stats["collinear"] += 1
+        res.append(c)
+        gaps.append(gap)
+        if len(res) > max_merge + 2:
+            yield res.pop(0)
+            gaps.pop(0)
+    yield from res
+
+
+def iter_optimized_commands(
+    cmds: Iterable[Union[str, bytes]],
+    collinear_tol_mm: float = 0.05,
+    max_merge: int = 64,
+    stats: Optional[dict] = None,
+) -> Iterator[Union[str, bytes]]:
+    """
+    Generator form of optimize_command_stream (same output, bounded lookahead); stats, if given,
+    is updated in place as commands are dropped.
+    """
+    if collinear_tol_mm < 0:
+        raise ValueError(f"collinear_tol_mm must be >= 0, got {collinear_tol_mm}")
+    if stats is None:
+        stats = {}
+    for k in ("zero_length", "z_collapsed", "collinear", "removed"):
+        stats.setdefault(k, 0)
+    items = _peep_decode(cmds)
+    items = _peep_zero_length(items, stats)
+    items = _peep_z_collapse(items, stats)
+    items = _peep_collinear(items, stats, collinear_tol_mm * 10.0, max_merge)
+    for it in items:
+        yield it[3]
+    stats["removed"] = stats["zero_length"] + stats["z_collapsed"] + stats["collinear"]
+
+
+def optimize_command_stream(
+    cmds: List[Union[str, bytes]],
+    collinear_tol_mm: float = 0.05,
+    max_merge: int = 64,
+) -> Tuple[List[Union[str, bytes]], dict]:
+    """
+    Peephole pass over a quantized command stream (ASCII lines or binary frames, output in the same form).
+    The MCU applies a command's pen change before its XY move, which makes these rewrites exact:
+      1) zero-length moves: a command equal to the previous one (same 0.1 mm XY, same z) is dropped
+      2) z-only transitions: a pen change at the current XY followed by a move with the same new z
+         is dropped; the move then carries the pen change (e.g. "lift" + "travel" -> "travel")
+      3) collinear runs: with the pen state unchanged, an intermediate point within collinear_tol_mm
+         of the merged segment (and between its ends) is dropped; at most max_merge points per merge
+    The first command (initial pen-up) is always kept.
+
+    Returns:
+        cmds: optimized command list
+        stats: {"zero_length", "z_collapsed", "collinear", "removed"} command counts
+    """
+    stats: dict = {}
+    out = list(iter_optimized_commands(cmds, collinear_tol_mm, max_merge, stats))
+    return out, stats
+
+
+if __name__ == "__main__":
+    # Loopback check (for standalone testing): ASCII -> binary -> decode -> ASCII must round-trip.
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else "./sample/06_out_commands.txt"
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+
+    stream = ascii_to_binary(lines)
+    decoded, skipped = decode_binary_stream(stream)
+    mismatches = sum(format_cmd(*d) != line for d, line in zip(decoded, lines))
+    ascii_bytes = sum(len(line.encode()) for line in lines)
 
-    return cmds
+    print(f"commands: {len(lines)}, decoded: {len(decoded)}, skipped bytes: {skipped}, mismatches: {mismatches}")
+    print(f"ASCII: {ascii_bytes} B, binary: {len(stream)} B ({ascii_bytes / max(1, len(stream)):.2f}x smaller)")
+    if mismatches or skipped or len(decoded) != len(lines):
+        sys.exit(1)
@@ -0,0 +1,359 @@
+# io_utils/plot_scheduler.py
+"""
+Job scheduler for several STM32 plotters: a queue of planned command files dispatched to a
+pool of serial ports, one transfer per port at a time, all ports concurrently.
+
+    sched = PlotScheduler(["/dev/ttyUSB0", "/dev/ttyUSB1"]).start()    # or scheduler_from_config()
+    sched.submit("images/out_commands_3.txt", owner="gui")
+    sched.wait()
+    sched.stop()
+
+Ordering: jobs are queued per owner (FIFO within an owner) and idle plotters take the next job
+round-robin across owners, so one owner submitting a whole batch does not starve the others.
+
+Failures: a failed transfer is re-queued at the front of its owner's queue, up to max_retries
+times, and preferably goes to a plotter it has not failed on yet. The whole file is sent again
+(the sheet of a plotter that stopped mid-drawing has to be replaced anyway). A plotter that fails
+max_device_failures jobs in a row is taken offline for offline_s seconds. Missing command files
+fail the job at once without counting against the plotter.
+
+Device and job state are available as dicts via status() / jobs(); on_event(kind, job, port)
+is called from the worker threads for "start", "progress", "done", "retry", "failed",
+"cancelled" and "offline".
+"""
+from __future__ import annotations
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+from config import BAUD, STM32_PORT, STM32_PORTS, STM32_WINDOW, STM32_ACK_TIMEOUT_S
+from .stm32_uart import STM32UartManager
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+# Device states
+IDLE, BUSY, OFFLINE, STOPPED = "idle", "busy", "offline", "stopped"
+
+
+class PlotJob:
+    def __init__(self, job_id: int, path: str, owner: str):
+        self.job_id = job_id
+        self.path = path
+        self.owner = owner
+        self.state = QUEUED
+        self.attempts = 0
+        self.failed_on: List[str] = []     # ports this job already failed on
+        self.port: Optional[str] = None
+        self.progress = 0
+        self.error: Optional[str] = None
+        self.t_submit = time.time()
+        self.t_start: Optional[float] = None
+        self.t_end: Optional[float] = None
+        self.cancel_requested = False
+
+    def as_dict(self) -> Dict:
+        return {"job_id": self.job_id, "path": self.path, "owner": self.owner, "state": self.state,
+                "attempts": self.attempts, "port": self.port, "progress": self.progress, "error": self.error,
+                "wait_s": (self.t_start or time.time()) - self.t_submit,
+                "run_s": None if self.t_start is None else (self.t_end or time.time()) - self.t_start}
+
+
+class _Device:
+    def __init__(self, port: str):
+        self.port = port
+        self.state = IDLE
+        self.job: Optional[PlotJob] = None
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.consecutive_failures = 0
+        self.busy_s = 0.0
+        self.last_error: Optional[str] = None
+        self.offline_until = 0.0
+        self.cancel = threading.Event()    # aborts the current transfer
+        self.thread: Optional[threading.Thread] = None
+
+    def as_dict(self) -> Dict:
+        return {"port": self.port, "state": self.state, "job_id": self.job.job_id if self.job else None,
+                "progress": self.job.progress if self.job else None, "jobs_done": self.jobs_done,
+                "jobs_failed": self.jobs_failed, "busy_s": self.busy_s, "last_error": self.last_error}
+
+
+class PlotScheduler:
+    def __init__(
+        self,
+        ports: List[str],
+        baudrate: int = BAUD,
+        window: int = STM32_WINDOW,
+        ack_timeout: Optional[float] = STM32_ACK_TIMEOUT_S,
+        max_retries: int = 2,
+        max_device_failures: int = 2,
+        offline_s: float = 60.0,
+        on_event: Optional[Callable[[str, PlotJob, Optional[str]], None]] = None,
+        manager_factory: Callable[..., STM32UartManager] = STM32UartManager,
+    ):
+        if not ports:
+            raise ValueError("At least one STM32 port is required")
+        if len(set(ports)) != len(ports):
+            raise ValueError(f"Duplicate ports: {ports}")
+        self.baudrate = baudrate
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.max_device_failures = max_device_failures
+        self.offline_s = offline_s
+        self.on_event = on_event
+        self._factory = manager_factory
+
+        self._devices = OrderedDict((p, _Device(p)) for p in ports)
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()   # owner -> deque of jobs, in first-seen order
+        self._rr = 0                                               # round-robin position over owners
+        self._jobs: Dict[int, PlotJob] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    # --- lifecycle ---
+    def start(self) -> "PlotScheduler":
+        self._stop.clear()
+        for dev in self._devices.values():
+            if dev.thread is None or not dev.thread.is_alive():
+                dev.state = IDLE
+                dev.thread = threading.Thread(target=self._worker, args=(dev,), name=f"plotter {dev.port}", daemon=True)
+                dev.thread.start()
+        return self
+
+    def stop(self, cancel_running: bool = True, timeout: float = 5.0) -> None:
+        # Stop the workers; queued jobs stay queued (start() resumes them).
+        self._stop.set()
+        if cancel_running:
+            for dev in self._devices.values():
+                dev.cancel.set()
+        with self._cond:
+            self._cond.notify_all()
+        for dev in self._devices.values():
+            if dev.thread is not None:
+                dev.thread.join(timeout)
+                dev.thread = None
+            dev.state = STOPPED
+
+    def __enter__(self) -> "PlotScheduler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- jobs ---
+    def submit(self, path: str, owner: str = "default") -> int:
+        with self._cond:
+            job = PlotJob(next(self._ids), path, owner)
+            self._jobs[job.job_id] = job
+            self._queues.setdefault(owner, deque()).append(job)
+            self._cond.notify_all()
+        return job.job_id
+
+    def cancel(self, job_id: int) -> bool:
+        # Cancel a queued job, or abort it on its plotter if it is running.
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in (QUEUED, RUNNING):
+                return False
+            job.cancel_requested = True
+            if job.state == QUEUED:
+                self._queues[job.owner].remove(job)
+                self._finish(job, CANCELLED)
+            else:
+                self._devices[job.port].cancel.set()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # Block until every submitted job is done, failed or cancelled.
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while any(j.state in (QUEUED, RUNNING) for j in self._jobs.values()):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        return True
+
+    def jobs(self) -> List[Dict]:
+        with self._cond:
+            return [j.as_dict() for j in self._jobs.values()]
+
+    def status(self) -> List[Dict]:
+        with self._cond:
+            now = time.time()
+            for dev in self._devices.values():
+                if dev.state == OFFLINE and now >= dev.offline_until:
+                    dev.state = IDLE
+            return [d.as_dict() for d in self._devices.values()]
+
+    # --- dispatch ---
+    def _emit(self, kind: str, job: PlotJob, port: Optional[str]) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(kind, job, port)
+            except Exception as e:      # a broken callback must not kill a plotter worker
+                print(f"WARNING: scheduler callback failed: {e}")
+
+    def _finish(self, job: PlotJob, state: str) -> None:
+        job.state = state
+        job.t_end = time.time()
+        self._cond.notify_all()
+        self._emit(state, job, job.port)
+
+    def _online_ports(self) -> List[str]:
+        return [p for p, d in self._devices.items() if d.state in (IDLE, BUSY)]
+
+    def _next_job(self, dev: _Device) -> Optional[PlotJob]:
+        # Round-robin over owners; within an owner FIFO, except that a retried job skips plotters
+        # it already failed on while another online plotter could still take it.
+        owners = list(self._queues)
+        online = set(self._online_ports())
+        for k in range(len(owners)):
+            i = (self._rr + k) % len(owners)
+            q = self._queues[owners[i]]
+            for job in q:
+                if dev.port in job.failed_on and not online.issubset(job.failed_on):
+                    continue
+                q.remove(job)
+                self._rr = i + 1
+                return job
+        return None
+
+    def _worker(self, dev: _Device) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                if dev.state == OFFLINE:
+                    if time.time() < dev.offline_until:
+                        self._cond.wait(min(0.5, dev.offline_until - time.time()))
+                        continue
+                    dev.state = IDLE
+                job = self._next_job(dev)
+                if job is None:
+                    self._cond.wait(0.5)
+                    continue
+                job.state, job.port, job.progress = RUNNING, dev.port, 0
+                job.attempts += 1
+                job.t_start = job.t_start or time.time()
+                dev.state, dev.job = BUSY, job
+                dev.cancel.clear()
+            self._emit("start", job, dev.port)
+            self._run(dev, job)
+
+    def _run(self, dev: _Device, job: PlotJob) -> None:
+        def progress_cb(p):
+            job.progress = p
+            self._emit("progress", job, dev.port)
+
+        mgr = self._factory(dev.port, self.baudrate, verbose=False)
+        t0 = time.time()
+        ok = mgr.send_coordinates_file(job.path, progress_cb, window=self.window,
+                                       ack_timeout=self.ack_timeout, cancel_event=dev.cancel)
+        err = mgr.last_error
+
+        with self._cond:
+            dev.busy_s += time.time() - t0
+            dev.job = None
+            dev.state = IDLE
+            if ok:
+                job.progress = 100
+                job.error = None
+                dev.jobs_done += 1
+                dev.consecutive_failures = 0
+                self._finish(job, DONE)
+                return
+            job.error = f"{type(err).__name__}: {err}" if err is not None else "transfer failed"
+            if job.cancel_requested or self._stop.is_set():
+                if job.cancel_requested:
+                    self._finish(job, CANCELLED)
+                else:   # scheduler stopped mid-transfer: back to the queue for the next start()
+                    job.state = QUEUED
+                    job.attempts -= 1
+                    self._queues[job.owner].appendleft(job)
+                return
+            if isinstance(err, FileNotFoundError):
+                self._finish(job, FAILED)       # the job's fault, not the plotter's
+                return
+
+            dev.jobs_failed += 1
+            dev.consecutive_failures += 1
+            dev.last_error = job.error
+            job.failed_on.append(dev.port)
+            if dev.consecutive_failures >= self.max_device_failures:
+                dev.state = OFFLINE
+                dev.offline_until = time.time() + self.offline_s
+                dev.consecutive_failures = 0
+                print(f"{dev.port}: offline for {self.offline_s:.0f}s after repeated failures ({job.error})")
+                self._emit("offline", job, dev.port)
+            if job.attempts <= self.max_retries:
+                job.state = QUEUED
+                self._queues[job.owner].appendleft(job)
+                self._cond.notify_all()
+                self._emit("retry", job, dev.port)
+            else:
+                self._finish(job, FAILED)
+
+
+def scheduler_from_config(**kwargs) -> PlotScheduler:
+    # Scheduler over config.STM32_PORTS (or the single STM32_PORT); kwargs go to PlotScheduler.
+    ports = [p for p in (STM32_PORTS or [STM32_PORT]) if p]
+    return PlotScheduler(ports, **kwargs)
+
+
+def format_status(sched: PlotScheduler) -> List[str]:
+    # Human-readable device and job tables.
+    lines = [f"{'port':<16} {'state':<8} {'job':>4} {'prog':>5} {'done':>5} {'fail':>5} {'busy s':>8}"]
+    for d in sched.status():
+        job = "-" if d["job_id"] is None else d["job_id"]
+        prog = "-" if d["progress"] is None else f"{d['progress']}%"
+        lines.append(f"{d['port']:<16} {d['state']:<8} {job:>4} {prog:>5} {d['jobs_done']:>5} "
+                     f"{d['jobs_failed']:>5} {d['busy_s']:>8.1f}")
+    for j in sched.jobs():
+        run = "" if j["run_s"] is None else f"{j['run_s']:.1f}s"
+        lines.append(f"  job {j['job_id']:>3} {j['owner']:<10} {j['state']:<9} on {j['port'] or '-':<14} "
+                     f"attempts {j['attempts']} {run} {j['error'] or ''}".rstrip())
+    return lines
+
+
+if __name__ == "__main__":
+    # Demo on local pty stand-ins (Linux/macOS):
+    #   python -m io_utils.plot_scheduler [plotters] [jobs] [lines per job]
+    # Runs the same job set on 1 plotter and on N plotters (one of them failing at first).
+    import os
+    import sys
+    import tempfile
+    from .stm32_emulator import STM32Emulator
+
+    n_plotters = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    n_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    n_lines = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    with open("./sample/06_out_commands.txt", "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()][:n_lines]
+    tmp = tempfile.mkdtemp(prefix="plot_jobs_")
+    paths = []
+    for i in range(n_jobs):
+        paths.append(os.path.join(tmp, f"job_{i}.txt"))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    for n in sorted({1, n_plotters}):
+        emus = [STM32Emulator(move_time_s=0.01).start() for _ in range(n)]
+        if n > 1:
+            emus[0].paused.set()        # first plotter hangs: its job times out and moves elsewhere
+        try:
+            sched = PlotScheduler([e.port for e in emus], ack_timeout=1.0, max_device_failures=1)
+            t0 = time.time()
+            with sched:
+                for i, p in enumerate(paths):
+                    sched.submit(p, owner=f"user{i % 2}")
+                sched.wait()
+                wall = time.time() - t0
+                print(f"\n{n} plotter(s): {n_jobs} jobs x {n_lines} lines in {wall:.1f}s")
+                print("\n".join(format_status(sched)))
+        finally:
+            for e in emus:
+                e.stop()
@@ -0,0 +1,213 @@
+# io_utils/plot_time.py
+"""
+Kinematic plot-time estimate for an STM32 command sequence.
+
+The default model follows the firmware (stm/Core):
+    - Controller_Plotter: targets clamped to the bed, converted to steps with int(x * STEPS_PER_MM),
+      CoreXY motor deltas da = dx + dy, db = dy - dx, the larger one is the master axis
+    - cruise ARR by pen state (ARR_TRAVEL for z=1, ARR_DRAWING for z=0), start at START_ARR
+    - TIM2 ISR: linear ARR ramp over accel_steps = min(max_steps / 4, 1200) at both ends,
+      one master step per timer period of (ARR + 1) ticks at 1 MHz
+    - Presenter_Plotter: osDelay(200) on every pen state change
+    - ACK (0xBB) on Motion_Queue dequeue, so with a window of W lines the link round trip
+      overlaps the motion of the previous W commands
+
+Set accel_mm_s2 > 0 to use a generic trapezoidal profile (start speed -> cruise speed at that
+acceleration) instead of the firmware's step-count ramp.
+"""
+from __future__ import annotations
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from config import BAUD, STM32_WINDOW, PLOT_DRAW_SPEED_MM_S, PLOT_TRAVEL_SPEED_MM_S, PLOT_ACCEL_MM_S2, PLOT_Z_MOVE_S, PLOT_LINK_LATENCY_S
+from .packet_gen import parse_cmd
+
+
+class MachineModel(NamedTuple):
+    draw_speed_mm_s: float = 1e6 / 1500 / 20      # ARR_DRAWING 1499 -> 33.3 mm/s
+    travel_speed_mm_s: float = 1e6 / 1000 / 20    # ARR_TRAVEL 999 -> 50 mm/s
+    start_speed_mm_s: float = 1e6 / 5000 / 20     # START_ARR 4999 -> 10 mm/s
+    accel_mm_s2: float = 0.0                      # 0 = firmware ramp (ramp_fraction / ramp_max_steps)
+    z_move_s: float = 0.2                         # servo settle delay per pen state change
+    link_latency_s: float = 0.0                   # per-command round trip (USB-serial + ACK), excl. TX bytes
+    steps_per_mm: float = 20.0
+    timer_hz: float = 1e6
+    ramp_fraction: float = 0.25
+    ramp_max_steps: int = 1200
+    bed_x_mm: float = 250.0
+    bed_y_mm: float = 380.0
+
+    def arr(self, speed_mm_s: float) -> int:
+        # Timer auto-reload value for a master-axis speed.
+        return int(round(self.timer_hz / (speed_mm_s * self.steps_per_mm))) - 1
+
+
+def machine_model_from_config() -> MachineModel:
+    # Machine model with the PLOT_* values from config.py.
+    return MachineModel(
+        draw_speed_mm_s=PLOT_DRAW_SPEED_MM_S,
+        travel_speed_mm_s=PLOT_TRAVEL_SPEED_MM_S,
+        accel_mm_s2=PLOT_ACCEL_MM_S2,
+        z_move_s=PLOT_Z_MOVE_S,
+        link_latency_s=PLOT_LINK_LATENCY_S,
+    )
+
+
+def _firmware_move_ticks(n: np.ndarray, cruise_arr: np.ndarray, start_arr: int, model: MachineModel) -> np.ndarray:
+    # Timer ticks for moves of n master steps. Each period lasts ARR + 1 ticks; the ISR runs once
+    # per step plus once more to stop, so a move spends n + 1 periods. The accel ramp
+    # S - floor(D*k/a) and the decel ramp T + floor(D*k/a) run over the same k, so the floors
+    # cancel: a ramped move costs a*(S+T) + (n-2a)*T + S (stop period) + (n+1) ticks exactly.
+    n = n.astype(np.int64)
+    a = np.minimum(np.floor(n * model.ramp_fraction).astype(np.int64), model.ramp_max_steps)   # max_steps / 4
+    S, T = start_arr, cruise_arr
+    ramped = a * (S + T) + (n - 2 * a) * T + S + (n + 1)
+    # a == 0 (n < 4): first period at START_ARR, the rest (incl. the stop period) at cruise
+    flat = S + n * T + (n + 1)
+    ticks = np.where(a > 0, ramped, flat)
+    return np.where(n > 0, ticks, 0)
+
+
+def _trapezoid_move_s(d_mm: np.ndarray, v_max: np.ndarray, model: MachineModel) -> np.ndarray:
+    # Symmetric trapezoid (or triangle when too short) from start speed to v_max.
+    v0, acc = model.start_speed_mm_s, model.accel_mm_s2
+    d_ramp = np.maximum(v_max * v_max - v0 * v0, 0.0) / (2 * acc)
+    full = d_mm >= 2 * d_ramp
+    t_full = 2 * (v_max - v0) / acc + (d_mm - 2 * d_ramp) / v_max
+    v_peak = np.sqrt(v0 * v0 + acc * d_mm)
+    t_tri = 2 * (v_peak - v0) / acc
+    return np.where(d_mm > 0, np.where(full, t_full, t_tri), 0.0)
+
+
+def _to_steps(xy_mm: np.ndarray, model: MachineModel) -> np.ndarray:
+    # Controller_Plotter: clamp to the bed, then int(x * STEPS_PER_MM) in float32.
+    xy = np.asarray(xy_mm, dtype=np.float64).reshape(-1, 2)
+    x = np.clip(xy[:, 0], 0.0, model.bed_x_mm).astype(np.float32)
+    y = np.clip(xy[:, 1], 0.0, model.bed_y_mm).astype(np.float32)
+    spm = np.float32(model.steps_per_mm)
+    return np.stack([(x * spm).astype(np.int64), (y * spm).astype(np.int64)], axis=1)
+
+
+def _move_s(d_steps: np.ndarray, pen_up: np.ndarray, model: MachineModel) -> np.ndarray:
+    # Time of XY moves given (dx, dy) in steps; CoreXY master axis = max(|dx + dy|, |dy - dx|).
+    dx, dy = d_steps[:, 0], d_steps[:, 1]
+    master = np.maximum(np.abs(dx + dy), np.abs(dy - dx))
+    if model.accel_mm_s2 > 0:
+        v_max = np.where(pen_up, model.travel_speed_mm_s, model.draw_speed_mm_s)
+        return _trapezoid_move_s(master / model.steps_per_mm, v_max, model)
+    cruise = np.where(pen_up, model.arr(model.travel_speed_mm_s), model.arr(model.draw_speed_mm_s))
+    return _firmware_move_ticks(master, cruise, model.arr(model.start_speed_mm_s), model) / model.timer_hz
+
+
+def move_times(xy_mm: np.ndarray, pen_up: np.ndarray, model: MachineModel,
+               start_xy=(0.0, 0.0)) -> Tuple[np.ndarray, np.ndarray]:
+    # XY time (s) and length (mm) of consecutive absolute moves, starting from start_xy.
+    steps = _to_steps(np.vstack([np.reshape(start_xy, (1, 2)), np.reshape(xy_mm, (-1, 2))]), model)
+    d = np.diff(steps, axis=0)
+    return _move_s(d, pen_up, model), np.hypot(d[:, 0], d[:, 1]) / model.steps_per_mm
+
+
+def estimate_penup_time(contours_mm: List[np.ndarray], model: Optional[MachineModel] = None,
+                        start_xy=(0.0, 0.0)) -> float:
+    """
+    Pen-up cost (s) of a contour order: travel from each contour's end to the next start
+    (from start_xy for the first) plus a pen lift and drop per contour.
+    Cheap enough to compare orderings without building the command list.
+    """
+    if model is None:
+        model = machine_model_from_config()
+    cs = [c for c in contours_mm if len(c)]
+    if not cs:
+        return 0.0
+    starts = _to_steps(np.array([c[0] for c in cs]), model)
+    ends = _to_steps(np.array([c[-1] for c in cs]), model)
+    prev = np.vstack([_to_steps(np.reshape(start_xy, (1, 2)), model), ends[:-1]])
+    travel_s = _move_s(starts - prev, np.ones(len(cs), dtype=bool), model)
+    return float(travel_s.sum()) + 2 * model.z_move_s * len(cs)
+
+
+def _as_xyz(cmds: Union[str, Sequence[str], np.ndarray]) -> np.ndarray:
+    if isinstance(cmds, np.ndarray):
+        return np.asarray(cmds, dtype=np.float64).reshape(-1, 3)
+    if isinstance(cmds, str):
+        with open(cmds, "r", encoding="utf-8") as f:
+            cmds = f.readlines()
+    rows = [parse_cmd(line) for line in cmds if line.strip()]
+    return np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+
+def estimate_plot_time(
+    cmds: Union[str, Sequence[str], np.ndarray],
+    model: Optional[MachineModel] = None,
+    window: int = STM32_WINDOW,
+    baudrate: int = BAUD,
+) -> Dict:
+    """
+    Predict how long the plotter needs for a command sequence.
+
+    Args:
+        cmds: command file path, list of command lines, or (N, 3) array of (x_mm, y_mm, z)
+        model: MachineModel (default: machine_model_from_config())
+        window: STM32 commands in flight (see STM32UartManager.send_commands)
+        baudrate: UART speed, for the per-line transmit time
+    Returns:
+        dict with total_s and the breakdown draw_s, travel_s, z_s, link_stall_s, plus
+        commands, pen_lifts, draw_mm, travel_mm
+    """
+    if model is None:
+        model = machine_model_from_config()
+    if window < 1:
+        raise ValueError(f"window must be >= 1, got {window}")
+    xyz = _as_xyz(cmds)
+    n_cmd = len(xyz)
+    if n_cmd == 0:
+        return {"total_s": 0.0, "draw_s": 0.0, "travel_s": 0.0, "z_s": 0.0, "link_stall_s": 0.0,
+                "commands": 0, "pen_lifts": 0, "draw_mm": 0.0, "travel_mm": 0.0}
+
+    z = xyz[:, 2].astype(np.int64)
+    pen_up = z == 1
+    z_change = z != np.concatenate([[1], z[:-1]])
+    move_s, step_mm = move_times(xyz[:, :2], pen_up, model)
+    z_s = z_change * model.z_move_s
+    motion_s = move_s + z_s
+
+    # Link: the next line must arrive before the current motion ends; the window spreads one
+    # round trip (latency + line TX time) over `window` queued motions.
+    line_bytes = 18     # "x:123.4y:056.7z:1\n"
+    link_s = (model.link_latency_s + line_bytes * 10 / baudrate) / window
+    stall = np.maximum(link_s - motion_s, 0.0)
+    stall[0] = model.link_latency_s + line_bytes * 10 / baudrate   # first command waits for the full trip
+
+    draw_s = float(move_s[~pen_up].sum())
+    travel_s = float(move_s[pen_up].sum())
+    total = draw_s + travel_s + float(z_s.sum()) + float(stall.sum())
+    return {
+        "total_s": total,
+        "draw_s": draw_s,
+        "travel_s": travel_s,
+        "z_s": float(z_s.sum()),
+        "link_stall_s": float(stall.sum()),
+        "commands": int(n_cmd),
+        "pen_lifts": int(np.count_nonzero(z_change & pen_up)),
+        "draw_mm": float(step_mm[~pen_up].sum()),
+        "travel_mm": float(step_mm[pen_up].sum()),
+    }
+
+
+def format_estimate(est: Dict) -> List[str]:
+    # Human-readable lines for the pipeline summary.
+    m, s = divmod(est["total_s"], 60)
+    return [
+        f"Estimated plot time: {int(m)} min {s:.1f} s ({est['commands']} commands, {est['pen_lifts']} pen lifts)",
+        f"  drawing {est['draw_s']:.1f} s ({est['draw_mm']:.0f} mm), travel {est['travel_s']:.1f} s "
+        f"({est['travel_mm']:.0f} mm), pen up/down {est['z_s']:.1f} s, link stalls {est['link_stall_s']:.1f} s",
+    ]
+
+
+if __name__ == "__main__":
+    # Estimate a command file:  python -m io_utils.plot_time [commands.txt] [window]
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else "sample/06_out_commands.txt"
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else STM32_WINDOW
+    est = estimate_plot_time(path, window=window)
+    print("\n".join(format_estimate(est)))
@@ -0,0 +1,307 @@
+# io_utils/serial_transport.py
+"""
+asyncio serial transport shared by FPGAUartManager and STM32UartManager.
+
+    async with SerialTransport(port, 115200) as t:
+        await t.write(b"\\xAA")                            # write and drain to the OS queue
+        head = await t.read_exactly(4, timeout=10)
+        line = await t.read_until(b"\\n", timeout=1)
+        rx = await t.read_any(timeout=0.1)                 # whatever arrived, b"" on timeout
+
+The port is opened non-blocking. On POSIX the event loop watches its file descriptor
+(add_reader / add_writer), so waiting for data costs no CPU and needs no sleep polling.
+Where the loop cannot watch a serial handle (Windows), a reader thread does blocking reads
+and hands the bytes to the loop, and writes go through the default executor.
+
+Timeouts raise the built-in TimeoutError (bytes received so far stay buffered); a port that
+disappears raises ConnectionError. Several transports can share one loop, so one process can
+capture from the FPGA and plot on the STM32 at the same time:
+
+    await asyncio.gather(fpga.trigger_and_receive_mode_async(...), stm.send_commands_async(...))
+"""
+from __future__ import annotations
+import asyncio
+import os
+import threading
+from typing import Callable, Optional
+
+import serial
+
+from config import BAUD
+
+
+class SerialTransport:
+    def __init__(self, port: str, baudrate: int = BAUD):
+        self.port = port
+        self.baudrate = baudrate
+        self._ser: Optional[serial.Serial] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd: Optional[int] = None          # watched file descriptor (POSIX path)
+        self._thread: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        self._buf = bytearray()
+        self._data = asyncio.Event()            # re-created in open() on the running loop
+        self._error: Optional[BaseException] = None
+
+    # --- lifecycle ---
+    def open(self) -> "SerialTransport":
+        # Must be called from a running event loop (async with does this).
+        self._loop = asyncio.get_running_loop()
+        self._data = asyncio.Event()
+        self._closing.clear()
+        if os.name == "posix":
+            self._ser = serial.Serial(self.port, self.baudrate, timeout=0, write_timeout=0)
+            self._fd = self._ser.fileno()
+            self._loop.add_reader(self._fd, self._on_readable)
+        else:
+            self._ser = serial.Serial(self.port, self.baudrate, timeout=0.1, write_timeout=None)
+            self._thread = threading.Thread(target=self._reader_thread, name=f"serial {self.port}", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._closing.set()
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+            self._fd = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._ser is not None and self._ser.is_open:
+            self._ser.close()
+        self._ser = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._ser is not None and self._ser.is_open
+
+    async def __aenter__(self) -> "SerialTransport":
+        return self.open()
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    # --- incoming bytes ---
+    def _feed(self, data: bytes, error: Optional[BaseException] = None) -> None:
+        if data:
+            self._buf.extend(data)
+        if error is not None and self._error is None:
+            self._error = error
+        self._data.set()
+
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            data, err = b"", ConnectionError(f"{self.port}: {e}")
+        else:
+            err = None if data else ConnectionError(f"{self.port}: device disconnected")
+        if err is not None:
+            self._loop.remove_reader(self._fd)
+        self._feed(data, err)
+
+    def _reader_thread(self) -> None:
+        while not self._closing.is_set():
+            try:
+                data = self._ser.read(self._ser.in_waiting or 1)
+            except (OSError, serial.SerialException) as e:
+                self._loop.call_soon_threadsafe(self._feed, b"", ConnectionError(f"{self.port}: {e}"))
+                return
+            if data:
+                self._loop.call_soon_threadsafe(self._feed, data)
+
+    async def _wait_data(self) -> None:
+        # Wait until more bytes (or an error) arrive.
+        if self._error is not None:
+            raise self._error
+        if self._ser is None:
+            raise ConnectionError(f"{self.port}: transport is closed")
+        self._data.clear()
+        await self._data.wait()
+
+    @staticmethod
+    async def _with_timeout(coro, timeout: Optional[float], what: str):
+        if timeout is None:
+            return await coro
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{what} timed out after {timeout}s") from None
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._buf)
+
+    def reset_input_buffer(self) -> None:
+        self._buf.clear()
+        if self._ser is not None:
+            self._ser.reset_input_buffer()
+
+    async def read_exactly(self, n: int, timeout: Optional[float] = None, idle_timeout: Optional[float] = None,
+                           progress: Optional[Callable[[int], None]] = None) -> bytes:
+        """
+        Read exactly n bytes.
+
+        Args:
+            timeout: limit for the whole read
+            idle_timeout: limit for the gap between incoming chunks (e.g. 10 s without data)
+            progress: called with the number of bytes available so far whenever data arrives
+        """
+        async def body():
+            while len(self._buf) < n:
+                if progress:
+                    progress(len(self._buf))
+                await self._with_timeout(self._wait_data(), idle_timeout, f"{self.port}: read of {n} bytes "
+                                         f"({len(self._buf)} received)")
+            if progress:
+                progress(n)
+            out = bytes(self._buf[:n])
+            del self._buf[:n]
+            return out
+        return await self._with_timeout(body(), timeout, f"{self.port}: read of {n} bytes")
+
+    async def read_until(self, separator: bytes = b"\n", timeout: Optional[float] = None,
+                         max_bytes: Optional[int] = None) -> bytes:
+        # Read up to and including separator; ValueError if max_bytes arrive without one.
+        async def body():
+            start = 0
+            while True:
+                i = self._buf.find(separator, start)
+                if i >= 0:
+                    end = i + len(separator)
+                    out = bytes(self._buf[:end])
+                    del self._buf[:end]
+                    return out
+                if max_bytes is not None and len(self._buf) >= max_bytes:
+                    raise ValueError(f"{self.port}: no {separator!r} within {max_bytes} bytes")
+                start = max(0, len(self._buf) - len(separator) + 1)
+                await self._wait_data()
+        return await self._with_timeout(body(), timeout, f"{self.port}: read until {separator!r}")
+
+    async def read_any(self, timeout: Optional[float] = None, max_bytes: Optional[int] = None) -> bytes:
+        # Bytes already received, or the next chunk; b"" if nothing arrives within timeout.
+        if not self._buf:
+            try:
+                await self._with_timeout(self._wait_data(), timeout, f"{self.port}: read")
+            except TimeoutError:
+                return b""
+        n = len(self._buf) if max_bytes is None else min(max_bytes, len(self._buf))
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+    # --- outgoing bytes ---
+    @property
+    def out_waiting(self) -> Optional[int]:
+        # Bytes still in the OS transmit queue (None if the driver cannot tell).
+        try:
+            return self._ser.out_waiting
+        except (AttributeError, OSError, serial.SerialException):
+            return None
+
+    async def _wait_writable(self) -> None:
+        fut = self._loop.create_future()
+        self._loop.add_writer(self._fd, lambda: fut.done() or fut.set_result(None))
+        try:
+            await fut
+        finally:
+            self._loop.remove_writer(self._fd)
+
+    async def write(self, data: bytes, timeout: Optional[float] = None, flush: bool = False) -> None:
+        """
+        Write all of data, waiting while the OS transmit queue is full (write-and-drain).
+        flush=True additionally waits until the bytes have left the UART (tcdrain).
+        """
+        if self._ser is None:
+            raise ConnectionError(f"{self.port}: transport is closed")
+
+        async def body():
+            if self._fd is None:
+                await self._loop.run_in_executor(None, self._ser.write, data)
+            else:
+                view = memoryview(data)
+                while view:
+                    try:
+                        n = os.write(self._fd, view)
+                    except BlockingIOError:
+                        n = 0
+                    except OSError as e:
+                        raise ConnectionError(f"{self.port}: {e}") from None
+                    view = view[n:]
+                    if view:
+                        await self._wait_writable()
+            if flush:
+                await self.flush()
+        await self._with_timeout(body(), timeout, f"{self.port}: write of {len(data)} bytes")
+
+    async def flush(self) -> None:
+        # Wait until the OS transmit queue is empty (tcdrain on a worker thread).
+        await self._loop.run_in_executor(None, self._ser.flush)
+
+
+def run_sync(coro):
+    # Run a coroutine to completion from synchronous code (GUI worker threads, scripts).
+    return asyncio.run(coro)
+
+
+if __name__ == "__main__":
+    # Self-check over local pty pairs (Linux/macOS):  python -m io_utils.serial_transport
+    import time
+    import tty
+
+    def pty_pair():
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        return master, os.ttyname(slave), slave
+
+    async def check():
+        m1, port1, s1 = pty_pair()
+        m2, port2, s2 = pty_pair()
+        loop = asyncio.get_running_loop()
+        async with SerialTransport(port1) as a, SerialTransport(port2) as b:
+            # read_exactly across several chunks, read_until, read_any
+            loop.call_later(0.05, os.write, m1, b"\x01\x02")
+            loop.call_later(0.10, os.write, m1, b"\x03\x04line one\nrest")
+            assert await a.read_exactly(4, timeout=1) == b"\x01\x02\x03\x04"
+            assert await a.read_until(b"\n", timeout=1) == b"line one\n"
+            assert await a.read_any(timeout=0.1) == b"rest"
+            assert await a.read_any(timeout=0.05) == b""
+            t0 = time.perf_counter()
+            try:
+                await a.read_exactly(1, timeout=0.2)
+                raise AssertionError("timeout expected")
+            except TimeoutError:
+                print(f"timeout after {time.perf_counter() - t0:.2f}s (ok)")
+
+            # write-and-drain of more than the pty buffer while the other side reads slowly
+            payload = os.urandom(200_000)
+            got = bytearray()
+
+            async def drain_master():
+                while len(got) < len(payload):
+                    await asyncio.sleep(0.001)
+                    try:
+                        got.extend(os.read(m2, 65536))
+                    except BlockingIOError:
+                        pass
+            os.set_blocking(m2, False)
+            await asyncio.gather(b.write(payload, timeout=10), drain_master())
+            assert bytes(got) == payload
+            print(f"wrote {len(payload)} bytes through a pty (ok)")
+
+            # two ports served concurrently by one loop
+            loop.call_later(0.1, os.write, m1, b"A" * 1000)
+            loop.call_later(0.1, os.write, m2, b"B" * 1000)
+            t0 = time.perf_counter()
+            ra, rb = await asyncio.gather(a.read_exactly(1000, timeout=1), b.read_exactly(1000, timeout=1))
+            assert ra == b"A" * 1000 and rb == b"B" * 1000
+            print(f"two ports concurrently in {time.perf_counter() - t0:.2f}s (ok)")
+        for fd in (m1, s1, m2, s2):
+            os.close(fd)
+
+    t_cpu = time.process_time()
+    asyncio.run(check())
+    print(f"CPU time {time.process_time() - t_cpu:.3f}s")
@@ -0,0 +1,228 @@
+# io_utils/stm32_emulator.py
+"""
+Local STM32 plotter stand-in behind a pseudo-terminal (Linux/macOS only).
+
+It mimics the firmware's UART side (stm/Core/ap) closely enough to exercise the PC senders:
+  - HAL_UART_RxCpltCallback: bytes go into one 64-byte rx_buffer; a newline terminates the
+    string, sets data_ready and re-arms reception at once, so the next line is written over
+    the same buffer; a line of more than 63 characters stops reception until re-armed
+  - Listener_Execute, every 1 ms: if data_ready, parse rx_buffer like Parse_To_Struct and
+    xQueueSend it to Cmd_Queue (depth 1, 0 wait); while Cmd_Queue is full data_ready stays set
+    and the same buffer is parsed again on the next tick
+  - Controller: Cmd_Queue -> Motion_Queue of `queue_depth` slots (blocking)
+  - Presenter: dequeues one command at a time, sends 0xBB, then spends
+    `move_time_s` "moving" (plus `z_time_s` when the pen state changes)
+  - `baudrate` paces received bytes, `link_latency_s` delays their arrival
+    (USB-serial adapters typically add a few ms each way)
+
+With more than one line in flight the next line overwrites rx_buffer before the Listener has
+read it, so lines get lost or merged (`overwritten`, `bad_lines`) - only window=1 is reliable
+against this front end.
+
+Usage:
+    with STM32Emulator(move_time_s=0.002) as emu:
+        STM32UartManager(emu.port).send_coordinates_file(path, window=1)
+"""
+from __future__ import annotations
+import os
+import queue
+import threading
+import time
+import tty
+from typing import List, Tuple
+
+from io_utils.packet_gen import parse_cmd
+
+RX_BUFFER_LEN = 64      # char rx_buffer[64] in uart_handler.c
+LISTENER_TICK_S = 0.001  # UART_Task: Listener_Execute(); osDelay(1);
+
+
+class STM32Emulator:
+    def __init__(self, queue_depth=64, move_time_s=0.0, z_time_s=0.0, baudrate=115200, link_latency_s=0.0,
+                 ack_byte=b'\xBB'):
+        self.queue_depth = queue_depth
+        self.move_time_s = move_time_s
+        self.z_time_s = z_time_s
+        self.byte_time_s = 10.0 / baudrate if baudrate else 0.0   # 8N1 on the wire
+        self.link_latency_s = link_latency_s
+        self.ack_byte = ack_byte
+
+        self.received: List[Tuple[float, float, int]] = []   # commands accepted into Cmd_Queue, in order
+        self.executed: List[Tuple[float, float, int]] = []   # commands dequeued by the motion worker
+        self.overwritten = 0    # lines terminated while the previous one was still waiting for the Listener
+        self.lost_bytes = 0     # bytes received while reception was not armed (after a too long line)
+        self.bad_lines = 0      # buffers Parse_To_Struct would reject
+        self.paused = threading.Event()   # set() to stall the motion worker (no ACKs)
+
+        # uart_handler.c / process_handler.c state, shared by the "ISR" and the Listener
+        self._rx_buffer = bytearray(RX_BUFFER_LEN)
+        self._rx_index = 0
+        self._rx_armed = True
+        self._data_ready = False
+        self._rx_lock = threading.Lock()
+
+        self._master = self._slave = None
+        self._cmd_q: queue.Queue = queue.Queue(maxsize=1)
+        self._motion_q: queue.Queue = queue.Queue(maxsize=queue_depth)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.port = None
+
+    # --- lifecycle ---
+    def start(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._rx_loop, daemon=True),
+            threading.Thread(target=self._listener_loop, daemon=True),
+            threading.Thread(target=self._controller_loop, daemon=True),
+            threading.Thread(target=self._motion_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def wait_idle(self, timeout=10.0):
+        # Block until every accepted command has been executed.
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not self._data_ready and len(self.executed) == len(self.received):
+                return True
+            time.sleep(0.005)
+        return False
+
+    # --- firmware model ---
+    def _rx_loop(self):
+        import select
+        while not self._stop.is_set():
+            r, _, _ = select.select([self._master], [], [], 0.05)
+            if not r:
+                continue
+            try:
+                chunk = os.read(self._master, 4096)
+            except OSError:
+                break
+            due = time.time() + self.link_latency_s
+            for b in chunk:
+                due += self.byte_time_s
+                wait = due - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                self._rx_byte(b)
+
+    def _rx_byte(self, b):
+        # HAL_UART_RxCpltCallback for one received byte
+        with self._rx_lock:
+            if not self._rx_armed:
+                self.lost_bytes += 1
+            elif b in (0x0A, 0x0D):
+                self._rx_buffer[self._rx_index] = 0
+                self._rx_index = 0
+                if self._data_ready:
+                    self.overwritten += 1
+                self._data_ready = True
+            elif self._rx_index < RX_BUFFER_LEN - 1:
+                self._rx_buffer[self._rx_index] = b
+                self._rx_index += 1
+            else:
+                self._rx_armed = False      # the callback does not re-arm on overflow
+
+    def _listener_loop(self):
+        while not self._stop.is_set():
+            time.sleep(LISTENER_TICK_S)
+            with self._rx_lock:
+                if not self._data_ready:
+                    continue
+                line = bytes(self._rx_buffer).split(b"\0", 1)[0].decode("ascii", errors="ignore")
+                try:
+                    cmd = parse_cmd(line)
+                except ValueError:
+                    self.bad_lines += 1
+                else:
+                    try:
+                        self._cmd_q.put_nowait(cmd)
+                    except queue.Full:
+                        continue            # data_ready stays set, retried on the next tick
+                    self.received.append(cmd)
+                self._data_ready = False
+                self._rx_armed = True       # UART_StartReceive (no-op while armed)
+
+    def _controller_loop(self):
+        while not self._stop.is_set():
+            try:
+                cmd = self._cmd_q.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            while not self._stop.is_set():
+                try:
+                    self._motion_q.put(cmd, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
+
+    def _motion_loop(self):
+        last_z = None
+        while not self._stop.is_set():
+            if self.paused.is_set():
+                time.sleep(0.01)
+                continue
+            try:
+                cmd = self._motion_q.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            try:
+                os.write(self._master, self.ack_byte)
+            except OSError:
+                break
+            self.executed.append(cmd)
+            delay = self.move_time_s
+            if last_z is not None and cmd[2] != last_z:
+                delay += self.z_time_s
+            last_z = cmd[2]
+            if delay:
+                time.sleep(delay)
+
+
+if __name__ == "__main__":
+    # Standalone check: send a command file to the stand-in with several window sizes.
+    import sys
+    from io_utils.stm32_uart import STM32UartManager
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "./sample/06_out_commands.txt"
+    n_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()][:n_lines]
+    tmp_path = "./stm32_emulator_cmds.txt"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+    try:
+        for window in (1, 2, 8):
+            with STM32Emulator(move_time_s=0.001, link_latency_s=0.004) as emu:
+                mgr = STM32UartManager(emu.port, verbose=False)
+                t0 = time.time()
+                ok = mgr.send_coordinates_file(tmp_path, window=window, ack_timeout=2)
+                dt = time.time() - t0 - mgr.settle_s
+                emu.wait_idle(timeout=2)
+                same = emu.executed == [parse_cmd(l) for l in lines]
+                print(f"window={window}: ok={ok} {dt:.2f}s, executed={len(emu.executed)}/{len(lines)}, "
+                      f"overwritten={emu.overwritten}, bad={emu.bad_lines}, in order={same}")
+    finally:
+        os.remove(tmp_path)
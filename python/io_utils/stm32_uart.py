@@ -1,12 +1,17 @@
-import serial
+import asyncio
 import time
 
-from config import COMMAND_PATH, STM32_PORT, BAUD
+from config import COMMAND_PATH, STM32_PORT, BAUD, STM32_ACK_TIMEOUT_S
+from .command_stream import CommandStream
+from .serial_transport import SerialTransport, run_sync
 
 class STM32UartManager:
-    def __init__(self, port, baudrate=115200):
+    def __init__(self, port, baudrate=115200, verbose=True, settle_s=2.0):
         self.port = port
         self.baudrate = baudrate
+        self.settle_s = settle_s # 포트 오픈 후 보드 안정화 대기 (s)
+        self.verbose = verbose   # False: 라인/ACK 단위 로그 생략 (여러 장치 동시 구동 시)
+        self.last_error = None   # 마지막 전송 실패 원인 (예외 객체)
         self.ACK_BYTE = b'\xBB'  # STM32 완료 신호
 
     # def send_coordinates_file(self, file_path, progress_cb=None):
@@ -44,81 +49,142 @@ class STM32UartManager:
     #         print(f"STM32 통신 에러: {e}")
     #         return False
 
-    def send_coordinates_file(self, file_path, progress_cb=None):
-        ser = None
+    def send_coordinates_file(self, file_path, progress_cb=None, window=1, ack_timeout=None, cancel_event=None):
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 gcode_content = f.readlines()
             print(f"--- '{file_path}' File read complete ({len(gcode_content)} lines) ---")
 
-            ser = serial.Serial(self.port, self.baudrate, timeout=None)
-            print(f"--- {self.port} Connected ---")
-            time.sleep(2)
+        except FileNotFoundError as e:
+            print(f"\nERROR: '{file_path}' File not found.")
+            self.last_error = e
+            return False  # 파일 없음 시 False 반환
 
-            for i, line in enumerate(gcode_content):
+        return self.send_commands(gcode_content, progress_cb, window, ack_timeout, cancel_event)
 
-                cmd_str = line
-                ser.write(cmd_str.encode())
-                print(f"[{i + 1}/{len(gcode_content)}] {cmd_str.strip()}", end=' ', flush=True)
+    def send_commands(self, cmds, progress_cb=None, window=1, ack_timeout=None, cancel_event=None):
+        """
+        In-memory variant of send_coordinates_file: send a list (or iterator) of command lines.
+        Setting cancel_event (threading.Event) aborts the transfer within ~0.1 s.
+        Runs send_commands_async on its own event loop (call the async form from inside a loop).
+        """
+        return run_sync(self.send_commands_async(cmds, progress_cb, window, ack_timeout, cancel_event))
+
+    async def send_commands_async(self, cmds, progress_cb=None, window=1, ack_timeout=None, cancel_event=None):
+        self.last_error = None
+        t = SerialTransport(self.port, self.baudrate)
+        try:
+            t.open()
+            print(f"--- {self.port} Connected ---")
+            await asyncio.sleep(self.settle_s)
 
-                # ACK wait
-                while True:
-                    rx = ser.read(1)
-                    if rx == b'\xbb':
-                        print(" >> ACK OK")
-                        break
-                if progress_cb: progress_cb(int(((i + 1) / len(gcode_content)) * 100))
+            await self._send_windowed(t, cmds, progress_cb, window, ack_timeout, cancel_event)
 
             print("\nTransfer complete.")
             return True  # 정상 완료 시 True 반환
 
-        except FileNotFoundError:
-            print(f"\nERROR: '{file_path}' File not found.")
-            return False  # 파일 없음 시 False 반환
         except Exception as e:
             print(f"\nERROR: {e}")
+            self.last_error = e
             return False  # 예외 발생 시 False 반환
         finally:
-            if ser and ser.is_open:
-                ser.close()
+            if t.is_open:
+                t.close()
                 print("Serial port closed")
 
-
-
-    def run_plotter():
-        ser = None
+    async def _send_windowed(self, t, lines, progress_cb=None, window=1, ack_timeout=None, cancel_event=None):
+        """
+        Credit-based sender: keep up to `window` commands in flight.
+        Every 0xBB from the STM32 (one per dequeued motion) returns one credit.
+        window=1 is the classic stop-and-wait. The current firmware front end (one 64-byte
+        rx_buffer re-armed per line, Cmd_Queue of depth 1) is only reliable at window=1:
+        a second line in flight overwrites rx_buffer before it is parsed (see stm32_emulator.py).
+        Progress is reported on acknowledged lines, not on written lines.
+        `lines` may be a list or any iterator (e.g. a CommandStream); lines are pulled only
+        when a credit is free. For an iterator the total is known once it is exhausted
+        (a CommandStream reports its producer's count), so progress starts from there.
+        Lines of an iterator are pulled on the default executor, so a producer that is still
+        planning does not block the event loop.
+        """
+        if window < 1:
+            raise ValueError(f"window must be >= 1, got {window}")
+        is_list = isinstance(lines, (list, tuple))
+        total = sum(1 for line in lines if line.strip()) if is_list else None
+        it = iter(lines)
+        loop = asyncio.get_running_loop()
+        exhausted = False
+        sent = 0
+        acked = 0
+        last_ack = time.time()
+
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise InterruptedError(f"Transfer cancelled ({acked}/{total or sent} acknowledged)")
+
+            # Fill the window
+            while not exhausted and sent - acked < window:
+                line = next(it, None) if is_list else await loop.run_in_executor(None, next, it, None)
+                if line is None:
+                    exhausted = True
+                    total = sent
+                    break
+                if not line.strip():
+                    continue
+                if not line.endswith('\n'):
+                    line += '\n'
+                if sent == acked:
+                    last_ack = time.time()     # nothing was in flight while waiting for the producer
+                await t.write(line.encode())
+                sent += 1
+                if self.verbose:
+                    print(f"[{sent}/{total or '?'}] {line.strip()} (in flight: {sent - acked})", flush=True)
+
+            if exhausted and acked >= sent:
+                break
+
+            # Collect credits (waits up to 0.1 s so cancel_event is checked)
+            rx = await t.read_any(timeout=0.1)
+            n_ack = rx.count(self.ACK_BYTE)
+            if n_ack == 0:
+                if ack_timeout is not None and sent > acked and time.time() - last_ack > ack_timeout:
+                    raise TimeoutError(f"No ACK for {ack_timeout}s ({acked}/{total or sent} acknowledged, {sent - acked} in flight)")
+                continue
+
+            if acked + n_ack > sent:
+                print(f"WARNING: {acked + n_ack - sent} unexpected ACK(s) ignored")
+                n_ack = sent - acked
+            acked += n_ack
+            last_ack = time.time()
+            expected = total if total is not None else (lines.produced if getattr(lines, "finished", False) else None)
+            if self.verbose:
+                print(f" >> ACK x{n_ack} ({acked}/{expected or '?'})")
+            if progress_cb and expected: progress_cb(int((acked / expected) * 100))
+
+        return acked
+
+    def send_stream(self, cmds, progress_cb=None, window=1, ack_timeout=None, cancel_event=None, queue_size=256):
+        """
+        Streaming variant of send_commands: `cmds` is a generator (e.g. main_pipeline.iter_pipeline_commands)
+        that runs on a producer thread and feeds the sender through a bounded queue of `queue_size` lines,
+        so plotting starts while later contours are still being planned. The producer starts right away,
+        so planning also overlaps the port open / settle delay.
+        """
+        stream = cmds if isinstance(cmds, CommandStream) else CommandStream(cmds, maxsize=queue_size, cancel_event=cancel_event)
+        stream.start()
         try:
-            with open(COMMAND_PATH, 'r', encoding='utf-8') as f:
-                gcode_content = f.readlines()
-            print(f"--- '{COMMAND_PATH}' File read complete ({len(gcode_content)} lines) ---")
-
-            ser = serial.Serial(STM32_PORT, BAUD, timeout=None)
-            print(f"--- {STM32_PORT} Connected ---")
-            time.sleep(2)
-
-            for i, line in enumerate(gcode_content):
-
-                cmd_str = line
-                ser.write(cmd_str.encode())
-                print(f"[{i + 1}/{len(gcode_content)}] {cmd_str.strip()}", end=' ', flush=True)
+            ok = self.send_commands(stream, progress_cb, window, ack_timeout, cancel_event)
+            if ok and stream.t_first is not None:
+                print(f"Stream: first command after {stream.t_first - stream.t_start:.3f}s, "
+                      f"planning finished after {(stream.t_done or stream.t_first) - stream.t_start:.3f}s")
+            return ok
+        finally:
+            stream.close()
 
-                # ACK wait
-                while True:
-                    rx = ser.read(1)
-                    if rx == b'\xbb':
-                        print(" >> ACK OK")
-                        break
 
-            print("\nTransfer complete.")
+def run_plotter():
+    # Standalone test: send COMMAND_PATH to STM32_PORT (stop-and-wait; gives up after STM32_ACK_TIMEOUT_S without ACK)
+    STM32UartManager(STM32_PORT, BAUD).send_coordinates_file(COMMAND_PATH, ack_timeout=STM32_ACK_TIMEOUT_S)
 
-        except FileNotFoundError:
-            print(f"\nERROR: '{COMMAND_PATH}' File not found.")
-        except Exception as e:
-            print(f"\nERROR: {e}")
-        finally:
-            if ser and ser.is_open:
-                ser.close()
-                print("Serial port closed")
 
-    if __name__ == "__main__":
-        run_plotter()   # For standalone testing
+if __name__ == "__main__":
+    run_plotter()   # For standalone testing
@@ -1,6 +1,7 @@
 # imaging/unpack.py
 import numpy as np
-import re
+
+from .hex_codec import hex_digits, decode_hex
 
 # def load_hex_txt_to_bytes(path: str) -> bytes:
 #     with open(path, "r", encoding="utf-8", errors="ignore") as f:
@@ -14,19 +15,16 @@ import re
 
 
 def load_hex_txt_to_bytes(path: str) -> bytes:
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+    with open(path, "rb") as f:
         text = f.read()
 
-    # Keep only hex characters
-    hex_str = re.sub(r"[^0-9a-fA-F]", "", text)
+    # Keep only hex characters (bytes.translate, see hex_codec.py)
+    hex_str = hex_digits(text)
 
     if len(hex_str) < 2:
         raise ValueError("No hex data found in the txt file.")
 
-    if len(hex_str) % 2 != 0:
-        raise ValueError(f"Hex string length must be even, got {len(hex_str)}.")
-
-    return bytes.fromhex(hex_str)
+    return decode_hex(hex_str)
 
 # def extract_payload_after_header(data: bytes, header: int, payload_len: int) -> bytes:
 def extract_payload_after_header(data: bytes, payload_len: int) -> bytes:
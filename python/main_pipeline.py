@@ -1,57 +1,207 @@
+from typing import NamedTuple
 import numpy as np
 import cv2
 
-from config import RECEIVE_PATH, COMMAND_PATH, BITORDER, MIN_CONTOUR_LEN_PX, PIXEL_TO_MM, STEP_MM, EPSILON_MM, CROP_TOP, CROP_LEFT
+from config import W, H, RECEIVE_PATH, COMMAND_PATH, BITORDER, MIN_CONTOUR_LEN_PX, CONTOUR_MODE, STROKE_PLAN, STROKE_RETRACE_MAX_PX, TOUR_IMPROVE_TIME_S, PIXEL_TO_MM, STEP_MM, EPSILON_MM, COMMAND_PEEPHOLE, COLLINEAR_TOL_MM, CROP_TOP, CROP_LEFT
 from image_processing import *
 from io_utils import *
+from pipeline_trace import NULL_TRACER
+from pipeline_cache import cache_key
 
 
-def run_pipeline(w, h, receive_path=RECEIVE_PATH, command_path=COMMAND_PATH, data_format="1bpp", show_visualization=True):
+class PipelineParams(NamedTuple):
+    # Per-job pipeline settings; PipelineParams() takes every value from config.py.
+    # Pass one to run_pipeline / iter_pipeline_commands to plan several jobs with different settings
+    # in one process (see batch_plan.py) without touching the config globals.
+    bitorder: str = BITORDER
+    crop_top: int = CROP_TOP
+    crop_left: int = CROP_LEFT
+    min_contour_len_px: int = MIN_CONTOUR_LEN_PX
+    stroke_retrace_max_px: float = STROKE_RETRACE_MAX_PX
+    pixel_to_mm: float = PIXEL_TO_MM
+    step_mm: float = STEP_MM
+    epsilon_mm: float = EPSILON_MM
+    peephole: bool = COMMAND_PEEPHOLE
+    collinear_tol_mm: float = COLLINEAR_TOL_MM
+
+
+def edge_map_from_bytes(raw_bytes, w, h, data_format="1bpp", bitorder=BITORDER):
     """
-    Run the path optimization pipeline.
-    
+    Convert a raw FPGA/PC payload to a binary uint8 {0,255} edge map of shape (h, w).
+
     Args:
-        w: Image width
-        h: Image height
-        receive_path: Path to the hex text file with received data
-        command_path: Path to save the output commands
+        raw_bytes: bytes-like payload (header-less, as received)
         data_format: "1bpp" (packed 1 bit per pixel) or "byte_per_pixel" (1 byte per pixel, for camera data)
     """
-    ## 1. FPGA -> PC: Load filtered image from hex text file and extract contours
-    # Load raw bytes from hex text file
-    raw_bytes = load_hex_txt_to_bytes(receive_path)
-
-    # Convert bytes to image based on data format
     if data_format == "byte_per_pixel":
         # Camera mode: 1 byte per pixel (W*H bytes total)
         payload = extract_payload_after_header(raw_bytes, payload_len=w * h)
         # Convert bytes directly to image (0-255 values, assuming 0=black, 255=white or inverted)
         img255 = np.frombuffer(payload, dtype=np.uint8).reshape((h, w))
         # Ensure binary (0 or 255) - threshold at 127
-        img255 = np.where(img255 > 127, 255, 0).astype(np.uint8)
+        return np.where(img255 > 127, 255, 0).astype(np.uint8)
+
+    # Default: 1bpp packed format
+    payload = extract_payload_after_header(raw_bytes, payload_len=(w * h + 7) // 8)
+    return to_img255(unpack_payload_to_image(payload, w, h, bitorder=bitorder))
+
+
+def _load_edge_map(w, h, receive_path, data_format, source, params, tr):
+    # Input stage of run_pipeline: ndarray / raw bytes / hex file -> cropped uint8 {0,255} edge map.
+    if isinstance(source, np.ndarray):
+        if source.ndim != 2:
+            raise ValueError(f"Edge map must be 2-D, got shape={source.shape}")
+        if (w is not None and w != source.shape[1]) or (h is not None and h != source.shape[0]):
+            raise ValueError(f"Edge map shape {source.shape} does not match w={w}, h={h}")
+        h, w = source.shape
+        with tr.stage("binarize"):
+            img255 = np.where(source > 0, 255, 0).astype(np.uint8)
     else:
-        # Default: 1bpp packed format
-        payload = extract_payload_after_header(raw_bytes, payload_len=(w * h + 7) // 8)
-        img255 = to_img255(unpack_payload_to_image(payload, w, h, bitorder=BITORDER))
+        if w is None or h is None:
+            raise ValueError("w and h are required unless source is an ndarray edge map")
+        # Raw bytes given directly, or loaded from the hex text file
+        if source is None:
+            with tr.stage("load_hex", path=str(receive_path)):
+                raw_bytes = load_hex_txt_to_bytes(receive_path)
+        else:
+            raw_bytes = source
+        with tr.stage("unpack", data_format=data_format, nbytes=len(raw_bytes)):
+            img255 = edge_map_from_bytes(raw_bytes, w, h, data_format=data_format, bitorder=params.bitorder)
 
     # Crop image to remove noise (top rows and left columns)
-    if CROP_TOP > 0 or CROP_LEFT > 0:
-        img255 = img255[CROP_TOP:, CROP_LEFT:]
+    crop_top, crop_left = params.crop_top, params.crop_left
+    if crop_top > 0 or crop_left > 0:
+        img255 = img255[crop_top:, crop_left:]
         # Update dimensions for subsequent processing
-        w = w - CROP_LEFT
-        h = h - CROP_TOP
-        print(f"Image cropped: removed {CROP_TOP} rows from top, {CROP_LEFT} columns from left. New size: {w}x{h}")
+        w = w - crop_left
+        h = h - crop_top
+        print(f"Image cropped: removed {crop_top} rows from top, {crop_left} columns from left. New size: {w}x{h}")
+    tr.annotate(width=w, height=h)
+    return img255
 
+
+def _plan_contour_order(img255, improve_time_s, contour_mode, plan_strokes, params, tr):
+    # Planning stage of run_pipeline: extract contours, optional stroke-graph walks, greedy order + 2-opt/Or-opt.
     # Contour extraction
-    contours = extract_contours_all(img255, min_len_px=MIN_CONTOUR_LEN_PX, retrieval=cv2.RETR_LIST)
+    with tr.stage("extract_contours", mode=contour_mode):
+        contours = extract_contours_all(img255, min_len_px=params.min_contour_len_px, retrieval=cv2.RETR_LIST,
+                                        mode=contour_mode)
+
+    ## Stroke graph planning: join polylines at shared junctions (fewer pen lifts)
+    stroke_info = None
+    if plan_strokes:
+        with tr.stage("plan_strokes", max_retrace_px=params.stroke_retrace_max_px):
+            contours, stroke_info = plan_pen_down_walks(contours, max_retrace_px=params.stroke_retrace_max_px)
 
     # Print contour statistics
 
     ## Contour optimization (greedy reorder)
-    ordered_contours, penup_px = greedy_reorder_contours(
-                contours,
-                start_point=np.array([0, 0], dtype=np.int32)    # origin at (0,0)
-    )
+    with tr.stage("greedy_reorder", contours=len(contours)):
+        ordered_contours, penup_px = greedy_reorder_contours(
+                    contours,
+                    start_point=np.array([0, 0], dtype=np.int32)    # origin at (0,0)
+        )
+    greedy_penup_px = penup_px
+    greedy_contours = ordered_contours
+
+    ## Tour improvement (2-opt / Or-opt) within the time budget
+    penup_history = []
+    if improve_time_s > 0:
+        with tr.stage("improve_order", budget_s=improve_time_s):
+            ordered_contours, penup_px, penup_history = improve_contour_order(
+                    ordered_contours,
+                    start_point=np.array([0, 0], dtype=np.int32),
+                    time_budget_s=improve_time_s,
+            )
+
+    return {
+        "contours": contours,
+        "ordered": ordered_contours,
+        "greedy": greedy_contours,
+        "greedy_penup_px": greedy_penup_px,
+        "penup_px": penup_px,
+        "penup_history": penup_history,
+        "stroke_info": stroke_info,
+    }
+
+
+def _cached_plan(img255, improve_time_s, contour_mode, plan_strokes, p, cache, tr):
+    # _plan_contour_order through the stage cache; the key covers the cropped edge map and every
+    # extraction/ordering setting. Returns (plan, key); key is None without a cache.
+    if cache is None:
+        return _plan_contour_order(img255, improve_time_s, contour_mode, plan_strokes, p, tr), None
+    key = cache_key("plan", img255, contour_mode, plan_strokes, p.min_contour_len_px, p.stroke_retrace_max_px,
+                    improve_time_s)
+    plan = cache.get_plan(key)
+    if plan is None:
+        plan = _plan_contour_order(img255, improve_time_s, contour_mode, plan_strokes, p, tr)
+        cache.put_plan(key, plan)
+    else:
+        print("Contour order loaded from cache")
+    return plan, key
+
+
+def _build_commands(ordered_contours, p, tr):
+    # Command stage of run_pipeline: contours (px) -> mm -> RDP -> STM commands -> peephole pass.
+    # 1) Convert each contour to mm and densify and simplify
+    with tr.stage("to_mm"):
+        contours_mm = [contour_pixels_to_mm(c_xy, pixel_to_mm=p.pixel_to_mm, origin_xy=(0.0, 0.0)) for c_xy in ordered_contours]
+
+    # Compress straight-ish parts while keeping curve shape within epsilon (all contours in one batch)
+    with tr.stage("rdp_simplify", epsilon_mm=p.epsilon_mm):
+        contours_converted = rdp_simplify_many(contours_mm, epsilon=p.epsilon_mm)
+
+    # Densify so that consecutive points <= STEP_MM
+    # contours_converted = [densify_polyline_mm(c, step_mm=STEP_MM) for c in contours_converted]
+    # print(contours_converted)
+
+    # 2) Build commands with pen up/down
+    with tr.stage("build_commands"):
+        cmds = build_command_sequence_from_contours_xy(contours_converted, pen_up_z=1, pen_down_z=0)
+
+    # 3) Peephole pass on the quantized stream (every dropped command saves an ACK round trip)
+    peephole_stats = None
+    if p.peephole:
+        with tr.stage("peephole", tol_mm=p.collinear_tol_mm):
+            cmds, peephole_stats = optimize_command_stream(cmds, collinear_tol_mm=p.collinear_tol_mm)
+    return cmds, contours_converted, peephole_stats
+
+
+def run_pipeline(w=None, h=None, receive_path=RECEIVE_PATH, command_path=COMMAND_PATH, data_format="1bpp",
+                 show_visualization=True, improve_time_s=TOUR_IMPROVE_TIME_S, source=None, tracer=None,
+                 contour_mode=CONTOUR_MODE, plan_strokes=STROKE_PLAN, params=None, cache=None):
+    """
+    Run the path optimization pipeline.
+    
+    Args:
+        w: Image width (may be omitted when source is an ndarray)
+        h: Image height (may be omitted when source is an ndarray)
+        receive_path: Path to the hex text file with received data (used when source is None)
+        command_path: Path to save the output commands (None = keep them in memory only)
+        data_format: "1bpp" (packed 1 bit per pixel) or "byte_per_pixel" (1 byte per pixel, for camera data)
+        improve_time_s: time budget (s) for 2-opt/Or-opt after the greedy order (0 = greedy only)
+        source: optional in-memory input instead of receive_path:
+            - (h, w) ndarray edge map (nonzero = edge), e.g. the result of process_and_save
+            - bytes-like raw payload, decoded according to data_format
+        tracer: optional pipeline_trace.PipelineTracer; records wall/CPU time (and memory) per stage
+        contour_mode: "contour" (cv2.findContours outlines) or "centerline" (skeleton trace, each stroke once)
+        plan_strokes: merge polylines sharing junctions into continuous pen-down walks before reordering
+        params: PipelineParams (crop, contour length, mm scale, RDP epsilon, peephole); None = config.py values
+        cache: optional pipeline_cache.StageCache; reuses the contour order and the commands of an earlier
+            run with the same edge map and settings
+    Returns:
+        cmds: list of STM command strings
+        combined: visualization image (BGR), or None if show_visualization is False
+    """
+    tr = tracer if tracer is not None else NULL_TRACER
+    p = params if params is not None else PipelineParams()
+
+    ## 1. FPGA -> PC: Load filtered image and extract contours
+    img255 = _load_edge_map(w, h, receive_path, data_format, source, p, tr)
+    plan, plan_key = _cached_plan(img255, improve_time_s, contour_mode, plan_strokes, p, cache, tr)
+    contours, ordered_contours, greedy_contours = plan["contours"], plan["ordered"], plan["greedy"]
+    greedy_penup_px, penup_px, penup_history = plan["greedy_penup_px"], plan["penup_px"], plan["penup_history"]
+    stroke_info = plan["stroke_info"]
 
     # Print per-contour path for test (default: first 30 points)
     # Example output:
@@ -62,84 +212,170 @@ def run_pipeline(w, h, receive_path=RECEIVE_PATH, command_path=COMMAND_PATH, dat
 
 
 
-    ## Command generation
-    # 1) Convert each contour to mm and densify and simplify
-    contours_converted = []
-    for c_xy in ordered_contours:
-        # Convert to mm
-        c_mm = contour_pixels_to_mm(c_xy, pixel_to_mm=PIXEL_TO_MM, origin_xy=(0.0, 0.0))
-
-        # Compress straight-ish parts while keeping curve shape within epsilon
-        c_simple = rdp_simplify(c_mm, epsilon=EPSILON_MM)
-
-        # Densify so that consecutive points <= STEP_MM
-        # c_mm_dense = densify_polyline_mm(c_simple, step_mm=STEP_MM)
-        # contours_converted.append(c_simple)
-        contours_converted.append(c_simple)
-    # print(contours_converted)
-
-    # 2) Build commands with pen up/down
-    cmds = build_command_sequence_from_contours_xy(contours_converted, pen_up_z=1, pen_down_z=0)
+    ## Command generation (or the cached result of an earlier run with the same plan and settings)
+    cmds, cmd_key = None, None
+    if cache is not None:
+        cmd_key = cache_key("commands", plan_key, p.pixel_to_mm, p.epsilon_mm, p.peephole, p.collinear_tol_mm)
+        cmds = cache.get_commands(cmd_key)
+    if cmds is None:
+        cmds, contours_converted, peephole_stats = _build_commands(ordered_contours, p, tr)
+        if cache is not None:
+            cache.put_commands(cmd_key, cmds)
+    else:
+        print("STM commands loaded from cache")
+        contours_converted, peephole_stats = None, None
+    tr.annotate(contours=len(contours), commands=len(cmds))
 
 
-    # Save STM commands
-    with open(command_path, "w", encoding="utf-8") as f:
-        f.writelines(cmds)
+    # Save STM commands (optional sink)
+    if command_path is not None:
+        with tr.stage("write_commands", path=str(command_path)), open(command_path, "w", encoding="utf-8") as f:
+            f.writelines(cmds)
 
 
     ## Print summary statistics
     lengths = [len(c) for c in ordered_contours]
     if lengths:
-        print()
-        print("="*20 + " Summary " + "="*20)
-        print(f"Contours kept: {len(contours)}")
-        # Print pen-up distance before/after optimization
-        before = total_penup_distance(contours)
-        print(f"Pen-up distance before optimization (px): {before:.2f}")
-        print(f"Pen-up distance after optimization (px): {penup_px:.2f}")
-        print("="*50)
-
-        # Print point count before/after RDP optimization
-        before_pts = count_points([densify_polyline_mm(contour_pixels_to_mm(c, 0.5), 0.2) for c in ordered_contours])
-        after_pts = count_points(contours_converted)
-
-        print("points before simplify:", before_pts)
-        print("points after  simplify:", after_pts)
-        print("reduction:", (1 - after_pts / max(1, before_pts)) * 100, "%")
-        print("="*50)
-
-        print("Total STM commands:", len(cmds))
-        print("="*50)
-        print("First 50 commands:")
-        for line in cmds[:50]:
-            print(line.strip())
+        with tr.stage("summary"):
+            print()
+            print("="*20 + " Summary " + "="*20)
+            print(f"Contours kept: {len(contours)} (mode: {contour_mode})")
+            if stroke_info is not None:
+                print(f"Stroke graph: {stroke_info['polylines']} polylines -> {stroke_info['walks']} walks "
+                      f"({stroke_info['odd_nodes']} odd nodes, {stroke_info['pairs']} pairs retraced, "
+                      f"{stroke_info['retrace_px']:.1f} px retrace)")
+            # Print pen-up distance before/after optimization
+            before = total_penup_distance(contours)
+            print(f"Pen-up distance before optimization (px): {before:.2f}")
+            print(f"Pen-up distance after greedy (px): {greedy_penup_px:.2f}")
+            for i, d in enumerate(penup_history[1:], start=1):
+                print(f"Pen-up distance after improvement round {i} (px): {d:.2f}")
+            print(f"Pen-up distance after optimization (px): {penup_px:.2f}")
+            # Same comparison in seconds with the machine model (travel + pen lift/drop per contour)
+            model = machine_model_from_config()
+            to_mm = lambda cs: [contour_pixels_to_mm(c, p.pixel_to_mm) for c in cs]
+            print(f"Pen-up time after greedy (s): {estimate_penup_time(to_mm(greedy_contours), model):.1f}")
+            print(f"Pen-up time after optimization (s): {estimate_penup_time(to_mm(ordered_contours), model):.1f}")
+            print("="*50)
+
+            # Print point count before/after RDP optimization (not kept for cached commands)
+            if contours_converted is not None:
+                before_pts = sum(count_densified_points_mm(contour_pixels_to_mm(c, p.pixel_to_mm), p.step_mm) for c in ordered_contours)
+                after_pts = count_points(contours_converted)
+
+                print("points before simplify:", before_pts)
+                print("points after  simplify:", after_pts)
+                print("reduction:", (1 - after_pts / max(1, before_pts)) * 100, "%")
+                print("="*50)
+
+                pen_down_mm = sum(float(np.linalg.norm(np.diff(c, axis=0), axis=1).sum()) for c in contours_converted)
+                print(f"Pen-down distance (mm): {pen_down_mm:.1f}")
+            if peephole_stats is not None:
+                print(f"Peephole removed {peephole_stats['removed']} commands "
+                      f"(zero-length {peephole_stats['zero_length']}, pen change in place {peephole_stats['z_collapsed']}, "
+                      f"collinear {peephole_stats['collinear']})")
+            print("Total STM commands:", len(cmds))
+            plot_est = estimate_plot_time(cmds, model)
+            tr.annotate(estimated_plot_time_s=plot_est["total_s"])
+            for line in format_estimate(plot_est):
+                print(line)
+            print("="*50)
+            print("First 50 commands:")
+            for line in cmds[:50]:
+                print(line.strip())
 
     ## Visualization: original binary, overlay, optimized with pen-up links (optional)
     if show_visualization:
-        binary_bgr = cv2.cvtColor(img255, cv2.COLOR_GRAY2BGR)   # original binary image in BGR
-        overlay = draw_contours_overlay(img255, contours)       # overlay with contours drawn in red
-        overlay_optimized = draw_contours_and_penup_links(
-            img255,
-            ordered_contours,
-            draw_contours=True,
-            draw_penup_links=True,
-            draw_index_labels=True,
-            font_scale=0.5,
-            font_thickness=0,
-        )
+        with tr.stage("visualization"):
+            binary_bgr = cv2.cvtColor(img255, cv2.COLOR_GRAY2BGR)   # original binary image in BGR
+            overlay = draw_contours_overlay(img255, contours)       # overlay with contours drawn in red
+            overlay_optimized = draw_contours_and_penup_links(
+                img255,
+                ordered_contours,
+                draw_contours=True,
+                draw_penup_links=True,
+                draw_index_labels=True,
+                font_scale=0.5,
+                font_thickness=0,
+            )
 
-        combined = np.hstack([binary_bgr, overlay, overlay_optimized])
+            combined = np.hstack([binary_bgr, overlay, overlay_optimized])
         
         # cv2.namedWindow("Original | Overlay | Optimized", cv2.WINDOW_NORMAL)
         # cv2.resizeWindow("Original | Overlay | Optimized", 1400, 700)
         # cv2.imshow("Original | Overlay | Optimized", combined)
-        # 창을 띄운 상태로 바로 반환 (waitKey 제거하여 창을 닫지 않고 계속 진행)
-        cv2.waitKey(1)  # 1ms 대기로 창 업데이트만 수행
-        return combined
+        # cv2.waitKey(1)  # only needed with imshow; HighGUI must not be called from worker threads
+        return cmds, combined
+
+    return cmds, None
+
+
+
+def iter_pipeline_commands(w=None, h=None, receive_path=RECEIVE_PATH, command_path=None, data_format="1bpp",
+                           improve_time_s=TOUR_IMPROVE_TIME_S, source=None, tracer=None,
+                           contour_mode=CONTOUR_MODE, plan_strokes=STROKE_PLAN, params=None, cache=None, stats=None):
+    """
+    Streaming form of run_pipeline: a generator of STM command lines for STM32UartManager.send_stream.
+
+    The contour order needs every contour, so loading, extraction and ordering run before the
+    first line; mm conversion, RDP, command building and the peephole pass then run one contour
+    at a time while the plotter is already drawing. The lines equal run_pipeline's cmds.
+
+    Args:
+        (same as run_pipeline; no summary or visualization)
+        command_path: if given, each line is also written to this file as it is yielded
+        cache: optional pipeline_cache.StageCache; commands are stored only when the stream ran to the end
+        stats: optional dict, filled with contours / commands / peephole counts when the stream ends
+    """
+    tr = tracer if tracer is not None else NULL_TRACER
+    p = params if params is not None else PipelineParams()
+    img255 = _load_edge_map(w, h, receive_path, data_format, source, p, tr)
+    plan, plan_key = _cached_plan(img255, improve_time_s, contour_mode, plan_strokes, p, cache, tr)
+
+    def simplified():
+        for c_xy in plan["ordered"]:
+            c_mm = contour_pixels_to_mm(c_xy, pixel_to_mm=p.pixel_to_mm, origin_xy=(0.0, 0.0))
+            yield rdp_simplify(c_mm, epsilon=p.epsilon_mm)
+
+    cached, cmd_key = None, None
+    if cache is not None:
+        cmd_key = cache_key("commands", plan_key, p.pixel_to_mm, p.epsilon_mm, p.peephole, p.collinear_tol_mm)
+        cached = cache.get_commands(cmd_key)
+    peephole_stats = {}
+    if cached is not None:
+        cmds = iter(cached)
+    else:
+        cmds = iter_command_sequence_from_contours_xy(simplified(), pen_up_z=1, pen_down_z=0)
+        if p.peephole:
+            cmds = iter_optimized_commands(cmds, collinear_tol_mm=p.collinear_tol_mm, stats=peephole_stats)
 
+    n = 0
+    sent = [] if cache is not None and cached is None else None    # lines to store once the stream completes
+    f = open(command_path, "w", encoding="utf-8") if command_path is not None else None
+    try:
+        for line in cmds:
+            if f is not None:
+                f.write(line)
+            if sent is not None:
+                sent.append(line)
+            n += 1
+            yield line
+    finally:
+        if f is not None:
+            f.close()
+    if sent is not None:
+        cache.put_commands(cmd_key, sent)
+    if stats is not None:
+        stats.update(contours=len(plan["ordered"]), commands=n, peephole=peephole_stats)
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    # Standalone run on a hex dump:  python main_pipeline.py [hex_path] [w] [h]
+    # (a directory of source images is planned headless with batch_plan.py)
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else RECEIVE_PATH
+    w = int(sys.argv[2]) if len(sys.argv) > 2 else W
+    h = int(sys.argv[3]) if len(sys.argv) > 3 else H
+    run_pipeline(w, h, receive_path=path)
 
 
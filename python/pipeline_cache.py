@@ -0,0 +1,194 @@
+# pipeline_cache.py
+"""
+Content-addressed on-disk cache for the pipeline stages, with size-bounded LRU eviction.
+
+    cache = StageCache("./cache", max_bytes=256 << 20)
+    key = cache_key(pixels, canny_low, canny_high, ...)      # hash of input + every parameter
+    edges = cache.get_edges(key)
+    if edges is None:
+        edges = process_and_save(...)
+        cache.put_edges(key, edges)
+
+Stages are stored separately, each keyed by the previous stage's content plus its own parameters:
+    edges     - 1bpp frame file (io_utils.frame_store), key: source pixels + resize + filter settings
+    plan      - contour order (.npz, no pickle), key: cropped edge map + extraction/ordering settings
+    commands  - STM command text, key: plan key + mm scale / RDP / peephole settings
+so changing e.g. EPSILON_MM re-runs only the command stage. A hit refreshes the entry's mtime;
+after each store the oldest entries are deleted until the directory is under max_bytes. Writes
+go through a temp file + os.replace, so several processes (batch_plan.py) can share a directory.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional
+import numpy as np
+
+from io_utils.frame_store import FMT_1BPP, write_frame, load_frame
+
+_PLAN_LISTS = ("contours", "ordered", "greedy")
+
+
+def cache_key(*parts) -> str:
+    # 128-bit BLAKE2b over the parts; arrays contribute dtype, shape and raw bytes.
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            a = np.ascontiguousarray(part)
+            h.update(f"nd:{a.dtype.str}:{a.shape}".encode())
+            h.update(a.tobytes())
+        elif isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(b"b:")
+            h.update(bytes(part))
+        else:
+            h.update(f"r:{part!r}".encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _pack_list(arrays: List[np.ndarray]):
+    lens = np.array([len(a) for a in arrays], dtype=np.int64)
+    pts = np.concatenate([np.asarray(a).reshape(-1, 2) for a in arrays]) if arrays else np.zeros((0, 2), np.int32)
+    return pts, lens
+
+
+def _unpack_list(pts: np.ndarray, lens: np.ndarray) -> List[np.ndarray]:
+    return list(np.split(pts, np.cumsum(lens)[:-1])) if len(lens) else []
+
+
+class StageCache:
+    def __init__(self, root: str, max_bytes: int = 256 << 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        os.makedirs(root, exist_ok=True)
+
+    # --- generic file entries ---
+    def _path(self, stage: str, key: str, ext: str) -> str:
+        return os.path.join(self.root, f"{stage}-{key}{ext}")
+
+    def _lookup(self, stage: str, key: str, ext: str) -> Optional[str]:
+        path = self._path(stage, key, ext)
+        try:
+            os.utime(path)      # LRU: a hit makes the entry the newest
+        except OSError:
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+            return None
+        self.hits[stage] = self.hits.get(stage, 0) + 1
+        return path
+
+    def _store(self, stage: str, key: str, ext: str, write) -> None:
+        # write(path) fills a temp file that then atomically becomes the entry.
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-", suffix=ext)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, self._path(stage, key, ext))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def size_bytes(self) -> int:
+        return sum(e.stat().st_size for e in os.scandir(self.root) if e.is_file() and not e.name.startswith("."))
+
+    def evict(self) -> int:
+        # Delete least recently used entries until the cache fits max_bytes; returns bytes freed.
+        entries = []
+        for e in os.scandir(self.root):
+            if e.is_file() and not e.name.startswith("."):
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue        # removed by another process
+                entries.append((st.st_mtime, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                pass
+        return freed
+
+    def clear(self) -> None:
+        for e in os.scandir(self.root):
+            if e.is_file():
+                os.remove(e.path)
+
+    def stats(self) -> str:
+        stages = sorted(set(self.hits) | set(self.misses))
+        parts = [f"{s} {self.hits.get(s, 0)} hit / {self.misses.get(s, 0)} miss" for s in stages]
+        return f"Cache ({self.size_bytes() / 1e6:.1f} MB of {self.max_bytes / 1e6:.0f} MB): " + ", ".join(parts)
+
+    # --- stage entries ---
+    def get_edges(self, key: str) -> Optional[np.ndarray]:
+        # Edge map as uint8 {0,255}, or None on a miss.
+        path = self._lookup("edges", key, ".frame")
+        return None if path is None else load_frame(path) * np.uint8(255)
+
+    def put_edges(self, key: str, edges: np.ndarray) -> None:
+        self._store("edges", key, ".frame", lambda p: write_frame(p, edges, FMT_1BPP))
+
+    def get_plan(self, key: str) -> Optional[Dict]:
+        # Planning result as returned by main_pipeline._plan_contour_order, or None on a miss.
+        path = self._lookup("plan", key, ".npz")
+        if path is None:
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            plan = {name: _unpack_list(z[f"{name}_pts"], z[f"{name}_len"]) for name in _PLAN_LISTS}
+            meta = json.loads(str(z["meta"]))
+            plan["penup_history"] = z["penup_history"].tolist()
+        plan.update(meta)
+        return plan
+
+    def put_plan(self, key: str, plan: Dict) -> None:
+        arrays = {}
+        for name in _PLAN_LISTS:
+            arrays[f"{name}_pts"], arrays[f"{name}_len"] = _pack_list(plan[name])
+        arrays["penup_history"] = np.asarray(plan["penup_history"], dtype=np.float64)
+        arrays["meta"] = np.array(json.dumps({
+            "greedy_penup_px": float(plan["greedy_penup_px"]),
+            "penup_px": float(plan["penup_px"]),
+            "stroke_info": plan["stroke_info"],
+        }))
+
+        def write(p):
+            with open(p, "wb") as f:
+                np.savez(f, **arrays)
+        self._store("plan", key, ".npz", write)
+
+    def get_commands(self, key: str) -> Optional[List[str]]:
+        path = self._lookup("commands", key, ".txt")
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.readlines()
+
+    def put_commands(self, key: str, cmds: List[str]) -> None:
+        def write(p):
+            with open(p, "w", encoding="utf-8") as f:
+                f.writelines(cmds)
+        self._store("commands", key, ".txt", write)
+
+
+def make_cache(enabled: bool, root: str, max_mb: float) -> Optional[StageCache]:
+    # StageCache when enabled, else None (run_pipeline's default: no caching).
+    return StageCache(root, max_bytes=int(max_mb * (1 << 20))) if enabled else None
+
+
+if __name__ == "__main__":
+    # Show or clear the cache:  python pipeline_cache.py [--clear]
+    import sys
+    from config import CACHE_DIR, CACHE_MAX_MB
+    cache = StageCache(CACHE_DIR, max_bytes=int(CACHE_MAX_MB * (1 << 20)))
+    if "--clear" in sys.argv[1:]:
+        cache.clear()
+    n = sum(1 for e in os.scandir(cache.root) if e.is_file())
+    print(f"{cache.root}: {n} entries, {cache.size_bytes() / 1e6:.1f} MB (limit {CACHE_MAX_MB} MB)")
@@ -0,0 +1,163 @@
+# pipeline_trace.py
+"""
+Per-stage timing and memory instrumentation for run_pipeline.
+
+    tracer = PipelineTracer(job="job_0", memory=True)
+    run_pipeline(..., tracer=tracer)
+    print(tracer.summary())
+    tracer.save_chrome_trace("images/trace_0.json")   # open in chrome://tracing or Perfetto
+
+Each stage records wall time (perf_counter), process CPU time (process_time)
+and, if memory=True, the peak traced allocation inside the stage (tracemalloc).
+Stages may nest. When no tracer is passed, NULL_TRACER is used: stage()
+returns one shared no-op context manager, so the disabled cost is a method
+call per stage.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+
+
+class NullTracer:
+    enabled = False
+    _noop = nullcontext()
+
+    def stage(self, name: str, **args):
+        return self._noop
+
+    def annotate(self, **args) -> None:
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class PipelineTracer:
+    enabled = True
+
+    def __init__(self, job: str = "pipeline", memory: bool = False):
+        self.job = job
+        self.memory = memory
+        self.records: List[Dict] = []
+        self.meta: Dict = {}
+        self._t0 = time.perf_counter()
+        self._depth = 0
+        self._own_tracemalloc = False
+        self._peak_stack: List[int] = []
+
+    def annotate(self, **args) -> None:
+        # Attach job-level values (sizes, counts, parameters) to the trace.
+        self.meta.update(args)
+
+    @contextmanager
+    def stage(self, name: str, **args):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracemalloc = True
+            # reset_peak() clears the enclosing stage's peak too, so fold the peak
+            # so far into the parent's frame before resetting; each frame keeps the
+            # highest absolute peak seen while it was open
+            if self._peak_stack:
+                self._peak_stack[-1] = max(self._peak_stack[-1], tracemalloc.get_traced_memory()[1])
+            self._peak_stack.append(0)
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+
+        depth = self._depth
+        self._depth += 1
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall1, cpu1 = time.perf_counter(), time.process_time()
+            self._depth -= 1
+            rec = {
+                "name": name,
+                "depth": depth,
+                "start_s": wall0 - self._t0,
+                "wall_s": wall1 - wall0,
+                "cpu_s": cpu1 - cpu0,
+            }
+            if self.memory:
+                cur, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, self._peak_stack.pop())
+                rec["peak_alloc_bytes"] = max(0, peak - mem0)
+                rec["net_alloc_bytes"] = cur - mem0
+                if self._peak_stack:
+                    self._peak_stack[-1] = max(self._peak_stack[-1], peak)
+                elif self._own_tracemalloc:
+                    tracemalloc.stop()
+                    self._own_tracemalloc = False
+            if args:
+                rec["args"] = args
+            self.records.append(rec)
+
+    # --- reporting ---
+    def total_wall_s(self) -> float:
+        return sum(r["wall_s"] for r in self.records if r["depth"] == 0)
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<28} {'wall ms':>9} {'cpu ms':>9} {'peak KiB':>10}"]
+        for r in sorted(self.records, key=lambda r: r["start_s"]):
+            name = "  " * r["depth"] + r["name"]
+            peak = f"{r['peak_alloc_bytes'] / 1024:.1f}" if "peak_alloc_bytes" in r else "-"
+            lines.append(f"{name:<28} {r['wall_s'] * 1e3:>9.2f} {r['cpu_s'] * 1e3:>9.2f} {peak:>10}")
+        lines.append(f"{'total':<28} {self.total_wall_s() * 1e3:>9.2f}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job": self.job,
+            "meta": self.meta,
+            "stages": sorted(self.records, key=lambda r: r["start_s"]),
+            "total_wall_s": self.total_wall_s(),
+        }
+
+    def save_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_chrome_trace(self) -> Dict:
+        # Chrome trace-event format: one complete ("X") event per stage, times in microseconds
+        pid, tid = os.getpid(), threading.get_ident()
+        events = []
+        for r in self.records:
+            args = {"cpu_ms": round(r["cpu_s"] * 1e3, 3), **r.get("args", {})}
+            if "peak_alloc_bytes" in r:
+                args["peak_alloc_bytes"] = r["peak_alloc_bytes"]
+            events.append({
+                "name": r["name"], "cat": self.job, "ph": "X", "pid": pid, "tid": tid,
+                "ts": r["start_s"] * 1e6, "dur": r["wall_s"] * 1e6, "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"job": self.job, **self.meta}}
+
+    def save_chrome_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+def make_tracer(enabled: bool, job: str = "pipeline", memory: bool = True):
+    # PipelineTracer when enabled, otherwise the shared no-op tracer
+    return PipelineTracer(job=job, memory=memory) if enabled else NULL_TRACER
+
+
+if __name__ == "__main__":
+    # Trace one pipeline run on the configured input:
+    #   python pipeline_trace.py [receive_path] [trace.json]
+    import sys
+    from config import RECEIVE_PATH, W, H
+    from main_pipeline import run_pipeline
+
+    receive_path = sys.argv[1] if len(sys.argv) > 1 else RECEIVE_PATH
+    out_path = sys.argv[2] if len(sys.argv) > 2 else "pipeline_trace.json"
+    tracer = PipelineTracer(job=os.path.basename(receive_path), memory=True)
+    run_pipeline(W, H, receive_path=receive_path, command_path=None, show_visualization=True, tracer=tracer)
+    print(tracer.summary())
+    tracer.save_chrome_trace(out_path)
+    print(f"Chrome trace written to {out_path}")
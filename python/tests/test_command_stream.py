@@ -0,0 +1,19 @@
+# Run from the python/ directory:  python -m pytest tests
+from io_utils.command_stream import CommandStream
+
+
+def test_close_closes_generator_source():
+    # A cancelled job must release what the source holds (e.g. an open command file)
+    closed = []
+
+    def source():
+        try:
+            for i in range(10_000):
+                yield f"x:{i}.0,y:0.0,z:1\n"
+        finally:
+            closed.append(True)
+
+    stream = CommandStream(source(), maxsize=4)
+    next(iter(stream))
+    stream.close()
+    assert closed == [True]
@@ -0,0 +1,15 @@
+# Run from the python/ directory:  python -m pytest tests
+from pipeline_trace import PipelineTracer
+
+
+def test_outer_peak_survives_nested_stage():
+    # The outer stage's allocation before the inner stage must still count toward its peak
+    tracer = PipelineTracer(memory=True)
+    with tracer.stage("outer"):
+        block = bytearray(8_000_000)
+        del block
+        with tracer.stage("inner"):
+            small = bytearray(1000)
+    peaks = {r["name"]: r["peak_alloc_bytes"] for r in tracer.records}
+    assert peaks["outer"] >= 8_000_000
+    assert peaks["inner"] < 1_000_000
@@ -0,0 +1,23 @@
+# Run from the python/ directory:  python -m pytest tests
+import numpy as np
+
+from image_processing.stroke_graph import plan_pen_down_walks
+
+
+def test_lone_open_polyline_is_unchanged():
+    # Its two odd endpoints are the only ones in the component: pairing them would save no pen lift
+    line = np.array([[i, 0] for i in range(5)], dtype=np.int32)
+    walks, info = plan_pen_down_walks([line], max_retrace_px=10)
+    assert len(walks) == 1
+    assert np.array_equal(walks[0], line)
+    assert info["pairs"] == 0 and info["retrace_px"] == 0.0
+
+
+def test_pairing_saves_a_lift_when_component_has_more_than_two_odd_nodes():
+    # Three arms from one junction: 4 odd nodes -> 2 walks without retrace, 1 with the short arm drawn twice
+    arms = [np.array([[0, 0], [1, 0]]), np.array([[0, 0], [0, 2]]), np.array([[0, 0], [-3, 0]])]
+    walks, info = plan_pen_down_walks(arms, max_retrace_px=0)
+    assert len(walks) == 2
+    walks, info = plan_pen_down_walks(arms, max_retrace_px=10)
+    assert len(walks) == 1
+    assert info["pairs"] == 1 and info["retrace_px"] == 1.0